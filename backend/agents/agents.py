@@ -2,6 +2,7 @@
 Agent factory for the HIV PrEP counseling system.
 """
 import autogen
+import json
 from typing import List
 from .counselor_agent import CounselorAgent
 from .assistant_agent import AssistantAgent
@@ -48,11 +49,24 @@ class AgentFactory:
                         print("WebSocket is None, returning empty string")
                         return ""
 
-                    # Send the prompt to the user via websocket
-                    await agent.websocket.send_text(prompt)
+                    reader = getattr(
+                        getattr(agent.websocket, 'state', None), 'reader', None)
+                    if reader is not None:
+                        # The connection's reader routes the next message
+                        # to this question, so the endpoint never races us
+                        user_response = await reader.ask(prompt)
+                    else:
+                        # Send the prompt to the user via websocket
+                        await agent.websocket.send_text(prompt)
 
-                    # Wait for user response
-                    user_response = await agent.websocket.receive_text()
+                        # Wait for user response; tools get the answer's
+                        # content, as from the reader
+                        frame = await agent.websocket.receive_text()
+                        try:
+                            user_response = json.loads(frame).get(
+                                "content", "")
+                        except (json.JSONDecodeError, AttributeError):
+                            user_response = frame
                     print(f"Received user input: {user_response}")
                     return user_response
                 except Exception as e:
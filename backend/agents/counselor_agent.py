@@ -3,6 +3,7 @@ Counselor agent that uses RAG system for HIV PrEP counseling.
 """
 from typing import Any, Dict, List, Optional
 import autogen
+from config import get_tool_execution_config
 from .base_agent import BaseAgent
 
 
@@ -24,7 +25,9 @@ class CounselorAgent(BaseAgent):
             is_termination_msg=check_termination,
             human_input_mode="NEVER",
             code_execution_config={"work_dir": "coding", "use_docker": False},
-            llm_config=self.llm_config
+            llm_config=self.llm_config,
+            # The counselor executes every tool the assistant calls
+            tool_execution_config=get_tool_execution_config()
         )
     
     def get_system_message(self) -> str:
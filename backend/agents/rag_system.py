@@ -62,7 +62,8 @@ class RAGSystem:
                     persist_directory=persist_dir, 
                     embedding_function=OpenAIEmbeddings(
                         model=self.embedding_model,
-                        openai_api_key=self.api_key
+                        openai_api_key=self.api_key,
+                        openai_api_base=settings.openai_base_url
                     )
                 )
                 print(f"Loaded existing vectorstore from disk: {persist_dir}")
@@ -72,14 +73,16 @@ class RAGSystem:
                     documents=all_splits, 
                     embedding_function=OpenAIEmbeddings(
                         model=self.embedding_model,
-                        openai_api_key=self.api_key
+                        openai_api_key=self.api_key,
+                        openai_api_base=settings.openai_base_url
                     ),
                     persist_directory=persist_dir
                 )
                 print(f"Created and stored new vectorstore: {persist_dir}")
 
             # QA Chain
-            llm = ChatOpenAI(model_name="gpt-4o", temperature=0)
+            llm = ChatOpenAI(model_name="gpt-4o", temperature=0,
+                             openai_api_base=settings.openai_base_url)
             retriever = self._vectorstore.as_retriever(
                 search_kwargs={"k": DEFAULT_CONFIG["retrieval_k"]} 
             )
@@ -1,6 +1,9 @@
 """
 RAG (Retrieval-Augmented Generation) system for HIV PrEP counseling.
 """
+import threading
+
+from autogen import tracing
 from langchain.prompts import PromptTemplate
 from langchain_community.document_loaders import WebBaseLoader
 from langchain_openai import OpenAIEmbeddings
@@ -12,6 +15,61 @@ from config import DEFAULT_CONFIG
 from config import settings
 
 
+KNOWLEDGE_BASE_URL = ("https://raw.githubusercontent.com/amarisg25/"
+                      "embedding-data-chatbot/main/"
+                      "HIV_PrEP_knowledge_embedding.json")
+
+# Vector store and QA chain per (api key, embedding model), shared by every
+# session of the process; both are only read after they are built
+_shared_rag = {}
+_shared_rag_lock = threading.Lock()
+
+
+def _embeddings(api_key: str, embedding_model: str) -> OpenAIEmbeddings:
+    return OpenAIEmbeddings(
+        model=embedding_model,
+        openai_api_key=api_key,
+        openai_api_base=settings.openai_base_url
+    )
+
+
+def load_knowledge_documents() -> list:
+    """Download the knowledge base and split it into chunks."""
+    # Load data from URL instead of local file
+    loader = WebBaseLoader(KNOWLEDGE_BASE_URL)
+    data = loader.load()
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=DEFAULT_CONFIG["chunk_size"],
+        chunk_overlap=DEFAULT_CONFIG["chunk_overlap"]
+    )
+    all_splits = text_splitter.split_documents(data)
+    print(f"Split into {len(all_splits)} documents")
+    return all_splits
+
+
+def ensure_knowledge_index(api_key: str = None,
+                           embedding_model: str = None) -> bool:
+    """Build the knowledge base index on disk if it holds no documents.
+
+    Runs once before the workers start (see startup.warm_shared_assets), so
+    the workers only open the index and never race to build it.
+
+    Returns:
+        True if the index was built.
+    """
+    api_key = api_key or settings.api_key
+    embedding_model = embedding_model or DEFAULT_CONFIG["embedding_model"]
+    vectorstore = Chroma(
+        persist_directory=settings.get_database_path("rag_chroma_db"),
+        embedding_function=_embeddings(api_key, embedding_model)
+    )
+    if vectorstore.get(limit=1, include=[])["ids"]:
+        return False
+    vectorstore.add_documents(load_knowledge_documents())
+    print("Built the knowledge base index")
+    return True
+
+
 class RAGSystem:
     """Handles document retrieval and question answering for HIV PrEP counseling."""
     
@@ -24,7 +82,16 @@ class RAGSystem:
     
     def _setup_rag(self):
         """Initialize the RAG system with vector store and QA chain."""
-        if self._vectorstore is None:
+        # Built once per process instead of once per session
+        key = (self.api_key, self.embedding_model)
+        with _shared_rag_lock:
+            if key not in _shared_rag:
+                _shared_rag[key] = self._build_rag()
+        self._vectorstore, self._qa_chain = _shared_rag[key]
+
+    def _build_rag(self):
+        """Open the vector store and build the QA chain over it."""
+        with tracing.span("rag.setup", store="rag_chroma_db"):
             prompt = PromptTemplate(
                 template="""You are a knowledgeable HIV prevention counselor.
                 - The priority is to use the context to answer the question. 
@@ -44,49 +111,37 @@ class RAGSystem:
                 input_variables=["context", "question"]
             )
 
-            # Load data from URL instead of local file
-            loader = WebBaseLoader("https://raw.githubusercontent.com/amarisg25/embedding-data-chatbot/main/HIV_PrEP_knowledge_embedding.json")
-            data = loader.load()
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=DEFAULT_CONFIG["chunk_size"], 
-                chunk_overlap=DEFAULT_CONFIG["chunk_overlap"]
-            )
-            all_splits = text_splitter.split_documents(data)
-            print(f"Split into {len(all_splits)} documents")
-
             # Use centralized database path configuration
             persist_dir = settings.get_database_path("rag_chroma_db")
             
             try:
-                self._vectorstore = Chroma(
+                vectorstore = Chroma(
                     persist_directory=persist_dir, 
-                    embedding_function=OpenAIEmbeddings(
-                        model=self.embedding_model,
-                        openai_api_key=self.api_key
-                    )
+                    embedding_function=_embeddings(self.api_key,
+                                                   self.embedding_model)
                 )
                 print(f"Loaded existing vectorstore from disk: {persist_dir}")
             except Exception as e:
                 print(f"Creating new vectorstore: {e}")
-                self._vectorstore = Chroma.from_documents(
-                    documents=all_splits, 
-                    embedding_function=OpenAIEmbeddings(
-                        model=self.embedding_model,
-                        openai_api_key=self.api_key
-                    ),
+                vectorstore = Chroma.from_documents(
+                    documents=load_knowledge_documents(),
+                    embedding_function=_embeddings(self.api_key,
+                                                   self.embedding_model),
                     persist_directory=persist_dir
                 )
                 print(f"Created and stored new vectorstore: {persist_dir}")
 
             # QA Chain
-            llm = ChatOpenAI(model_name="gpt-4o", temperature=0)
-            retriever = self._vectorstore.as_retriever(
+            llm = ChatOpenAI(model_name="gpt-4o", temperature=0,
+                             openai_api_base=settings.openai_base_url)
+            retriever = vectorstore.as_retriever(
                 search_kwargs={"k": DEFAULT_CONFIG["retrieval_k"]} 
             )
             
-            self._qa_chain = RetrievalQA.from_chain_type(
+            qa_chain = RetrievalQA.from_chain_type(
                 llm, retriever=retriever, chain_type_kwargs={"prompt": prompt}
             )
+            return vectorstore, qa_chain
 
     def answer_question(self, question: str) -> str:
         """Answer a question using the RAG system."""
@@ -95,11 +150,15 @@ class RAGSystem:
             return "I'm sorry, my knowledge base is not properly initialized."
         
         print(f"Searching for answer to: {question}")
-        try:
-            result = self._qa_chain.invoke({"query": question})
-            print(f"Retrieved context: {result}")
-            answer = result.get("result", "I'm sorry, I couldn't find an answer to that question.")
-            return answer
-        except Exception as e:
-            print(f"Error retrieving answer: {e}")
-            return "I'm sorry, I encountered an error retrieving the answer."
+        # Covers the vector query and the QA model call of the chain
+        with tracing.span("rag.answer_question", store="rag_chroma_db",
+                          retrieval_k=DEFAULT_CONFIG["retrieval_k"]) as span:
+            try:
+                result = self._qa_chain.invoke({"query": question})
+                print(f"Retrieved context: {result}")
+                answer = result.get("result", "I'm sorry, I couldn't find an answer to that question.")
+                return answer
+            except Exception as e:
+                print(f"Error retrieving answer: {e}")
+                span.record_error(e)
+                return "I'm sorry, I encountered an error retrieving the answer."
@@ -27,7 +27,8 @@ class TeachabilityManager:
             path_to_db_dir=user_db_path,
             recall_threshold=DEFAULT_CONFIG["recall_threshold"],
             verbosity=DEFAULT_CONFIG["verbosity"],
-            llm_config=llm_config
+            # Memo analysis waits behind counselor replies under rate limits
+            llm_config={**llm_config, "priority": "low"}
         )
         print(f"Teachability initialized with path: {user_db_path}")
     
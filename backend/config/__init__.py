@@ -1,14 +1,17 @@
 """
 Configuration package for the HIV PrEP Counselor system.
 """
+import os
+import threading
+
 from .settings import settings, Settings
 from .model_config import ModelConfig
 
 # Create model_config instance
 model_config = ModelConfig()
 
-# Backward compatibility exports
-client = settings.openai_client
+_supabase_client = None
+_supabase_lock = threading.Lock()
 
 # Default configuration (for backward compatibility)
 DEFAULT_CONFIG = {
@@ -52,8 +55,14 @@ def get_llm_config(api_key: str = None, temperature: float = 0.7, agent_name: st
         "model": agent_config["model"],
         "api_key": api_key
     }]
+    if settings.openai_base_url:
+        config_list[0]["base_url"] = settings.openai_base_url
+    # Further deployments of the same model; with routing they share traffic
+    # and take hedged requests, without it they are plain fallbacks
+    for url in settings.openai_extra_base_urls:
+        config_list.append({**config_list[0], "base_url": url})
 
-    return {
+    llm_config = {
         "config_list": config_list,
         "temperature": agent_config["temperature"],
         "max_tokens": agent_config.get("max_tokens", 4000),
@@ -61,6 +70,104 @@ def get_llm_config(api_key: str = None, temperature: float = 0.7, agent_name: st
         "frequency_penalty": agent_config.get("frequency_penalty", 0.0),
         "presence_penalty": agent_config.get("presence_penalty", 0.0),
     }
+    if settings.llm_routing:
+        llm_config["routing"] = settings.llm_routing
+    rate_limit = settings.llm_rate_limits.get(agent_config["model"])
+    if rate_limit:
+        # Counselor replies go ahead of translations and memo analysis
+        # when the model's limits are reached
+        llm_config["rate_limit"] = rate_limit
+        llm_config["priority"] = "high"
+    return llm_config
+
+# Tools that question the user over the socket. They run one at a time, so
+# their questions do not interleave, and they wait for the user's answers as
+# long as it takes rather than for TOOL_TIMEOUT.
+INTERACTIVE_TOOLS = (
+    "assess_hiv_risk",
+    "assess_status_of_change",
+    "record_support_request",
+)
+
+def get_tool_execution_config():
+    """Create the tool execution configuration for the agent running tools.
+
+    Independent tool calls of one message run concurrently, sync tools in
+    worker threads, up to TOOL_MAX_CONCURRENCY at once and each cancelled
+    after TOOL_TIMEOUT seconds. Interactive tools run one at a time and
+    without a timeout.
+    """
+    return {
+        "max_concurrency": settings.tool_max_concurrency,
+        "timeout": settings.tool_timeout,
+        "timeouts": dict.fromkeys(INTERACTIVE_TOOLS),
+        "exclusive": INTERACTIVE_TOOLS,
+        "sync_in_thread": True,
+    }
+
+def configure_tracing():
+    """Turn on span export for the agent pipeline if TRACING_EXPORTER is set.
+
+    Returns:
+        The autogen tracer, or None when tracing stays off.
+    """
+    exporter_name = settings.tracing_exporter
+    if not exporter_name:
+        return None
+    from autogen import tracing
+
+    if exporter_name == "jsonl":
+        exporter = tracing.JsonLinesSpanExporter(settings.tracing_file)
+    elif exporter_name == "otlp":
+        exporter = tracing.OTLPHttpSpanExporter(
+            settings.tracing_otlp_endpoint,
+            service_name=settings.tracing_service_name,
+        )
+    else:
+        raise ValueError(f"Unknown TRACING_EXPORTER: {exporter_name}. "
+                         f"Use 'jsonl' or 'otlp'.")
+    return tracing.configure(exporter,
+                             sample_rate=settings.tracing_sample_rate)
+
+def trace_supabase(client):
+    """Record a span for each Supabase REST call made through a client.
+
+    Hooks the httpx session of the client's PostgREST connection, so every
+    `.execute()` is timed without changing the call sites.
+    """
+    from autogen import tracing
+
+    def attributes(request):
+        return {"db.system": "supabase",
+                "db.table": request.url.path.rsplit("/", 1)[-1]}
+
+    tracing.instrument_httpx(client.postgrest.session, "supabase.request",
+                             attributes)
+    return client
+
+def get_supabase_client():
+    """Get the Supabase client shared by the tools, created on first use.
+
+    Importing the tools neither imports supabase nor opens a connection, and
+    each forked worker creates its own client. Uses the service role key when
+    it is set, as tables such as notification_outbox are closed to anon.
+    """
+    global _supabase_client
+    with _supabase_lock:
+        if _supabase_client is None:
+            from supabase import create_client
+
+            _supabase_client = trace_supabase(create_client(
+                os.getenv("NEXT_PUBLIC_SUPABASE_URL"),
+                os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+                or os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")))
+        return _supabase_client
+
+def __getattr__(name):
+    # Backward compatibility export, created on first use
+    if name == 'client':
+        return settings.openai_client
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     'settings', 
@@ -69,6 +176,11 @@ __all__ = [
     'model_config',
     'client',
     'DEFAULT_CONFIG',
+    'INTERACTIVE_TOOLS',
     'get_api_key',
-    'get_llm_config'
+    'get_llm_config',
+    'get_tool_execution_config',
+    'configure_tracing',
+    'trace_supabase',
+    'get_supabase_client'
 ]
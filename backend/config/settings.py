@@ -1,9 +1,13 @@
 """
 Project settings and environment variables for the HIV PrEP Counselor system.
 """
+import json
 import os
+from typing import TYPE_CHECKING, Optional
 from dotenv import load_dotenv
-from openai import OpenAI
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 # Load environment variables
 load_dotenv("../.env")
@@ -33,10 +37,39 @@ class Settings:
         return self._api_key
 
     @property
-    def openai_client(self) -> OpenAI:
+    def openai_base_url(self) -> str:
+        """Get OpenAI-compatible API base URL; None uses the default API."""
+        return os.getenv('OPENAI_BASE_URL') or None
+
+    @property
+    def openai_extra_base_urls(self) -> list:
+        """Get base URLs of further deployments serving the same models."""
+        urls = os.getenv('OPENAI_EXTRA_BASE_URLS', '')
+        return [url.strip() for url in urls.split(',') if url.strip()]
+
+    @property
+    def llm_routing(self) -> dict:
+        """Get latency-aware routing options for autogen; None keeps strict config_list order."""
+        if os.getenv('LLM_ROUTING', 'false').lower() != 'true':
+            return None
+        percentile = os.getenv('LLM_HEDGE_PERCENTILE', '0.95')
+        return {"hedge_percentile": float(percentile) if percentile else None}
+
+    @property
+    def llm_rate_limits(self) -> dict:
+        """Get per-model request and token limits, e.g. {"gpt-4o": {"rpm": 500, "tpm": 30000}}."""
+        limits = os.getenv('LLM_RATE_LIMITS')
+        return json.loads(limits) if limits else {}
+
+    @property
+    def openai_client(self) -> "OpenAI":
         """Get OpenAI client instance."""
         if self._client is None:
-            self._client = OpenAI(api_key=self.api_key)
+            # Imported on first use, as the openai package is slow to import
+            from openai import OpenAI
+
+            self._client = OpenAI(api_key=self.api_key,
+                                  base_url=self.openai_base_url)
         return self._client
 
     # Database settings
@@ -116,16 +149,207 @@ class Settings:
         """Get rate limit window in minutes."""
         return int(os.getenv('RATE_LIMIT_WINDOW', '1'))
 
+    # Chat activity tracking settings
+    @property
+    def chat_idle_timeout(self) -> float:
+        """Get seconds without activity before a chat counts as idle."""
+        return float(os.getenv('CHAT_IDLE_TIMEOUT', '300'))
+
+    @property
+    def activity_tick(self) -> float:
+        """Get resolution in seconds of the idle timer wheel."""
+        return float(os.getenv('ACTIVITY_TICK', '1'))
+
+    # Session capacity settings
+    @property
+    def max_sessions(self) -> int:
+        """Get maximum number of open WebSocket sessions per process."""
+        return int(os.getenv('MAX_SESSIONS', '200'))
+
+    @property
+    def max_active_turns(self) -> int:
+        """Get maximum number of chat turns running at once per process."""
+        return int(os.getenv('MAX_ACTIVE_TURNS', '32'))
+
+    @property
+    def session_max_pending_turns(self) -> int:
+        """Get maximum number of queued or running turns per session."""
+        return int(os.getenv('SESSION_MAX_PENDING_TURNS', '4'))
+
+    # Session state settings
+    @property
+    def session_store(self) -> str:
+        """Get session state store: "sqlite", "redis", or empty for none."""
+        return os.getenv('SESSION_STORE', '').lower()
+
+    @property
+    def session_store_url(self) -> str:
+        """Get SQLite file path or Redis URL of the session state store."""
+        default = ('redis://localhost:6379/0' if self.session_store == 'redis'
+                   else './data/session_state.db')
+        return os.getenv('SESSION_STORE_URL') or default
+
+    @property
+    def session_state_ttl(self) -> Optional[float]:
+        """Get seconds a saved session state is kept; empty for no expiry."""
+        ttl = os.getenv('SESSION_STATE_TTL', '604800')
+        return float(ttl) if ttl else None
+
+    @property
+    def maintenance_interval(self) -> int:
+        """Get seconds between fallback maintenance polls."""
+        return int(os.getenv('MAINTENANCE_INTERVAL', '300'))
+
+    @property
+    def maintenance_lock_file(self) -> str:
+        """Get lock file electing the one worker that runs maintenance."""
+        return os.getenv('MAINTENANCE_LOCK_FILE', './data/maintenance.lock')
+
+    # Shared cache settings
+    @property
+    def shared_cache_url(self) -> Optional[str]:
+        """Get Redis URL of the cache shared by workers; None uses disk."""
+        return os.getenv('SHARED_CACHE_URL') or None
+
+    @property
+    def shared_cache_path(self) -> str:
+        """Get directory of the disk cache shared by the workers of a host."""
+        return os.getenv('SHARED_CACHE_PATH', './data/shared_cache')
+
+    # Chat evaluation settings
+    @property
+    def evaluation_batch_size(self) -> int:
+        """Get number of chats evaluated per checkpointed batch."""
+        return int(os.getenv('EVALUATION_BATCH_SIZE', '10'))
+
+    @property
+    def evaluation_concurrency(self) -> int:
+        """Get maximum concurrent chat evaluation calls."""
+        return int(os.getenv('EVALUATION_CONCURRENCY', '4'))
+
+    @property
+    def evaluation_max_attempts(self) -> int:
+        """Get failed scoring attempts before a chat leaves the queue."""
+        return int(os.getenv('EVALUATION_MAX_ATTEMPTS', '3'))
+
+    # Notification email settings
+    @property
+    def smtp_server(self) -> str:
+        """Get SMTP server host used for research assistant notifications."""
+        return os.getenv('SMTP_SERVER', 'smtp.gmail.com')
+
+    @property
+    def smtp_port(self) -> int:
+        """Get SMTP server port."""
+        return int(os.getenv('SMTP_PORT', '465'))
+
+    @property
+    def smtp_use_ssl(self) -> bool:
+        """Check if the SMTP connection should use implicit SSL."""
+        return os.getenv('SMTP_USE_SSL', 'true').lower() == 'true'
+
+    @property
+    def smtp_timeout(self) -> float:
+        """Get SMTP connection timeout in seconds."""
+        return float(os.getenv('SMTP_TIMEOUT', '30'))
+
+    @property
+    def smtp_sender_email(self) -> str:
+        """Get sender address for notification emails; empty if unset."""
+        return os.getenv('SMTP_SENDER_EMAIL', '')
+
+    @property
+    def smtp_sender_password(self) -> str:
+        """Get sender password; an empty value skips SMTP login."""
+        return os.getenv('SMTP_SENDER_PASSWORD', '')
+
+    @property
+    def research_assistant_email(self) -> str:
+        """Get the research assistant address; empty if unset."""
+        return os.getenv('RESEARCH_ASSISTANT_EMAIL', '')
+
+    # Notification outbox settings
+    @property
+    def outbox_poll_interval(self) -> float:
+        """Get seconds between notification outbox drains."""
+        return float(os.getenv('OUTBOX_POLL_INTERVAL', '15'))
+
+    @property
+    def outbox_concurrency(self) -> int:
+        """Get number of notifications delivered concurrently."""
+        return int(os.getenv('OUTBOX_CONCURRENCY', '4'))
+
+    @property
+    def outbox_batch_size(self) -> int:
+        """Get maximum number of notifications claimed per drain."""
+        return int(os.getenv('OUTBOX_BATCH_SIZE', '20'))
+
+    @property
+    def outbox_max_attempts(self) -> int:
+        """Get delivery attempts before a notification is dead-lettered."""
+        return int(os.getenv('OUTBOX_MAX_ATTEMPTS', '6'))
+
+    @property
+    def outbox_backoff_base(self) -> float:
+        """Get base delay in seconds for exponential retry backoff."""
+        return float(os.getenv('OUTBOX_BACKOFF_BASE', '30'))
+
+    @property
+    def outbox_backoff_max(self) -> float:
+        """Get maximum retry delay in seconds."""
+        return float(os.getenv('OUTBOX_BACKOFF_MAX', '3600'))
+
+    # Tool execution settings
+    @property
+    def tool_max_concurrency(self) -> int:
+        """Get maximum number of tool calls the counselor runs at once."""
+        return int(os.getenv('TOOL_MAX_CONCURRENCY', '4'))
+
+    @property
+    def tool_timeout(self) -> Optional[float]:
+        """Get seconds after which a tool call is cancelled; empty for none."""
+        timeout = os.getenv('TOOL_TIMEOUT', '120')
+        return float(timeout) if timeout else None
+
+    # Tracing settings
+    @property
+    def tracing_exporter(self) -> str:
+        """Get span exporter: "jsonl", "otlp", or empty to turn tracing off."""
+        return os.getenv('TRACING_EXPORTER', '').lower()
+
+    @property
+    def tracing_file(self) -> str:
+        """Get path of the JSON lines file written by the jsonl exporter."""
+        return os.getenv('TRACING_FILE', './logs/traces.jsonl')
+
+    @property
+    def tracing_otlp_endpoint(self) -> str:
+        """Get OTLP/HTTP traces endpoint of the OpenTelemetry collector."""
+        return os.getenv('OTEL_EXPORTER_OTLP_TRACES_ENDPOINT',
+                         'http://localhost:4318/v1/traces')
+
+    @property
+    def tracing_service_name(self) -> str:
+        """Get service name reported with exported spans."""
+        return os.getenv('OTEL_SERVICE_NAME', 'chia-backend')
+
+    @property
+    def tracing_sample_rate(self) -> float:
+        """Get fraction of chat turns traced."""
+        return float(os.getenv('TRACING_SAMPLE_RATE', '1.0'))
+
     # Autogen configuration
     @property
     def config_list(self) -> list:
         """Get autogen config list for model configuration."""
-        return [
-            {
-                "model": "gpt-4o",
-                "api_key": self.api_key
-            }
-        ]
+        config = {
+            "model": "gpt-4o",
+            "api_key": self.api_key
+        }
+        if self.openai_base_url:
+            config["base_url"] = self.openai_base_url
+        return [config] + [{**config, "base_url": url}
+                           for url in self.openai_extra_base_urls]
 
     @property
     def model_name(self) -> str:
@@ -0,0 +1,33 @@
+"""
+Gunicorn settings for running the backend with several worker processes.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+The app is imported once in the master (preload_app), which then prepares
+the read-only assets and forks the workers. Modules, tokenizer tables and
+everything else built before the fork are shared copy-on-write, so each
+added worker costs its own sessions rather than a full copy of the backend.
+``uvicorn --workers`` starts every worker as a fresh interpreter instead and
+shares nothing.
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+# A worker is restarted when its event loop stalls for this long
+timeout = int(os.getenv('WORKER_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('WORKER_GRACEFUL_TIMEOUT', '30'))
+
+
+def when_ready(server):
+    """Build the shared assets in the master, before the first fork."""
+    from startup import warm_shared_assets
+
+    warm_shared_assets(before_fork=True)
+    # Objects tracked by the collector stay out of its passes in the
+    # workers, which would otherwise write to, and so copy, their pages
+    gc.collect()
+    gc.freeze()
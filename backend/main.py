@@ -1,5 +1,7 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import functools
 import json
 import logging
 import sys
@@ -10,13 +12,11 @@ backend_dir = Path(__file__).parent
 modified_packages_dir = backend_dir / "modified_packages"
 sys.path.insert(0, str(modified_packages_dir))
 
-try:
-    # Try absolute import first (when running from project root)
-    from backend.services.counselor_session import HIVPrEPCounselor  # noqa: E402
-except ImportError:
-    # Fall back to relative import (when running from backend directory)
-    from services.counselor_session import HIVPrEPCounselor  # noqa: E402
-from startup import lifespan  # noqa: E402
+from startup import lifespan, load_counselor_class  # noqa: E402
+from services.activity_tracker import activity_tracker  # noqa: E402
+from services.connection_reader import ConnectionReader  # noqa: E402
+from services.session_registry import (  # noqa: E402
+    SessionBusyError, SessionLimitError, session_registry)
 from config import settings  # noqa: E402
 
 # Set up logging
@@ -37,29 +37,99 @@ app.add_middleware(
 )
 
 
+async def create_counselor(websocket: WebSocket, user_id, chat_id,
+                           teachability_flag):
+    """Create the counselor of a session.
+
+    The counselor session is imported on first use rather than with this
+    module, which keeps startup fast. Should a session arrive before the
+    background warm-up has imported it, the import runs in a thread so the
+    other connections are still served.
+    """
+    counselor_class = await asyncio.to_thread(load_counselor_class)
+    return counselor_class(websocket, user_id, chat_id, teachability_flag)
+
+
+async def run_turn(websocket: WebSocket, workflow_manager, content: str,
+                   message_id, chat_id, user_id):
+    """Run one chat turn, answering with a fallback message if it fails."""
+    try:
+        # Pass the content string
+        # The GroupChatManager will handle WebSocket communication
+        await workflow_manager.initiate_chat(content)
+        # The counselor's reply is activity as well
+        activity_tracker.touch(chat_id, user_id)
+        print("Chat processing completed - "
+              "GroupChatManager handled WebSocket")
+    except Exception as e:
+        logger.error(f"Error processing message: {e}")
+        error_message = ("I'm here to help. "
+                         "Could you please rephrase that?")
+        await websocket.send_text(json.dumps({
+            "type": "chat_response",
+            "messageId": message_id,
+            "content": error_message
+        }))
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    try:
+        session = session_registry.open(websocket)
+    except SessionLimitError as e:
+        logger.warning(f"Refusing connection: {e}")
+        # 1013: try again later
+        await websocket.close(code=1013)
+        return
     user_id = None
     workflow_manager = None
     chat_id = None
     chat_id_received = False
     teachability_flag = None
+    counselor_ready = asyncio.Event()
+
+    # The only reader of the socket. Any frame for a known chat counts as
+    # activity.
+    reader = ConnectionReader(
+        websocket,
+        on_frame=lambda frame: activity_tracker.touch(chat_id, user_id))
+    # Tools asking the patient a question wait for the answer through it
+    websocket.state.reader = reader
+    reader.start()
+
+    async def dispatch_messages():
+        """Start a chat turn for each message, in the order they arrive."""
+        try:
+            while True:
+                frame = await reader.next_message()
+                message_id = frame.get('messageId')
+                # Check if message is within deduplication window
+                if "chat_id" in frame:
+                    continue
+                await counselor_ready.wait()
+                try:
+                    session_registry.submit(session, functools.partial(
+                        run_turn, websocket, workflow_manager,
+                        frame['content'], message_id, chat_id, user_id))
+                except SessionBusyError as e:
+                    logger.warning(f"Dropping message from {user_id}: {e}")
+                    await websocket.send_text(json.dumps({
+                        "type": "chat_response",
+                        "messageId": message_id,
+                        "content": ("I'm still working on your earlier "
+                                    "messages. Please wait a moment.")
+                    }))
+        except WebSocketDisconnect:
+            pass
+
+    dispatcher = asyncio.create_task(dispatch_messages())
 
     try:
         while True:
-            data = await websocket.receive_text()
-
-            parsed_data = json.loads(data)
-
-            # Extract message fields
-            message_type = parsed_data.get('type')
-            content = parsed_data.get('content')
-            message_id = parsed_data.get('messageId')
-
-            if not message_type or not content:
-                logger.warning(f"Invalid message received: {parsed_data}")
-                continue
+            frame = await reader.next_control()
+            message_type = frame['type']
+            content = frame['content']
 
             if message_type == "teachability_flag":
                 teachability_flag = content
@@ -68,44 +138,40 @@ async def websocket_endpoint(websocket: WebSocket):
             # Handle user_id message
             if message_type == "user_id":
                 user_id = content
+                session.user_id = user_id
                 # Only create workflow_manager if we don't have one yet
                 if workflow_manager is None:
-                    workflow_manager = HIVPrEPCounselor(
+                    workflow_manager = await create_counselor(
                         websocket, user_id, chat_id, teachability_flag)
+                    session.counselor = workflow_manager
+                    counselor_ready.set()
                 continue
 
             if message_type == "chat_id":
                 chat_id = content
+                session.chat_id = chat_id
+                if (workflow_manager is not None
+                        and not workflow_manager.chat_id):
+                    # Keys the conversation state saved after each turn
+                    workflow_manager.chat_id = chat_id
+                activity_tracker.touch(chat_id, user_id)
                 if chat_id_received:
                     continue
                 # Only create workflow_manager if we don't have one yet
                 if workflow_manager is None:
-                    workflow_manager = HIVPrEPCounselor(
+                    workflow_manager = await create_counselor(
                         websocket, user_id, chat_id, teachability_flag)
+                    session.counselor = workflow_manager
+                    counselor_ready.set()
                 chat_id_received = True
-                continue
-
-            if message_type == "message":
-                # Check if message is within deduplication window
-                try:
-                    if "chat_id" in parsed_data:
-                        continue
-                    # Pass the content string
-                    # The GroupChatManager will handle WebSocket communication
-                    await workflow_manager.initiate_chat(content)
-                    print("Chat processing completed - "
-                          "GroupChatManager handled WebSocket")
-                except Exception as e:
-                    logger.error(f"Error processing message: {e}")
-                    error_message = ("I'm here to help. "
-                                     "Could you please rephrase that?")
-                    await websocket.send_text(json.dumps({
-                        "type": "chat_response",
-                        "messageId": message_id,
-                        "content": error_message
-                    }))
 
     except WebSocketDisconnect:
         logger.info(f"Client disconnected: {user_id}")
     except Exception as e:
         logger.error(f"Connection error: {e}")
+    finally:
+        dispatcher.cancel()
+        await reader.stop()
+        # Cancels the running turn and frees its slots right away
+        await session_registry.close(session)
+        activity_tracker.disconnect(chat_id)
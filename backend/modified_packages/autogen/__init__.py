@@ -4,14 +4,77 @@
 #
 # Portions derived from  https://github.com/microsoft/autogen are under the MIT License.
 # SPDX-License-Identifier: MIT
+import importlib
 import logging
 
-from .agentchat import *
-from .code_utils import DEFAULT_MODEL, FAST_MODEL
-from .exception_utils import *
-from .oai import *
 from .version import __version__
 
+# Public names and the submodule defining each. They are imported on first access (PEP 562), so that
+# ``import autogen`` or ``from autogen import tracing`` does not load the agents, the model clients and the openai
+# package until they are used.
+_LAZY_EXPORTS = {
+    **dict.fromkeys(
+        (
+            "Agent",
+            "ConversableAgent",
+            "AssistantAgent",
+            "UserProxyAgent",
+            "GroupChat",
+            "GroupChatManager",
+            "register_function",
+            "initiate_chats",
+            "gather_usage_summary",
+            "ChatResult",
+        ),
+        ".agentchat",
+    ),
+    **dict.fromkeys(("DEFAULT_MODEL", "FAST_MODEL"), ".code_utils"),
+    **dict.fromkeys(
+        ("AgentNameConflict", "NoEligibleSpeaker", "SenderRequired", "InvalidCarryOverType", "UndefinedNextAgent"),
+        ".exception_utils",
+    ),
+    **dict.fromkeys(
+        (
+            "OpenAIWrapper",
+            "ModelClient",
+            "Completion",
+            "ChatCompletion",
+            "get_config_list",
+            "config_list_gpt4_gpt35",
+            "config_list_openai_aoai",
+            "config_list_from_models",
+            "config_list_from_json",
+            "config_list_from_dotenv",
+            "filter_config",
+            "Cache",
+        ),
+        ".oai",
+    ),
+}
+
+__all__ = [*_LAZY_EXPORTS, "__version__"]
+
+
+def __getattr__(name: str):
+    """Import a public name, or a submodule, on first access."""
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is not None:
+        value = getattr(importlib.import_module(module_name, __name__), name)
+        # Cached on the package, so later lookups skip this function
+        globals()[name] = value
+        return value
+    try:
+        return importlib.import_module(f".{name}", __name__)
+    except ModuleNotFoundError as e:
+        if e.name != f"{__name__}.{name}":
+            raise
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
+
 # Set the root logger.
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
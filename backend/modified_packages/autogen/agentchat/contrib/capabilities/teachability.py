@@ -15,6 +15,7 @@ from autogen.agentchat.assistant_agent import ConversableAgent
 from autogen.agentchat.contrib.capabilities.agent_capability import AgentCapability
 from autogen.agentchat.contrib.text_analyzer_agent import TextAnalyzerAgent
 
+from .... import tracing
 from ....formatting_utils import colored
 
 
@@ -117,6 +118,7 @@ class Teachability(AgentCapability):
         # Return the (possibly) expanded message text.
         return expanded_text
 
+    @tracing.traced("teachability.memo_storage")
     def _consider_memo_storage(self, comment: Union[Dict, str]):
         """Decides whether to store something from one user comment in the DB."""
         memo_added = False
@@ -175,6 +177,7 @@ class Teachability(AgentCapability):
             # Yes. Save them to disk.
             self.memo_store._save_memos()
 
+    @tracing.traced("teachability.memo_retrieval")
     def _consider_memo_retrieval(self, comment: Union[Dict, str]):
         """Decides whether to retrieve memos from the DB, and add them to the chat context."""
 
@@ -239,6 +242,7 @@ class Teachability(AgentCapability):
             memo_texts = memo_texts + "\n" + info
         return memo_texts
 
+    @tracing.traced("teachability.analyze")
     def _analyze(self, text_to_analyze: Union[Dict, str], analysis_instructions: Union[Dict, str]):
         """Asks TextAnalyzerAgent to analyze the given text according to specific instructions."""
         self.analyzer.reset()  # Clear the analyzer's list of messages.
@@ -337,7 +341,8 @@ class MemoStore:
         with self._memo_lock:
             self.last_memo_id += 1
             memo_id = str(self.last_memo_id)
-            self.vec_db.add(documents=[input_text], ids=[memo_id])
+            with tracing.span("vector.add", store="teachability"):
+                self.vec_db.add(documents=[input_text], ids=[memo_id])
             self.uid_text_dict[memo_id] = (input_text, output_text)
             self._save_memos()
 
@@ -346,7 +351,9 @@ class MemoStore:
         with self._memo_lock:
             if n_results > len(self.uid_text_dict):
                 n_results = len(self.uid_text_dict)
-            results = self.vec_db.query(query_texts=[query_text], n_results=n_results)
+            with tracing.span("vector.query", store="teachability", n_results=n_results) as span:
+                results = self.vec_db.query(query_texts=[query_text], n_results=n_results)
+                span.set_attribute("vector.matches", len(results["ids"][0]) if results["ids"] else 0)
             memos = []
             if results["ids"] and results["ids"][0]:  # Check if we have results
                 for i in range(len(results["ids"][0])):
@@ -68,17 +68,20 @@ class TransformMessages:
         agent.register_hook(hookable_method="process_all_messages_before_reply", hook=self._transform_messages)
 
     def _transform_messages(self, messages: List[Dict]) -> List[Dict]:
-        post_transform_messages = copy.deepcopy(messages)
+        # Transforms that never modify their input share the agent's message dicts instead of copying the whole
+        # history on every reply; only the list itself is copied
+        copy_safe = all(getattr(transform, "copy_safe", False) for transform in self._transforms)
+        post_transform_messages = list(messages) if copy_safe else copy.deepcopy(messages)
         system_message = None
 
         if messages[0]["role"] == "system":
-            system_message = copy.deepcopy(messages[0])
+            system_message = messages[0] if copy_safe else copy.deepcopy(messages[0])
             post_transform_messages.pop(0)
 
         for transform in self._transforms:
             # deepcopy in case pre_transform_messages will later be used for logs printing
             pre_transform_messages = (
-                copy.deepcopy(post_transform_messages) if self._verbose else post_transform_messages
+                copy.deepcopy(post_transform_messages) if self._verbose and not copy_safe else post_transform_messages
             )
             post_transform_messages = transform.apply_transform(pre_transform_messages)
 
@@ -6,9 +6,9 @@
 # SPDX-License-Identifier: MIT
 import copy
 import sys
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional, Protocol, Tuple, Union
 
-import tiktoken
 from termcolor import colored
 
 from autogen import token_count_utils
@@ -24,6 +24,9 @@ class MessageTransform(Protocol):
 
     Classes implementing this protocol should provide an `apply_transform` method
     that takes a list of messages and returns the transformed list.
+
+    A transform that never modifies the messages it is given, returning new dicts for the ones it changes, may set
+    `copy_safe` to True. `TransformMessages` then skips deep-copying the history for it.
     """
 
     def apply_transform(self, messages: List[Dict]) -> List[Dict]:
@@ -59,6 +62,9 @@ class MessageHistoryLimiter:
     It trims the conversation history by removing older messages, retaining only the most recent messages.
     """
 
+    # Only selects messages, never modifies them
+    copy_safe = True
+
     def __init__(self, max_messages: Optional[int] = None, keep_first_message: bool = False):
         """
         Args:
@@ -153,8 +159,17 @@ class MessageTokenLimiter:
         remaining messages get discarded.
     5. The truncated conversation history is reconstructed by prepending the messages to a new list to preserve the
         original message order.
+
+    With `incremental=True` the limiter remembers, per conversation, the token count of every message content it has
+    seen and a running total for the `min_tokens` check. Histories only grow between replies, so each call tokenizes
+    just the new messages and the one cut at the `max_tokens` boundary, instead of re-encoding the whole history. The
+    result is the same; messages whose content is unchanged are returned as is rather than deep-copied.
     """
 
+    # Bounds for the incremental mode caches
+    _MAX_CACHED_CONTENTS = 10000
+    _MAX_CONVERSATIONS = 128
+
     def __init__(
         self,
         max_tokens_per_message: Optional[int] = None,
@@ -163,6 +178,7 @@ class MessageTokenLimiter:
         model: str = "gpt-3.5-turbo-0613",
         filter_dict: Optional[Dict] = None,
         exclude_filter: bool = True,
+        incremental: bool = False,
     ):
         """
         Args:
@@ -177,6 +193,8 @@ class MessageTokenLimiter:
                 If None, no filters will be applied.
             exclude_filter (bool): If exclude filter is True (the default value), messages that match the filter will be
                 excluded from token truncation. If False, messages that match the filter will be truncated.
+            incremental (bool): Whether to cache token counts across calls so that each call only tokenizes new or
+                truncated messages. Meant for a limiter that sees the same growing conversations on every reply.
         """
         self._model = model
         self._max_tokens_per_message = self._validate_max_tokens(max_tokens_per_message)
@@ -184,6 +202,17 @@ class MessageTokenLimiter:
         self._min_tokens = self._validate_min_tokens(min_tokens, max_tokens)
         self._filter_dict = filter_dict
         self._exclude_filter = exclude_filter
+        self._incremental = incremental
+        # content key -> token count, and content key -> (truncated content, its token count)
+        self._content_tokens: "OrderedDict[Any, int]" = OrderedDict()
+        self._truncated_contents: "OrderedDict[Any, Tuple[Union[str, List], int]]" = OrderedDict()
+        # hash of a conversation prefix -> token total of that prefix
+        self._conversations: "OrderedDict[int, int]" = OrderedDict()
+
+    @property
+    def copy_safe(self) -> bool:
+        """Whether the input messages are left untouched, which holds in incremental mode."""
+        return self._incremental
 
     def apply_transform(self, messages: List[Dict]) -> List[Dict]:
         """Applies token truncation to the conversation history.
@@ -198,6 +227,9 @@ class MessageTokenLimiter:
         assert self._max_tokens is not None
         assert self._min_tokens is not None
 
+        if self._incremental:
+            return self._apply_transform_incremental(messages)
+
         # if the total number of tokens in the messages is less than the min_tokens, return the messages as is
         if not transforms_util.min_tokens_reached(messages, self._min_tokens):
             return messages
@@ -237,12 +269,110 @@ class MessageTokenLimiter:
 
         return processed_messages
 
+    def _apply_transform_incremental(self, messages: List[Dict]) -> List[Dict]:
+        """Same truncation as `apply_transform`, reusing token counts from earlier calls."""
+        if self._min_tokens and self._messages_tokens(messages) < self._min_tokens:
+            return messages
+
+        processed_messages = []
+        processed_messages_tokens = 0
+
+        for msg in reversed(messages):
+            content = msg.get("content")
+            if not transforms_util.is_content_right_type(content):
+                processed_messages.append(msg)
+                continue
+
+            if not transforms_util.should_transform_message(msg, self._filter_dict, self._exclude_filter):
+                processed_messages.append(msg)
+                processed_messages_tokens += self._count_content_tokens(content)
+                continue
+
+            remaining_tokens = self._max_tokens - processed_messages_tokens
+            if remaining_tokens - self._max_tokens_per_message < 0:
+                truncated = self._truncate_str_to_tokens(content, remaining_tokens)
+                processed_messages.append({**msg, "content": truncated})
+                break
+
+            truncated, msg_tokens = self._truncate_to_message_limit(content)
+            processed_messages.append(msg if truncated is content else {**msg, "content": truncated})
+            processed_messages_tokens += msg_tokens
+
+        processed_messages.reverse()
+        return processed_messages
+
+    @staticmethod
+    def _content_key(content: Any) -> Any:
+        # Strings survive deepcopy as the same object with a cached hash, so lookups stay O(1)
+        if content is None or isinstance(content, str):
+            return content
+        return transforms_util.cache_key(content)
+
+    @classmethod
+    def _remember(cls, cache: OrderedDict, key: Any, value: Any) -> None:
+        cache[key] = value
+        if len(cache) > cls._MAX_CACHED_CONTENTS:
+            cache.popitem(last=False)
+
+    def _count_content_tokens(self, content: Any) -> int:
+        key = self._content_key(content)
+        tokens = self._content_tokens.get(key)
+        if tokens is None:
+            tokens = transforms_util.count_text_tokens(content)
+            self._remember(self._content_tokens, key, tokens)
+        else:
+            self._content_tokens.move_to_end(key)
+        return tokens
+
+    def _truncate_to_message_limit(self, content: Union[str, List]) -> Tuple[Union[str, List], int]:
+        key = self._content_key(content)
+        cached = self._truncated_contents.get(key)
+        if cached is None:
+            truncated = self._truncate_str_to_tokens(content, self._max_tokens_per_message)
+            if truncated == content:
+                truncated = None
+            cached = (truncated, transforms_util.count_text_tokens(content if truncated is None else truncated))
+            self._remember(self._truncated_contents, key, cached)
+        else:
+            self._truncated_contents.move_to_end(key)
+        truncated, tokens = cached
+        return (content if truncated is None else truncated), tokens
+
+    def _messages_tokens(self, messages: List[Dict]) -> int:
+        """Total text tokens of the messages, counting only those after the longest prefix counted before."""
+        if not messages:
+            return 0
+        # A prefix is identified by a hash chained over its messages, so a total is only reused by a history that
+        # starts with exactly the messages it was counted for
+        prefixes = []
+        prefix = None
+        for msg in messages:
+            prefix = hash((prefix, msg.get("role"), self._content_key(msg.get("content"))))
+            prefixes.append(prefix)
+
+        num_counted, total = 0, 0
+        for i in range(len(prefixes) - 1, -1, -1):
+            cached = self._conversations.get(prefixes[i])
+            if cached is not None:
+                num_counted, total = i + 1, cached
+                break
+
+        for msg in messages[num_counted:]:
+            if "content" in msg:
+                total += self._count_content_tokens(msg["content"])
+        self._conversations[prefixes[-1]] = total
+        self._conversations.move_to_end(prefixes[-1])
+        if len(self._conversations) > self._MAX_CONVERSATIONS:
+            self._conversations.popitem(last=False)
+        return total
+
     def get_logs(self, pre_transform_messages: List[Dict], post_transform_messages: List[Dict]) -> Tuple[str, bool]:
+        count_tokens = self._count_content_tokens if self._incremental else transforms_util.count_text_tokens
         pre_transform_messages_tokens = sum(
-            transforms_util.count_text_tokens(msg["content"]) for msg in pre_transform_messages if "content" in msg
+            count_tokens(msg["content"]) for msg in pre_transform_messages if "content" in msg
         )
         post_transform_messages_tokens = sum(
-            transforms_util.count_text_tokens(msg["content"]) for msg in post_transform_messages if "content" in msg
+            count_tokens(msg["content"]) for msg in post_transform_messages if "content" in msg
         )
 
         if post_transform_messages_tokens < pre_transform_messages_tokens:
@@ -273,7 +403,7 @@ class MessageTokenLimiter:
         return tmp_contents
 
     def _truncate_tokens(self, text: str, n_tokens: int) -> str:
-        encoding = tiktoken.encoding_for_model(self._model)  # Get the appropriate tokenizer
+        encoding = token_count_utils._get_encoding(self._model)  # Get the appropriate tokenizer
 
         encoded_tokens = encoding.encode(text)
         truncated_tokens = encoded_tokens[:n_tokens]
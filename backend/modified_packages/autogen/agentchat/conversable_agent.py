@@ -5,6 +5,7 @@
 # Portions derived from  https://github.com/microsoft/autogen are under the MIT License.
 # SPDX-License-Identifier: MIT
 import asyncio
+import contextvars
 import copy
 import functools
 import inspect
@@ -20,6 +21,7 @@ from openai import BadRequestError
 from autogen.agentchat.chat import _post_process_carryover_item
 from autogen.exception_utils import InvalidCarryOverType, SenderRequired
 
+from .. import tracing
 from .._pydantic import model_dump
 from ..cache.cache import AbstractCache
 from ..code_utils import (
@@ -51,6 +53,16 @@ logger = logging.getLogger(__name__)
 F = TypeVar("F", bound=Callable[..., Any])
 
 
+def _chat_trace_attributes(agent: Agent, recipient: Optional[Agent] = None, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+    return {"agent": agent.name, "recipient": getattr(recipient, "name", None)}
+
+
+def _reply_trace_attributes(
+    agent: Agent, messages: Optional[List[Dict]] = None, sender: Optional[Agent] = None, **kwargs: Any
+) -> Dict[str, Any]:
+    return {"agent": agent.name, "sender": getattr(sender, "name", None)}
+
+
 class ConversableAgent(LLMAgent):
     """(In preview) A class for generic conversable agents which can be configured as assistant or user proxy.
 
@@ -67,6 +79,14 @@ class ConversableAgent(LLMAgent):
 
     DEFAULT_CONFIG = False  # False or dict, the default config for llm inference
     MAX_CONSECUTIVE_AUTO_REPLY = 100  # maximum number of consecutive auto replies (subject to future change)
+    # the default config for executing tool calls in async chats, see `tool_execution_config` in __init__
+    DEFAULT_TOOL_EXECUTION_CONFIG = {
+        "max_concurrency": None,
+        "timeout": None,
+        "timeouts": {},
+        "exclusive": (),
+        "sync_in_thread": True,
+    }
 
     DEFAULT_SUMMARY_PROMPT = "Summarize the takeaway from the conversation. Do not add any introductory phrases."
     DEFAULT_SUMMARY_METHOD = "last_msg"
@@ -87,6 +107,7 @@ class ConversableAgent(LLMAgent):
         chat_messages: Optional[Dict[Agent, List[Dict]]] = None,
         silent: Optional[bool] = None,
         websocket: Optional[WebSocket] = None,
+        tool_execution_config: Optional[Dict[str, Any]] = None,
     ):
         """
         Args:
@@ -137,6 +158,20 @@ class ConversableAgent(LLMAgent):
                 resume previous had conversations. Defaults to an empty chat history.
             silent (bool or None): (Experimental) whether to print the message sent. If None, will use the value of
                 silent in each function.
+            tool_execution_config (dict or None): how the tool calls of a message are executed in async chats.
+                The tool calls of one message run concurrently and their responses keep the order of the calls.
+                Keys left out take their value from DEFAULT_TOOL_EXECUTION_CONFIG:
+                - max_concurrency (Optional, int): the maximum number of tool calls this agent runs at once,
+                    across all its replies. None for no limit.
+                - timeout (Optional, float): seconds after which a tool call is cancelled and answered with an error.
+                    None for no timeout.
+                - timeouts (Optional, dict[str, float]): timeouts of specific tools by name, overriding `timeout`.
+                    A None value turns the timeout off for that tool.
+                - exclusive (Optional, Iterable[str]): names of tools that run one at a time, in the order of the
+                    calls, such as tools that ask the user questions. Other tools still run alongside them.
+                - sync_in_thread (Optional, bool): whether to run sync tools in a worker thread, so they do not block
+                    the event loop. A sync tool that times out is answered with an error, but its thread runs on
+                    until the function returns.
         """
         # we change code_execution_config below and we have to make sure we don't change the input
         # in case of UserProxyAgent, without this we could even change the default value {}
@@ -190,6 +225,11 @@ class ConversableAgent(LLMAgent):
             else {name: callable for name, callable in function_map.items() if self._assert_valid_name(name)}
         )
         self._default_auto_reply = default_auto_reply
+        self._tool_execution_config = {**self.DEFAULT_TOOL_EXECUTION_CONFIG, **(tool_execution_config or {})}
+        self._tool_semaphore: Optional[asyncio.Semaphore] = None
+        self._tool_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._exclusive_tool_lock: Optional[asyncio.Lock] = None
+        self._exclusive_tool_lock_loop: Optional[asyncio.AbstractEventLoop] = None
         self._reply_func_list = []
         self._human_input = []
         self.reply_at_receive = defaultdict(bool)
@@ -977,6 +1017,7 @@ class ConversableAgent(LLMAgent):
 
             raise RuntimeError(msg)
 
+    @tracing.traced("agent.initiate_chat", _chat_trace_attributes)
     def initiate_chat(
         self,
         recipient: "ConversableAgent",
@@ -1121,6 +1162,7 @@ class ConversableAgent(LLMAgent):
         return chat_result
 
 
+    @tracing.traced("agent.initiate_chat", _chat_trace_attributes)
     async def a_initiate_chat(
             self,
             recipient: "ConversableAgent",
@@ -1432,7 +1474,26 @@ class ConversableAgent(LLMAgent):
         return (False, None) if extracted_response is None else (True, extracted_response)
 
     def _generate_oai_reply_from_client(self, llm_client, messages, cache) -> Union[str, Dict, None]:
-        # unroll tool_responses
+        # TODO: #1143 handle token limit exceeded error
+        response = llm_client.create(
+            context=messages[-1].pop("context", None),
+            messages=self._unroll_tool_responses(messages),
+            cache=cache,
+            agent=self,
+        )
+        return self._extract_oai_reply(llm_client, response)
+
+    async def _a_generate_oai_reply_from_client(self, llm_client, messages, cache) -> Union[str, Dict, None]:
+        response = await llm_client.a_create(
+            context=messages[-1].pop("context", None),
+            messages=self._unroll_tool_responses(messages),
+            cache=cache,
+            agent=self,
+        )
+        return self._extract_oai_reply(llm_client, response)
+
+    @staticmethod
+    def _unroll_tool_responses(messages: List[Dict]) -> List[Dict]:
         all_messages = []
         for message in messages:
             tool_responses = message.get("tool_responses", [])
@@ -1443,11 +1504,9 @@ class ConversableAgent(LLMAgent):
                     all_messages.append({key: message[key] for key in message if key != "tool_responses"})
             else:
                 all_messages.append(message)
+        return all_messages
 
-        # TODO: #1143 handle token limit exceeded error
-        response = llm_client.create(
-            context=messages[-1].pop("context", None), messages=all_messages, cache=cache, agent=self
-        )
+    def _extract_oai_reply(self, llm_client, response) -> Union[str, Dict, None]:
         extracted_response = llm_client.extract_text_or_completion_object(response)[0]
 
         if extracted_response is None:
@@ -1477,7 +1536,25 @@ class ConversableAgent(LLMAgent):
         sender: Optional[Agent] = None,
         config: Optional[Any] = None,
     ) -> Tuple[bool, Union[str, Dict, None]]:
-        """Generate a reply using autogen.oai asynchronously."""
+        """Generate a reply using autogen.oai asynchronously.
+
+        Awaits `OpenAIWrapper.a_create`, so a waiting chat holds no thread of the default executor. Subclasses that
+        override only the synchronous reply path, and clients without `a_create`, still run `generate_oai_reply` in
+        the executor.
+        """
+        client = self.client if config is None else config
+        overridden = (
+            type(self).generate_oai_reply is not ConversableAgent.generate_oai_reply
+            or type(self)._generate_oai_reply_from_client is not ConversableAgent._generate_oai_reply_from_client
+        )
+        if client is not None and not overridden and hasattr(client, "a_create"):
+            if messages is None:
+                messages = self._oai_messages[sender]
+            extracted_response = await self._a_generate_oai_reply_from_client(
+                client, self._oai_system_message + messages, self.client_cache
+            )
+            return (False, None) if extracted_response is None else (True, extracted_response)
+
         iostream = IOStream.get_default()
 
         def _generate_oai_reply(
@@ -1486,10 +1563,17 @@ class ConversableAgent(LLMAgent):
             with IOStream.set_default(iostream):
                 return self.generate_oai_reply(*args, **kwargs)
 
+        # Run in a copy of the context so the reply's spans nest under the current one
         return await asyncio.get_event_loop().run_in_executor(
             None,
             functools.partial(
-                _generate_oai_reply, self=self, iostream=iostream, messages=messages, sender=sender, config=config
+                contextvars.copy_context().run,
+                _generate_oai_reply,
+                self=self,
+                iostream=iostream,
+                messages=messages,
+                sender=sender,
+                config=config,
             ),
         )
 
@@ -1747,13 +1831,49 @@ class ConversableAgent(LLMAgent):
     async def _a_execute_tool_call(self, tool_call):
         id = tool_call["id"]
         function_call = tool_call.get("function", {})
-        _, func_return = await self.a_execute_function(function_call)
+        if function_call.get("name") in self._tool_execution_config["exclusive"]:
+            # Taken before a concurrency slot, so a call waiting for its turn does not hold one
+            async with self._get_exclusive_tool_lock():
+                func_return = await self._a_execute_function_limited(function_call)
+        else:
+            func_return = await self._a_execute_function_limited(function_call)
         return {
             "tool_call_id": id,
             "role": "tool",
             "content": func_return.get("content", ""),
         }
 
+    async def _a_execute_function_limited(self, function_call: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute a function call within the agent's tool concurrency limit and return its result dict."""
+        semaphore = self._get_tool_semaphore()
+        if semaphore is None:
+            _, func_return = await self.a_execute_function(function_call)
+        else:
+            async with semaphore:
+                _, func_return = await self.a_execute_function(function_call)
+        return func_return
+
+    def _get_exclusive_tool_lock(self) -> asyncio.Lock:
+        """The lock under which the agent's exclusive tools run, one call at a time."""
+        loop = asyncio.get_running_loop()
+        # A lock is bound to the loop it is first used in
+        if self._exclusive_tool_lock is None or self._exclusive_tool_lock_loop is not loop:
+            self._exclusive_tool_lock = asyncio.Lock()
+            self._exclusive_tool_lock_loop = loop
+        return self._exclusive_tool_lock
+
+    def _get_tool_semaphore(self) -> Optional[asyncio.Semaphore]:
+        """The semaphore limiting the tool calls this agent runs at once, or None without a limit."""
+        max_concurrency = self._tool_execution_config["max_concurrency"]
+        if max_concurrency is None:
+            return None
+        loop = asyncio.get_running_loop()
+        # A semaphore is bound to the loop it is first used in
+        if self._tool_semaphore is None or self._tool_semaphore_loop is not loop:
+            self._tool_semaphore = asyncio.Semaphore(max_concurrency)
+            self._tool_semaphore_loop = loop
+        return self._tool_semaphore
+
     async def a_generate_tool_calls_reply(
         self,
         messages: Optional[List[Dict]] = None,
@@ -1766,11 +1886,17 @@ class ConversableAgent(LLMAgent):
         if messages is None:
             messages = self._oai_messages[sender]
         message = messages[-1]
-        async_tool_calls = []
-        for tool_call in message.get("tool_calls", []):
-            async_tool_calls.append(self._a_execute_tool_call(tool_call))
-        if async_tool_calls:
-            tool_returns = await asyncio.gather(*async_tool_calls)
+        tasks = [
+            asyncio.ensure_future(self._a_execute_tool_call(tool_call)) for tool_call in message.get("tool_calls", [])
+        ]
+        if tasks:
+            try:
+                # gather keeps the order of the calls, and cancels them all if this reply is cancelled
+                tool_returns = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
             return True, {
                 "role": "tool",
                 "tool_responses": tool_returns,
@@ -2150,6 +2276,7 @@ class ConversableAgent(LLMAgent):
 
         return False, None
 
+    @tracing.traced("agent.generate_reply", _reply_trace_attributes)
     def generate_reply(
         self,
         messages: Optional[List[Dict[str, Any]]] = None,
@@ -2220,6 +2347,7 @@ class ConversableAgent(LLMAgent):
                     return reply
         return self._default_auto_reply
 
+    @tracing.traced("agent.generate_reply", _reply_trace_attributes)
     async def a_generate_reply(
         self,
         messages: Optional[List[Dict[str, Any]]] = None,
@@ -2478,11 +2606,13 @@ class ConversableAgent(LLMAgent):
                     colored(f"\n>>>>>>>> EXECUTING FUNCTION {func_name}...", "magenta"),
                     flush=True,
                 )
-                try:
-                    content = func(**arguments)
-                    is_exec_success = True
-                except Exception as e:
-                    content = f"Error: {e}"
+                with tracing.span("tool.call", tool=func_name) as span:
+                    try:
+                        content = func(**arguments)
+                        is_exec_success = True
+                    except Exception as e:
+                        content = f"Error: {e}"
+                        span.record_error(e)
         else:
             content = f"Error: Function {func_name} not found."
 
@@ -2535,15 +2665,24 @@ class ConversableAgent(LLMAgent):
                     colored(f"\n>>>>>>>> EXECUTING ASYNC FUNCTION {func_name}...", "magenta"),
                     flush=True,
                 )
-                try:
-                    if inspect.iscoroutinefunction(func):
-                        content = await func(**arguments)
-                    else:
-                        # Fallback to sync function if the function is not async
-                        content = func(**arguments)
-                    is_exec_success = True
-                except Exception as e:
-                    content = f"Error: {e}"
+                timeout = self._tool_execution_config["timeouts"].get(func_name, self._tool_execution_config["timeout"])
+                with tracing.span("tool.call", tool=func_name) as span:
+                    try:
+                        if inspect.iscoroutinefunction(func):
+                            content = await asyncio.wait_for(func(**arguments), timeout)
+                        elif self._tool_execution_config["sync_in_thread"]:
+                            # to_thread copies the context, so the IOStream and the trace follow the call
+                            content = await asyncio.wait_for(asyncio.to_thread(func, **arguments), timeout)
+                        else:
+                            # Fallback to sync function if the function is not async
+                            content = func(**arguments)
+                        is_exec_success = True
+                    except asyncio.TimeoutError as e:
+                        content = f"Error: Function {func_name} timed out after {timeout} seconds."
+                        span.record_error(e)
+                    except Exception as e:
+                        content = f"Error: {e}"
+                        span.record_error(e)
         else:
             content = f"Error: Function {func_name} not found."
 
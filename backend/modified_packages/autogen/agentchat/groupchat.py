@@ -13,6 +13,7 @@ import sys
 from dataclasses import dataclass, field
 from typing import Callable, Dict, List, Literal, Optional, Tuple, Union
 
+from .. import tracing
 from ..code_utils import content_str
 from ..exception_utils import AgentNameConflict, NoEligibleSpeaker, UndefinedNextAgent
 from ..formatting_utils import colored
@@ -26,6 +27,11 @@ from .conversable_agent import ConversableAgent
 logger = logging.getLogger(__name__)
 
 
+def _select_speaker_trace_attributes(groupchat: "GroupChat", last_speaker: Agent, *args, **kwargs) -> Dict:
+    method = groupchat.speaker_selection_method
+    return {"last_speaker": last_speaker.name, "method": method if isinstance(method, str) else "custom"}
+
+
 @dataclass
 class GroupChat:
     """(In preview) A group chat class that contains the following data fields:
@@ -529,6 +535,7 @@ class GroupChat:
                 select_speaker_messages[-1] = dict(select_speaker_messages[-1], tool_calls=None)
         return selected_agent, graph_eligible_agents, select_speaker_messages
 
+    @tracing.traced("groupchat.select_speaker", _select_speaker_trace_attributes)
     def select_speaker(self, last_speaker: Agent, selector: ConversableAgent) -> Agent:
         """Select the next speaker (with requery)."""
 
@@ -543,6 +550,7 @@ class GroupChat:
         # auto speaker selection with 2-agent chat
         return self._auto_select_speaker(last_speaker, selector, messages, agents)
 
+    @tracing.traced("groupchat.select_speaker", _select_speaker_trace_attributes)
     async def a_select_speaker(self, last_speaker: Agent, selector: ConversableAgent) -> Agent:
         """Select the next speaker (with requery), asynchronously."""
 
@@ -37,6 +37,8 @@ class Cache(AbstractCache):
         "redis_url",
         "cache_path_root",
         "cosmos_db_config",
+        "in_memory_config",
+        "tiered_config",
     ]
 
     @staticmethod
@@ -67,6 +69,85 @@ class Cache(AbstractCache):
         """
         return Cache({"cache_seed": cache_seed, "cache_path_root": cache_path_root})
 
+    @staticmethod
+    def in_memory(
+        cache_seed: Union[str, int] = 42,
+        max_items: Optional[int] = None,
+        max_bytes: Optional[int] = 64 * 1024 * 1024,
+        ttl: Optional[float] = None,
+        copy_on_read: bool = True,
+    ) -> "Cache":
+        """
+        Create a bounded in-process cache instance with LRU and TTL eviction.
+
+        Args:
+            cache_seed (Union[str, int], optional): A seed for the cache. Defaults to 42.
+            max_items (int, optional): Maximum number of entries. Defaults to no limit.
+            max_bytes (int, optional): Maximum total pickled size of the entries. Defaults to 64 MiB.
+            ttl (float, optional): Seconds an entry stays valid. Defaults to no expiry.
+            copy_on_read (bool, optional): Return a fresh copy on every read. Defaults to True.
+
+        Returns:
+            Cache: A Cache instance configured for in-memory caching.
+        """
+        return Cache(
+            {
+                "cache_seed": cache_seed,
+                "in_memory_config": {
+                    "max_items": max_items,
+                    "max_bytes": max_bytes,
+                    "ttl": ttl,
+                    "copy_on_read": copy_on_read,
+                },
+            }
+        )
+
+    @staticmethod
+    def tiered(
+        cache_seed: Union[str, int] = 42,
+        redis_url: Optional[str] = None,
+        cache_path_root: str = ".cache",
+        max_items: Optional[int] = None,
+        max_bytes: Optional[int] = 64 * 1024 * 1024,
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+        shared: bool = False,
+    ) -> "Cache":
+        """
+        Create a two-level cache: an in-process LRU cache in front of a Redis or Disk cache.
+
+        Reads are served from memory when possible and promoted from the shared cache otherwise; writes go
+        through to both.
+
+        Args:
+            cache_seed (Union[str, int], optional): A seed for the cache. Defaults to 42.
+            redis_url (str, optional): The URL for the Redis server used as L2. Defaults to a Disk cache.
+            cache_path_root (str, optional): The root path for the Disk cache. Defaults to ".cache".
+            max_items (int, optional): Maximum number of in-memory entries. Defaults to no limit.
+            max_bytes (int, optional): Maximum total pickled size of the in-memory entries. Defaults to 64 MiB.
+            ttl (float, optional): Seconds an in-memory entry stays valid. Defaults to no expiry.
+            negative_ttl (float, optional): Seconds to remember keys missing from L2. Defaults to no negative caching.
+            shared (bool, optional): Whether the cache is shared process-wide. Exiting a `with` block then leaves L2
+                open, and the owner calls `close` at shutdown. Defaults to False.
+
+        Returns:
+            Cache: A Cache instance configured for tiered caching.
+        """
+        return Cache(
+            {
+                "cache_seed": cache_seed,
+                "redis_url": redis_url,
+                "cache_path_root": cache_path_root,
+                "tiered_config": {
+                    "max_items": max_items,
+                    "max_bytes": max_bytes,
+                    "ttl": ttl,
+                    "negative_ttl": negative_ttl,
+                    "shared": shared,
+                },
+            }
+        )
+
     @staticmethod
     def cosmos_db(
         connection_string: Optional[str] = None,
@@ -119,6 +200,8 @@ class Cache(AbstractCache):
             redis_url=self.config.get("redis_url"),
             cache_path_root=self.config.get("cache_path_root"),
             cosmosdb_config=self.config.get("cosmos_db_config"),
+            in_memory_config=self.config.get("in_memory_config"),
+            tiered_config=self.config.get("tiered_config"),
         )
 
     def __enter__(self) -> "Cache":
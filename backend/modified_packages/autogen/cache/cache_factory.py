@@ -10,6 +10,8 @@ from typing import Any, Dict, Optional, Union
 
 from .abstract_cache_base import AbstractCache
 from .disk_cache import DiskCache
+from .lru_cache import LRUCache
+from .tiered_cache import TieredCache
 
 
 class CacheFactory:
@@ -19,12 +21,16 @@ class CacheFactory:
         redis_url: Optional[str] = None,
         cache_path_root: str = ".cache",
         cosmosdb_config: Optional[Dict[str, Any]] = None,
+        in_memory_config: Optional[Dict[str, Any]] = None,
+        tiered_config: Optional[Dict[str, Any]] = None,
     ) -> AbstractCache:
         """
         Factory function for creating cache instances.
 
-        This function decides whether to create a RedisCache, DiskCache, or CosmosDBCache instance
-        based on the provided parameters. If RedisCache is available and a redis_url is provided,
+        This function decides whether to create an LRUCache, RedisCache, DiskCache, or CosmosDBCache instance
+        based on the provided parameters. If tiered_config is provided, the cache selected by the remaining
+        parameters becomes the L2 of a TieredCache with an LRUCache as L1. If in_memory_config is provided,
+        a bounded in-process LRUCache is created. If RedisCache is available and a redis_url is provided,
         a RedisCache instance is created. If connection_string, database_id, and container_id
         are provided, a CosmosDBCache is created. Otherwise, a DiskCache instance is used.
 
@@ -34,9 +40,13 @@ class CacheFactory:
             cache_path_root (str): Root path for the disk cache.
             cosmosdb_config (Optional[Dict[str, str]]): Dictionary containing 'connection_string',
                                                        'database_id', and 'container_id' for Cosmos DB cache.
+            in_memory_config (Optional[Dict[str, Any]]): Keyword arguments for LRUCache, e.g. 'max_items',
+                                                        'max_bytes' and 'ttl'.
+            tiered_config (Optional[Dict[str, Any]]): Keyword arguments for the L1 LRUCache of a TieredCache,
+                                                     plus optional 'negative_ttl' and 'shared'.
 
         Returns:
-            An instance of RedisCache, DiskCache, or CosmosDBCache.
+            An instance of TieredCache, LRUCache, RedisCache, DiskCache, or CosmosDBCache.
 
         Examples:
 
@@ -60,7 +70,27 @@ class CacheFactory:
             )
         ```
 
+        Creating a bounded in-memory cache:
+        ```python
+        memory_cache = cache_factory("myseed", in_memory_config={"max_bytes": 32 * 1024 * 1024, "ttl": 3600})
+        ```
+
+        Creating a tiered cache with an in-memory L1 in front of Redis:
+        ```python
+        tiered_cache = cache_factory("myseed", "redis://localhost:6379/0", tiered_config={"max_items": 1000})
+        ```
+
         """
+        if tiered_config is not None:
+            l1_config = dict(tiered_config)
+            negative_ttl = l1_config.pop("negative_ttl", None)
+            shared = l1_config.pop("shared", False)
+            l2 = CacheFactory.cache_factory(seed, redis_url, cache_path_root, cosmosdb_config)
+            return TieredCache(LRUCache(seed, **l1_config), l2, negative_ttl=negative_ttl, shared=shared)
+
+        if in_memory_config is not None:
+            return LRUCache(seed, **in_memory_config)
+
         if redis_url:
             try:
                 from .redis_cache import RedisCache
@@ -0,0 +1,227 @@
+# Copyright (c) 2023 - 2024, Owners of https://github.com/autogen-ai
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Portions derived from  https://github.com/microsoft/autogen are under the MIT License.
+# SPDX-License-Identifier: MIT
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from types import TracebackType
+from typing import Any, Callable, Dict, Optional, Tuple, Type, Union
+
+from .abstract_cache_base import AbstractCache
+
+if sys.version_info >= (3, 11):
+    from typing import Self
+else:
+    from typing_extensions import Self
+
+
+class LRUCache(AbstractCache):
+    """
+    Bounded in-process cache with LRU and TTL eviction.
+
+    Entries are evicted least recently used first once either `max_items` or `max_bytes` is exceeded, and expire
+    `ttl` seconds after they were set. Values are pickled on `set`, which gives an exact byte size for the budget and,
+    with `copy_on_read`, hands every reader a fresh copy the way `DiskCache` does, so callers can mutate cached
+    responses safely.
+
+    All operations run under a lock and never await, so one instance can be shared by threads and by coroutines on
+    an event loop.
+
+    Attributes:
+        hits (int): Lookups that returned a value.
+        misses (int): Lookups that found nothing or an expired entry.
+        evictions (int): Entries dropped to stay within `max_items` or `max_bytes`.
+        expirations (int): Entries dropped because their TTL passed.
+        bytes (int): Pickled size of all stored values.
+    """
+
+    def __init__(
+        self,
+        seed: Union[str, int] = "",
+        max_items: Optional[int] = None,
+        max_bytes: Optional[int] = 64 * 1024 * 1024,
+        ttl: Optional[float] = None,
+        copy_on_read: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the LRUCache instance.
+
+        Args:
+            seed (Union[str, int]): A namespace prefixed to every key.
+            max_items (Optional[int]): Maximum number of entries. None for no limit.
+            max_bytes (Optional[int]): Maximum total pickled size of the values. None for no limit.
+            ttl (Optional[float]): Seconds an entry stays valid after it is set. None for no expiry.
+            copy_on_read (bool): Return a fresh unpickled copy on every `get` instead of the stored object.
+            clock (Callable[[], float]): Monotonic clock, overridable for tests.
+        """
+        if max_items is not None and max_items <= 0:
+            raise ValueError("max_items must be None or greater than 0")
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError("max_bytes must be None or greater than 0")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be None or greater than 0")
+        self._seed = str(seed)
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.copy_on_read = copy_on_read
+        self._clock = clock
+        # key -> (stored value, size in bytes, expiry timestamp or None)
+        self._entries: "OrderedDict[str, Tuple[Any, int, Optional[float]]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bytes = 0
+
+    def _prefixed_key(self, key: str) -> str:
+        separator = "_" if self._seed else ""
+        return f"{self._seed}{separator}{key}"
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def get(self, key: str, default: Optional[Any] = None) -> Optional[Any]:
+        """
+        Retrieve an item from the cache and mark it as most recently used.
+
+        Args:
+            key (str): The key identifying the item in the cache.
+            default (optional): The default value to return if the key is not found or has expired.
+
+        Returns:
+            The value associated with the key if found, else the default value.
+        """
+        key = self._prefixed_key(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            stored, _, expires_at = entry
+            if expires_at is not None and expires_at <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return pickle.loads(stored) if self.copy_on_read else stored
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Set an item in the cache, evicting least recently used entries to make room.
+
+        Values larger than `max_bytes` on their own are not stored.
+
+        Args:
+            key (str): The key under which the item is to be stored.
+            value: The value to be stored in the cache.
+        """
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            size = len(data)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            if self.copy_on_read:
+                raise
+            data, size = None, sys.getsizeof(value)
+        stored = data if self.copy_on_read else value
+        key = self._prefixed_key(key)
+        expires_at = self._clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = (stored, size, expires_at)
+            self.bytes += size
+            self._evict()
+
+    def _evict(self) -> None:
+        now = self._clock()
+        while self._entries and (
+            (self.max_items is not None and len(self._entries) > self.max_items)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            key, (_, _, expires_at) = next(iter(self._entries.items()))
+            self._remove(key)
+            if expires_at is not None and expires_at <= now:
+                self.expirations += 1
+            else:
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        """
+        Remove an item from the cache if present.
+
+        Args:
+            key (str): The key identifying the item in the cache.
+        """
+        with self._lock:
+            key = self._prefixed_key(key)
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Remove all items; the hit and miss counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return a snapshot of the cache counters.
+
+        Returns:
+            A dict with hits, misses, hit_rate, evictions, expirations, items and bytes.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "items": len(self._entries),
+                "bytes": self.bytes,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def close(self) -> None:
+        """
+        Close the cache. Entries are kept, since `OpenAIWrapper` closes the cache after every lookup.
+        """
+        pass
+
+    def __enter__(self) -> Self:
+        """
+        Enter the runtime context related to the object.
+
+        Returns:
+            self: The instance itself.
+        """
+        return self
+
+    def __exit__(
+        self, exc_type: Optional[Type[BaseException]], exc_val: Optional[BaseException], exc_tb: Optional[TracebackType]
+    ) -> None:
+        """
+        Exit the runtime context related to the object.
+
+        Args:
+            exc_type: The exception type if an exception was raised in the context.
+            exc_value: The exception value if an exception was raised in the context.
+            traceback: The traceback if an exception was raised in the context.
+        """
+        self.close()
@@ -0,0 +1,152 @@
+# Copyright (c) 2023 - 2024, Owners of https://github.com/autogen-ai
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Portions derived from  https://github.com/microsoft/autogen are under the MIT License.
+# SPDX-License-Identifier: MIT
+import sys
+import threading
+from types import TracebackType
+from typing import Any, Dict, Optional, Type
+
+from .abstract_cache_base import AbstractCache
+from .lru_cache import LRUCache
+
+if sys.version_info >= (3, 11):
+    from typing import Self
+else:
+    from typing_extensions import Self
+
+_MISSING = object()
+
+
+class TieredCache(AbstractCache):
+    """
+    Two-level cache: a hot in-process LRUCache (L1) in front of a shared backend such as DiskCache or RedisCache (L2).
+
+    - Reads check L1 first; an L2 hit is promoted into L1, so repeated lookups cost no disk access or network
+      round trip.
+    - Writes go through to both levels, so other processes and replicas sharing L2 see them.
+    - With `negative_ttl`, keys missing from L2 are remembered for that many seconds and later lookups skip L2.
+      A `set` on the key clears the negative entry.
+    - A `shared` instance is used by many callers at once, so leaving a `with` block does not close it; call
+      `close` at shutdown instead.
+
+    Attributes:
+        l1 (LRUCache): The in-process cache.
+        l2 (AbstractCache): The shared cache.
+        l2_hits (int): L1 misses answered by L2.
+        l2_misses (int): Lookups found in neither level.
+        negative_hits (int): Lookups answered from the negative cache.
+    """
+
+    def __init__(self, l1: LRUCache, l2: AbstractCache, negative_ttl: Optional[float] = None, shared: bool = False):
+        """
+        Initialize the TieredCache instance.
+
+        Args:
+            l1 (LRUCache): The in-process cache checked first.
+            l2 (AbstractCache): The shared cache behind it.
+            negative_ttl (Optional[float]): Seconds to remember L2 misses. None disables negative caching.
+            shared (bool): Whether the instance is shared process-wide. Exiting a `with` block then leaves L2 open.
+        """
+        self.l1 = l1
+        self.l2 = l2
+        self.shared = shared
+        self._negative = (
+            LRUCache(max_items=max(l1.max_items or 10000, 1), max_bytes=None, ttl=negative_ttl, copy_on_read=False)
+            if negative_ttl
+            else None
+        )
+        self._lock = threading.Lock()
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.negative_hits = 0
+
+    def get(self, key: str, default: Optional[Any] = None) -> Optional[Any]:
+        """
+        Retrieve an item from L1, falling back to L2 and promoting what it finds.
+
+        Args:
+            key (str): The key identifying the item in the cache.
+            default (optional): The default value to return if the key is not found.
+
+        Returns:
+            The value associated with the key if found, else the default value.
+        """
+        value = self.l1.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self._negative is not None and self._negative.get(key) is not None:
+            with self._lock:
+                self.negative_hits += 1
+            return default
+
+        value = self.l2.get(key, _MISSING)
+        if value is _MISSING or value is None:
+            with self._lock:
+                self.l2_misses += 1
+            if self._negative is not None:
+                self._negative.set(key, True)
+            return default
+        with self._lock:
+            self.l2_hits += 1
+        self.l1.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Write an item to L1 and through to L2.
+
+        Args:
+            key (str): The key under which the item is to be stored.
+            value: The value to be stored in the cache.
+        """
+        self.l1.set(key, value)
+        self.l2.set(key, value)
+        if self._negative is not None:
+            self._negative.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return a snapshot of the counters of both levels.
+
+        Returns:
+            A dict with the L1 stats under "l1" and the L2 and negative cache counters.
+        """
+        with self._lock:
+            return {
+                "l1": self.l1.stats(),
+                "l2_hits": self.l2_hits,
+                "l2_misses": self.l2_misses,
+                "negative_hits": self.negative_hits,
+            }
+
+    def close(self) -> None:
+        """
+        Close L2. L1 keeps its entries, so a closed cache still serves what it holds in memory.
+        """
+        self.l2.close()
+
+    def __enter__(self) -> Self:
+        """
+        Enter the runtime context related to the object.
+
+        Returns:
+            self: The instance itself.
+        """
+        return self
+
+    def __exit__(
+        self, exc_type: Optional[Type[BaseException]], exc_val: Optional[BaseException], exc_tb: Optional[TracebackType]
+    ) -> None:
+        """
+        Exit the runtime context related to the object.
+
+        Args:
+            exc_type: The exception type if an exception was raised in the context.
+            exc_value: The exception value if an exception was raised in the context.
+            traceback: The traceback if an exception was raised in the context.
+        """
+        if not self.shared:
+            self.close()
@@ -4,11 +4,13 @@
 #
 # Portions derived from  https://github.com/microsoft/autogen are under the MIT License.
 # SPDX-License-Identifier: MIT
+import copy
 import functools
 import inspect
 import json
+import threading
 from logging import getLogger
-from typing import Any, Callable, Dict, ForwardRef, List, Optional, Set, Tuple, Type, TypeVar, Union
+from typing import Any, Callable, Dict, ForwardRef, Hashable, List, Optional, Set, Tuple, Type, TypeVar, Union
 
 from pydantic import BaseModel, Field
 from typing_extensions import Annotated, Literal, get_args, get_origin
@@ -19,6 +21,12 @@ logger = getLogger(__name__)
 
 T = TypeVar("T")
 
+# Number of functions whose introspection and schemas are kept
+SCHEMA_CACHE_SIZE = 1024
+_introspection_cache: Dict[Hashable, Tuple[inspect.Signature, Any, Dict[str, Any]]] = {}
+_schema_cache: Dict[Hashable, Dict[str, Any]] = {}
+_cache_lock = threading.Lock()
+
 
 def get_typed_annotation(annotation: Any, globalns: Dict[str, Any]) -> Any:
     """Get the type annotation of a parameter.
@@ -93,6 +101,68 @@ def get_param_annotations(typed_signature: inspect.Signature) -> Dict[str, Union
     }
 
 
+def _function_key(f: Callable[..., Any]) -> Optional[Hashable]:
+    """Get a key under which the introspection of a function can be cached.
+
+    Functions defined by the same `def` share a code object, so a closure created again for every session maps to the
+    same key as long as its defaults and annotations are the same. The key holds the code object rather than the
+    function, so cached entries do not keep closures and what they capture alive.
+
+    Args:
+        f: The function
+
+    Returns:
+        The key, or None if the function cannot be cached (methods, partials, objects with a `__signature__` and
+        functions with unhashable defaults or annotations)
+    """
+    if not inspect.isfunction(f):
+        return None
+    target = inspect.unwrap(f, stop=lambda g: hasattr(g, "__signature__"))
+    if not inspect.isfunction(target) or hasattr(target, "__signature__"):
+        return None
+    key = (
+        target.__code__,
+        # Forward references are resolved in the globals of the outermost function
+        id(f.__globals__),
+        target.__defaults__,
+        tuple(sorted((target.__kwdefaults__ or {}).items())),
+        tuple(target.__annotations__.items()),
+    )
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _cache_put(cache: Dict[Hashable, Any], key: Hashable, value: Any) -> None:
+    with _cache_lock:
+        if len(cache) >= SCHEMA_CACHE_SIZE:
+            # Evict the oldest entry; dicts keep insertion order
+            cache.pop(next(iter(cache)))
+        cache[key] = value
+
+
+def get_function_introspection(f: Callable[..., Any]) -> Tuple[inspect.Signature, Any, Dict[str, Any]]:
+    """Get the typed signature, return annotation and parameter annotations of a function, memoized.
+
+    Args:
+        f: The function
+
+    Returns:
+        A tuple of the signature with type annotations, the return annotation and the parameter annotations
+    """
+    key = _function_key(f)
+    cached = _introspection_cache.get(key) if key is not None else None
+    if cached is not None:
+        return cached
+    typed_signature = get_typed_signature(f)
+    introspection = (typed_signature, get_typed_return_annotation(f), get_param_annotations(typed_signature))
+    if key is not None:
+        _cache_put(_introspection_cache, key, introspection)
+    return introspection
+
+
 class Parameters(BaseModel):
     """Parameters of a function as defined by the OpenAI API"""
 
@@ -247,11 +317,17 @@ def get_function_schema(f: Callable[..., Any], *, name: Optional[str] = None, de
     ```
 
     """
-    typed_signature = get_typed_signature(f)
+    fname = name if name else f.__name__
+    function_key = _function_key(f)
+    key = (function_key, fname, description) if function_key is not None else None
+    cached = _schema_cache.get(key) if key is not None else None
+    if cached is not None:
+        # Callers may change the schema they get, so each gets its own copy
+        return copy.deepcopy(cached)
+
+    typed_signature, return_annotation, param_annotations = get_function_introspection(f)
     required = get_required_params(typed_signature)
     default_values = get_default_values(typed_signature)
-    param_annotations = get_param_annotations(typed_signature)
-    return_annotation = get_typed_return_annotation(f)
     missing, unannotated_with_default = get_missing_annotations(typed_signature, required)
 
     if return_annotation is None:
@@ -274,8 +350,6 @@ def get_function_schema(f: Callable[..., Any], *, name: Optional[str] = None, de
             + f"The annotations are missing for the following parameters: {', '.join(missing_s)}"
         )
 
-    fname = name if name else f.__name__
-
     parameters = get_parameters(required, param_annotations, default_values=default_values)
 
     function = ToolFunction(
@@ -286,7 +360,11 @@ def get_function_schema(f: Callable[..., Any], *, name: Optional[str] = None, de
         )
     )
 
-    return model_dump(function)
+    schema = model_dump(function)
+    if key is not None:
+        _cache_put(_schema_cache, key, schema)
+        return copy.deepcopy(schema)
+    return schema
 
 
 def get_load_param_if_needed_function(t: Any) -> Optional[Callable[[Dict[str, Any], Type[BaseModel]], BaseModel]]:
@@ -319,8 +397,7 @@ def load_basemodels_if_needed(func: Callable[..., Any]) -> Callable[..., Any]:
 
     """
     # get the type annotations of the parameters
-    typed_signature = get_typed_signature(func)
-    param_annotations = get_param_annotations(typed_signature)
+    _, _, param_annotations = get_function_introspection(func)
 
     # get functions for loading BaseModels when needed based on the type annotations
     kwargs_mapping_with_nones = {k: get_load_param_if_needed_function(t) for k, t in param_annotations.items()}
@@ -6,6 +6,7 @@
 # SPDX-License-Identifier: MIT
 from .file_logger import FileLogger
 from .logger_factory import LoggerFactory
+from .segment_logger import SegmentLogger
 from .sqlite_logger import SqliteLogger
 
-__all__ = ("LoggerFactory", "SqliteLogger", "FileLogger")
+__all__ = ("LoggerFactory", "SqliteLogger", "FileLogger", "SegmentLogger")
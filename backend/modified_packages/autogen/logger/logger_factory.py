@@ -8,6 +8,7 @@ from typing import Any, Dict, Literal, Optional
 
 from autogen.logger.base_logger import BaseLogger
 from autogen.logger.file_logger import FileLogger
+from autogen.logger.segment_logger import SegmentLogger
 from autogen.logger.sqlite_logger import SqliteLogger
 
 __all__ = ("LoggerFactory",)
@@ -16,7 +17,7 @@ __all__ = ("LoggerFactory",)
 class LoggerFactory:
     @staticmethod
     def get_logger(
-        logger_type: Literal["sqlite", "file"] = "sqlite", config: Optional[Dict[str, Any]] = None
+        logger_type: Literal["sqlite", "file", "segment"] = "sqlite", config: Optional[Dict[str, Any]] = None
     ) -> BaseLogger:
         if config is None:
             config = {}
@@ -25,5 +26,7 @@ class LoggerFactory:
             return SqliteLogger(config)
         elif logger_type == "file":
             return FileLogger(config)
+        elif logger_type == "segment":
+            return SegmentLogger(config)
         else:
             raise ValueError(f"[logger_factory] Unknown logger type: {logger_type}")
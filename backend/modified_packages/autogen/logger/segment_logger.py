@@ -0,0 +1,416 @@
+# Copyright (c) 2023 - 2024, Owners of https://github.com/autogen-ai
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Portions derived from  https://github.com/microsoft/autogen are under the MIT License.
+# SPDX-License-Identifier: MIT
+from __future__ import annotations
+
+import datetime
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
+
+from openai import AzureOpenAI, OpenAI
+from openai.types.chat import ChatCompletion
+
+from autogen.logger.base_logger import BaseLogger
+from autogen.logger.logger_utils import get_current_ts, to_dict
+
+from .base_logger import LLMConfig
+
+if TYPE_CHECKING:
+    from autogen import Agent, ConversableAgent, OpenAIWrapper
+    from autogen.oai.anthropic import AnthropicClient
+    from autogen.oai.bedrock import BedrockClient
+    from autogen.oai.cohere import CohereClient
+    from autogen.oai.gemini import GeminiClient
+    from autogen.oai.groq import GroqClient
+    from autogen.oai.mistral import MistralAIClient
+    from autogen.oai.ollama import OllamaClient
+    from autogen.oai.together import TogetherClient
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+__all__ = ("SegmentLogger", "read_segment", "segment_files")
+
+FORMAT_VERSION = 1
+DEFAULT_SEGMENT_BYTES = 16 * 1024 * 1024
+DEFAULT_SEGMENT_SECONDS = 3600.0
+# Seconds between flushes of the active segment to the OS
+FLUSH_INTERVAL = 1.0
+TS_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+EXCLUDED_ARGS = (
+    "self",
+    "__class__",
+    "api_key",
+    "organization",
+    "base_url",
+    "azure_endpoint",
+    "azure_ad_token",
+    "azure_ad_token_provider",
+)
+
+# Columns of each record kind. A row is a JSON array: the kind, then the values in this order.
+SCHEMA: Dict[str, List[str]] = {
+    "b": ["hash", "value"],
+    "llm": [
+        "time",
+        "session",
+        "invocation",
+        "source",
+        "client",
+        "wrapper",
+        "model",
+        "latency_ms",
+        "prompt_tokens",
+        "completion_tokens",
+        "cost",
+        "cached",
+        "messages",
+        "params",
+        "response",
+        "error",
+    ],
+    "agent": ["time", "session", "agent_id", "wrapper_id", "name", "class", "init_args"],
+    "wrapper": ["time", "session", "wrapper_id", "init_args"],
+    "client": ["time", "session", "client_id", "wrapper_id", "class", "init_args"],
+    "event": ["time", "session", "source_id", "source_name", "event", "state"],
+    "function": ["time", "session", "source_id", "source_name", "function", "args", "returns"],
+}
+
+
+def _default(o: Any) -> Any:
+    if hasattr(o, "to_json"):
+        return str(o.to_json())
+    converted = to_dict(o)
+    if converted is o:
+        return f"<<non-serializable: {type(o).__qualname__}>>"
+    return converted
+
+
+def _encode(obj: Any) -> str:
+    """Canonical compact JSON, so equal contents get equal hashes."""
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), default=_default)
+
+
+def _latency_ms(start_time: str, end: datetime.datetime) -> Optional[float]:
+    try:
+        return round((end - datetime.datetime.strptime(start_time, TS_FORMAT)).total_seconds() * 1000, 3)
+    except (TypeError, ValueError):
+        return None
+
+
+class SegmentLogger(BaseLogger):
+    """Logs to compact segment files in which message contents are stored once.
+
+    Every message, request parameter set and response is content-addressed: it is written once per segment as a
+    blob row keyed by its hash, and chat completion rows refer to blobs by hash. A chat of n turns therefore logs
+    O(n) message contents instead of the O(n^2) of logging the full history with every request.
+
+    Each segment starts with a header holding the column schema of every record kind; rows are JSON arrays in that
+    column order. The active segment is plain JSON lines; once it reaches `segment_bytes` or `segment_seconds` it is
+    rolled over and gzip-compressed in the background. Read segments with `read_segment`, or summarize them with
+    `python -m autogen.logger.segment_query`.
+
+    Config:
+        log_dir (str): Directory of the segment files. Defaults to "autogen_logs/segments" under the working directory.
+        segment_bytes (int): Uncompressed size at which a segment is rolled over.
+        segment_seconds (float): Age at which a segment is rolled over.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.session_id = str(uuid.uuid4())
+        self.log_dir = self.config.get("log_dir", os.path.join(os.getcwd(), "autogen_logs", "segments"))
+        self.segment_bytes = int(self.config.get("segment_bytes", DEFAULT_SEGMENT_BYTES))
+        self.segment_seconds = float(self.config.get("segment_seconds", DEFAULT_SEGMENT_SECONDS))
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = None
+        self._path: Optional[str] = None
+        self._sequence = 0
+        self._written = 0
+        self._opened = 0.0
+        self._flushed = 0.0
+        self._blobs: set = set()
+        self._compressors: List[threading.Thread] = []
+
+    def start(self) -> str:
+        """Open the first segment and return the session_id."""
+        try:
+            with self._lock:
+                self._open_segment()
+        except OSError as e:
+            logger.error(f"[segment_logger] Failed to open segment in {self.log_dir}: {e}")
+        finally:
+            return self.session_id
+
+    def _open_segment(self) -> None:
+        self._sequence += 1
+        self._path = os.path.join(self.log_dir, f"{self.session_id}-{self._sequence:05d}.jsonl")
+        self._file = open(self._path, "a", encoding="utf-8")
+        self._written = 0
+        self._opened = self._flushed = time.monotonic()
+        # Blobs are stored once per segment, so each segment can be read, shipped or deleted on its own
+        self._blobs = set()
+        header = {"format": FORMAT_VERSION, "session": self.session_id, "schema": SCHEMA}
+        self._write_line(json.dumps(header, separators=(",", ":")))
+
+    def _roll_segment(self) -> None:
+        self._file.close()
+        path = self._path
+        compressor = threading.Thread(target=self._compress, args=(path,), name="segment-compress", daemon=True)
+        compressor.start()
+        self._compressors = [thread for thread in self._compressors if thread.is_alive()] + [compressor]
+        self._open_segment()
+
+    @staticmethod
+    def _compress(path: str) -> None:
+        try:
+            with open(path, "rb") as src, gzip.open(path + ".gz.tmp", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(path + ".gz.tmp", path + ".gz")
+            os.remove(path)
+        except OSError as e:
+            logger.error(f"[segment_logger] Failed to compress {path}: {e}")
+
+    def _write_line(self, line: str) -> None:
+        self._file.write(line)
+        self._file.write("\n")
+        self._written += len(line) + 1
+
+    def _blob(self, data: str) -> str:
+        """Write `data`, an encoded JSON value, as a blob unless this segment has it; return its hash."""
+        digest = hashlib.blake2b(data.encode("utf-8"), digest_size=12).hexdigest()
+        if digest not in self._blobs:
+            self._blobs.add(digest)
+            # The value is embedded as JSON rather than as a string, which would escape it a second time
+            self._write_line(f'["b","{digest}",{data}]')
+        return digest
+
+    def _append(self, kind: str, values: Callable[[], List[Any]]) -> None:
+        """Write one row; `values` runs under the lock so the blobs it writes land in the same segment."""
+        if self._file is None:
+            return
+        try:
+            with self._lock:
+                now = time.monotonic()
+                if self._written >= self.segment_bytes or now - self._opened >= self.segment_seconds:
+                    self._roll_segment()
+                row = [kind] + values()
+                self._write_line(json.dumps(row, separators=(",", ":"), default=_default))
+                if now - self._flushed >= FLUSH_INTERVAL:
+                    self._file.flush()
+                    self._flushed = now
+        except Exception as e:
+            logger.error(f"[segment_logger] Failed to log {kind}: {e}")
+
+    def log_chat_completion(
+        self,
+        invocation_id: uuid.UUID,
+        client_id: int,
+        wrapper_id: int,
+        source: Union[str, Agent],
+        request: Dict[str, Union[float, str, List[Dict[str, str]]]],
+        response: Union[str, ChatCompletion],
+        is_cached: int,
+        cost: float,
+        start_time: str,
+    ) -> None:
+        """
+        Log a chat completion, with its messages, parameters and response stored as blobs.
+        """
+        end = datetime.datetime.utcnow()
+        source_name = source if isinstance(source, str) else source.name
+        # Encode on the caller's thread; the agent keeps appending to the message list it passed in
+        messages = request.get("messages") or []
+        message_data = [_encode(message) for message in messages]
+        params_data = _encode({key: value for key, value in request.items() if key != "messages"})
+        error = None
+        usage = None
+        if response is None or isinstance(response, str):
+            error = response
+            response_data = None
+        else:
+            response_data = _encode(to_dict(response))
+            usage = getattr(response, "usage", None)
+
+        def values() -> List[Any]:
+            return [
+                end.strftime(TS_FORMAT),
+                self.session_id,
+                str(invocation_id),
+                source_name,
+                client_id,
+                wrapper_id,
+                getattr(response, "model", None) or request.get("model"),
+                _latency_ms(start_time, end),
+                getattr(usage, "prompt_tokens", None),
+                getattr(usage, "completion_tokens", None),
+                cost,
+                is_cached,
+                [self._blob(data) for data in message_data],
+                self._blob(params_data),
+                self._blob(response_data) if response_data is not None else None,
+                error,
+            ]
+
+        self._append("llm", values)
+
+    def log_new_agent(self, agent: ConversableAgent, init_args: Dict[str, Any] = {}) -> None:
+        """
+        Log a new agent instance.
+        """
+        from autogen import Agent
+
+        args = to_dict(init_args, exclude=EXCLUDED_ARGS, no_recursive=(Agent,))
+        self._append(
+            "agent",
+            lambda: [
+                get_current_ts(),
+                self.session_id,
+                id(agent),
+                agent.client.wrapper_id if hasattr(agent, "client") and agent.client is not None else None,
+                agent.name if hasattr(agent, "name") else None,
+                type(agent).__name__,
+                args,
+            ],
+        )
+
+    def log_event(self, source: Union[str, Agent], name: str, **kwargs: Dict[str, Any]) -> None:
+        """
+        Log an event from an agent or a string source.
+        """
+        state = json.dumps(kwargs, default=lambda o: f"<<non-serializable: {type(o).__qualname__}>>")
+        self._append(
+            "event",
+            lambda: [
+                get_current_ts(),
+                self.session_id,
+                id(source),
+                str(source.name) if hasattr(source, "name") else source,
+                name,
+                state,
+            ],
+        )
+
+    def log_new_wrapper(
+        self, wrapper: OpenAIWrapper, init_args: Dict[str, Union[LLMConfig, List[LLMConfig]]] = {}
+    ) -> None:
+        """
+        Log a new wrapper instance.
+        """
+        args = to_dict(init_args, exclude=EXCLUDED_ARGS)
+        self._append("wrapper", lambda: [get_current_ts(), self.session_id, id(wrapper), args])
+
+    def log_new_client(
+        self,
+        client: Union[
+            AzureOpenAI,
+            OpenAI,
+            GeminiClient,
+            AnthropicClient,
+            MistralAIClient,
+            TogetherClient,
+            GroqClient,
+            CohereClient,
+            OllamaClient,
+            BedrockClient,
+        ],
+        wrapper: OpenAIWrapper,
+        init_args: Dict[str, Any],
+    ) -> None:
+        """
+        Log a new client instance.
+        """
+        args = to_dict(init_args, exclude=EXCLUDED_ARGS)
+        self._append(
+            "client", lambda: [get_current_ts(), self.session_id, id(client), id(wrapper), type(client).__name__, args]
+        )
+
+    def log_function_use(self, source: Union[str, Agent], function: F, args: Dict[str, Any], returns: Any) -> None:
+        """
+        Log a registered function(can be a tool) use from an agent or a string source.
+        """
+        args_data, returns_data = _encode(args), _encode(returns)
+        self._append(
+            "function",
+            lambda: [
+                get_current_ts(),
+                self.session_id,
+                id(source),
+                str(source.name) if hasattr(source, "name") else source,
+                function.__name__,
+                self._blob(args_data),
+                self._blob(returns_data),
+            ],
+        )
+
+    def flush(self) -> None:
+        """Write buffered rows of the active segment to the OS."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                self._flushed = time.monotonic()
+
+    def get_connection(self) -> None:
+        """Method is intentionally left blank because there is no specific connection needed for the SegmentLogger."""
+        pass
+
+    def stop(self) -> None:
+        """Close and compress the active segment, and wait for pending compressions."""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+            path = self._path
+        self._compress(path)
+        for thread in self._compressors:
+            thread.join()
+
+
+def segment_files(log_dir: str) -> List[str]:
+    """Segment files in `log_dir`, compressed or not, in the order they were written per session."""
+    names = [name for name in os.listdir(log_dir) if name.endswith(".jsonl") or name.endswith(".jsonl.gz")]
+    return [os.path.join(log_dir, name) for name in sorted(names)]
+
+
+def read_segment(path: str, kinds: Optional[Tuple[str, ...]] = None) -> Iterator[Dict[str, Any]]:
+    """Stream the rows of a segment as dicts keyed by column, one line at a time.
+
+    Args:
+        path (str): A ".jsonl" or ".jsonl.gz" segment file.
+        kinds (Optional[Tuple[str, ...]]): Record kinds to return, e.g. ("llm",). Other rows are skipped without
+            being parsed. None for all kinds.
+    Yields:
+        Each row as a dict with its columns and "kind".
+    """
+    prefixes = None if kinds is None else tuple(f'["{kind}",' for kind in kinds)
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        schema = SCHEMA
+        for line in f:
+            if line.startswith("{"):
+                schema = json.loads(line).get("schema", SCHEMA)
+                continue
+            if prefixes is not None and not line.startswith(prefixes):
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                # A row cut short by a crash, at the end of an active segment
+                continue
+            record = dict(zip(schema.get(row[0], ()), row[1:]))
+            record["kind"] = row[0]
+            yield record
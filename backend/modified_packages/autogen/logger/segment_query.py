@@ -0,0 +1,146 @@
+# Copyright (c) 2023 - 2024, Owners of https://github.com/autogen-ai
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Portions derived from  https://github.com/microsoft/autogen are under the MIT License.
+# SPDX-License-Identifier: MIT
+"""Query the segment files written by SegmentLogger.
+
+Segments are streamed a row at a time, so memory grows with the number of groups and calls, never with the size of
+the logged messages.
+
+Examples:
+    python -m autogen.logger.segment_query rollup autogen_logs/segments
+    python -m autogen.logger.segment_query rollup autogen_logs/segments --by source --json
+    python -m autogen.logger.segment_query show autogen_logs/segments <invocation_id>
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+
+from autogen.logger.segment_logger import read_segment, segment_files
+
+__all__ = ("rollup", "show")
+
+GROUP_COLUMNS = {"session": "session", "source": "source", "model": "model"}
+
+
+def _percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def rollup(log_dir: str, by: str = "session", session: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Aggregate the chat completions in `log_dir` per session, source or model.
+
+    Args:
+        log_dir (str): Directory of the segment files.
+        by (str): Column to group by: "session", "source" or "model".
+        session (Optional[str]): Only count the calls of this session.
+    Returns:
+        One dict per group with call counts, latency percentiles in milliseconds, token totals and cost.
+    """
+    column = GROUP_COLUMNS[by]
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for path in segment_files(log_dir):
+        if session is not None and not os.path.basename(path).startswith(session):
+            continue
+        for row in read_segment(path, kinds=("llm",)):
+            group = groups.get(row[column])
+            if group is None:
+                group = groups[row[column]] = {
+                    by: row[column],
+                    "calls": 0,
+                    "cached": 0,
+                    "errors": 0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "cost": 0.0,
+                    "first": row["time"],
+                    "last": row["time"],
+                    "latencies": [],
+                }
+            group["calls"] += 1
+            group["cached"] += 1 if row["cached"] else 0
+            group["errors"] += 1 if row["error"] is not None else 0
+            group["prompt_tokens"] += row["prompt_tokens"] or 0
+            group["completion_tokens"] += row["completion_tokens"] or 0
+            group["cost"] += row["cost"] or 0.0
+            group["first"] = min(group["first"], row["time"])
+            group["last"] = max(group["last"], row["time"])
+            # Cached responses skip the model, so they would drag the percentiles down
+            if row["latency_ms"] is not None and not row["cached"]:
+                group["latencies"].append(row["latency_ms"])
+
+    results = []
+    for group in groups.values():
+        latencies = sorted(group.pop("latencies"))
+        group["latency_p50_ms"] = _percentile(latencies, 0.50)
+        group["latency_p95_ms"] = _percentile(latencies, 0.95)
+        group["latency_total_ms"] = round(sum(latencies), 3)
+        group["cost"] = round(group["cost"], 6)
+        results.append(group)
+    return sorted(results, key=lambda group: group["first"])
+
+
+def show(log_dir: str, invocation_id: str) -> Optional[Dict[str, Any]]:
+    """Rebuild the request and response of one chat completion from its hashes.
+
+    Args:
+        log_dir (str): Directory of the segment files.
+        invocation_id (str): The invocation to show.
+    Returns:
+        The row of the call with its messages, params and response resolved, or None if it is not logged.
+    """
+    for path in segment_files(log_dir):
+        for row in read_segment(path, kinds=("llm",)):
+            if row["invocation"] != invocation_id:
+                continue
+            # Blobs live in the same segment as the rows referring to them; a second pass collects only these
+            wanted = set(row["messages"]) | {row["params"], row["response"]}
+            blobs = {blob["hash"]: blob["value"] for blob in read_segment(path, kinds=("b",)) if blob["hash"] in wanted}
+            row["messages"] = [blobs.get(digest) for digest in row["messages"]]
+            row["params"] = blobs.get(row["params"])
+            row["response"] = blobs.get(row["response"])
+            return row
+    return None
+
+
+def _format_table(rows: List[Dict[str, Any]], by: str) -> str:
+    columns = [by, "calls", "cached", "errors", "latency_p50_ms", "latency_p95_ms", "prompt_tokens"]
+    columns += ["completion_tokens", "cost"]
+    table = [columns] + [["" if row[column] is None else str(row[column]) for column in columns] for row in rows]
+    widths = [max(len(line[index]) for line in table) for index in range(len(columns))]
+    return "\n".join("  ".join(value.ljust(width) for value, width in zip(line, widths)) for line in table)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Query the segment files written by SegmentLogger.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rollup_parser = commands.add_parser("rollup", help="latency, token and cost rollups of the chat completions")
+    rollup_parser.add_argument("log_dir")
+    rollup_parser.add_argument("--by", choices=sorted(GROUP_COLUMNS), default="session")
+    rollup_parser.add_argument("--session", default=None, help="only count the calls of this session")
+    rollup_parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    show_parser = commands.add_parser("show", help="the request and response of one chat completion")
+    show_parser.add_argument("log_dir")
+    show_parser.add_argument("invocation_id")
+    args = parser.parse_args(argv)
+
+    if args.command == "rollup":
+        rows = rollup(args.log_dir, by=args.by, session=args.session)
+        print(json.dumps(rows, indent=2) if args.json else _format_table(rows, args.by))
+        return 0
+    row = show(args.log_dir, args.invocation_id)
+    if row is None:
+        print(f"Invocation {args.invocation_id} not found in {args.log_dir}", file=sys.stderr)
+        return 1
+    print(json.dumps(row, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
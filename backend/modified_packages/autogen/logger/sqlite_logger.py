@@ -9,9 +9,12 @@ from __future__ import annotations
 import json
 import logging
 import os
+import queue
 import sqlite3
 import threading
+import time
 import uuid
+from itertools import groupby
 from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple, TypeVar, Union
 
 from openai import AzureOpenAI, OpenAI
@@ -40,6 +43,13 @@ __all__ = ("SqliteLogger",)
 
 F = TypeVar("F", bound=Callable[..., Any])
 
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 1.0
+# Seconds a "block" policy waits for room in a full queue before dropping the row
+DEFAULT_BLOCK_TIMEOUT = 5.0
+_STOP = object()
+
 
 def safe_serialize(obj: Any) -> str:
     def default(o: Any) -> str:
@@ -52,16 +62,49 @@ def safe_serialize(obj: Any) -> str:
 
 
 class SqliteLogger(BaseLogger):
+    """Logs to a SQLite database.
+
+    By default every row is inserted and committed by the calling thread. With `"batched": True` in the config, the
+    logging calls only put rows on a bounded queue; a writer thread with its own connection inserts them with
+    `executemany` and commits once per batch, in WAL journal mode so readers are not blocked. Rows become visible
+    when their batch commits; call `flush` to wait for that.
+
+    Config:
+        dbname (str): Database file. Defaults to "logs.db".
+        batched (bool): Write from a background thread. Defaults to False.
+        queue_size (int): Rows held for the writer before the `on_full` policy applies.
+        batch_size (int): Rows per commit at most.
+        flush_interval (float): Seconds a row waits for its batch to fill before it is committed anyway.
+        on_full (str): "block" waits up to `block_timeout` seconds for room and then drops the row; "drop" drops it
+            at once. Dropped rows are counted in `dropped`.
+        block_timeout (float): See `on_full`.
+    """
+
     schema_version = 1
 
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        self.batched = bool(self.config.get("batched", False))
+        self.batch_size = int(self.config.get("batch_size", DEFAULT_BATCH_SIZE))
+        self.flush_interval = float(self.config.get("flush_interval", DEFAULT_FLUSH_INTERVAL))
+        self.on_full = self.config.get("on_full", "block")
+        if self.on_full not in ("block", "drop"):
+            raise ValueError(f"[SqliteLogger] Unknown on_full policy: {self.on_full}. Use 'block' or 'drop'.")
+        self.block_timeout = float(self.config.get("block_timeout", DEFAULT_BLOCK_TIMEOUT))
+        self.dropped = 0
+        self.written = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=int(self.config.get("queue_size", DEFAULT_QUEUE_SIZE)))
+        self._writer: Union[None, threading.Thread] = None
+        self.con = None
 
         try:
             self.dbname = self.config.get("dbname", "logs.db")
             self.con = sqlite3.connect(self.dbname, check_same_thread=False)
             self.cur = self.con.cursor()
             self.session_id = str(uuid.uuid4())
+            if self.batched:
+                # Readers keep reading while the writer appends to the log
+                self.cur.execute("PRAGMA journal_mode=WAL")
         except sqlite3.Error as e:
             logger.error(f"[SqliteLogger] Failed to connect to database {self.dbname}: {e}")
 
@@ -163,6 +206,10 @@ class SqliteLogger(BaseLogger):
                 )
             self._apply_migration()
 
+            if self.batched:
+                self._writer = threading.Thread(target=self._write_batches, name="sqlite-logger", daemon=True)
+                self._writer.start()
+
         except sqlite3.Error as e:
             logger.error(f"[SqliteLogger] start logging error: {e}")
         finally:
@@ -198,12 +245,15 @@ class SqliteLogger(BaseLogger):
 
     def _run_query(self, query: str, args: Tuple[Any, ...] = ()) -> None:
         """
-        Executes a given SQL query.
+        Executes a given SQL query, or queues it for the writer thread in batched mode.
 
         Args:
             query (str):        The SQL query to execute.
             args (Tuple):       The arguments to pass to the SQL query.
         """
+        if self._writer is not None:
+            self._enqueue((query, args))
+            return
         try:
             with lock:
                 self.cur.execute(query, args)
@@ -211,6 +261,81 @@ class SqliteLogger(BaseLogger):
         except Exception as e:
             logger.error("[sqlite logger]Error running query with query %s and args %s: %s", query, args, e)
 
+    def _enqueue(self, item: Any) -> bool:
+        try:
+            if self.on_full == "drop":
+                self._queue.put_nowait(item)
+            else:
+                self._queue.put(item, timeout=self.block_timeout)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"[SqliteLogger] Log queue full, {self.dropped} rows dropped so far")
+            return False
+
+    def _write_batches(self) -> None:
+        """Writer thread: collect rows until the batch is full or `flush_interval` has passed, then commit them."""
+        con = sqlite3.connect(self.dbname)
+        con.execute("PRAGMA synchronous=NORMAL")
+        stopping = False
+        while not stopping:
+            batch: List[Tuple[str, Tuple[Any, ...]]] = []
+            flushed: List[threading.Event] = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    # A flush marker; everything queued before it is in this batch
+                    flushed.append(item)
+                else:
+                    batch.append(item)
+                if stopping or flushed or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(con, batch)
+            for event in flushed:
+                event.set()
+        con.close()
+
+    def _write(self, con: sqlite3.Connection, batch: List[Tuple[str, Tuple[Any, ...]]]) -> None:
+        """Insert a batch in one transaction, with one `executemany` per run of rows sharing a query."""
+        try:
+            with con:
+                for query, rows in groupby(batch, key=lambda item: item[0]):
+                    con.executemany(query, [args for _, args in rows])
+            self.written += len(batch)
+        except sqlite3.Error as e:
+            # Retry row by row so one bad row does not lose the rest of the batch
+            logger.error(f"[SqliteLogger] Batch of {len(batch)} rows failed, retrying row by row: {e}")
+            for query, args in batch:
+                try:
+                    with con:
+                        con.execute(query, args)
+                    self.written += 1
+                except sqlite3.Error as e:
+                    logger.error("[sqlite logger]Error running query with query %s and args %s: %s", query, args, e)
+
+    def flush(self, timeout: Union[None, float] = None) -> bool:
+        """Wait until the rows logged so far are committed. Returns False on timeout; always True when not batched."""
+        if self._writer is None or not self._writer.is_alive():
+            return True
+        event = threading.Event()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            # The marker waits for room whatever the on_full policy, so it is never dropped
+            self._queue.put(event, timeout=timeout)
+        except queue.Full:
+            return False
+        return event.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
     def _run_query_script(self, script: str) -> None:
         """
         Executes SQL script.
@@ -448,6 +573,11 @@ class SqliteLogger(BaseLogger):
         self._run_query(query=query, args=args)
 
     def stop(self) -> None:
+        if self._writer is not None:
+            # Let the writer commit what is queued before closing
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
         if self.con:
             self.con.close()
 
@@ -4,22 +4,35 @@
 #
 # Portions derived from  https://github.com/microsoft/autogen are under the MIT License.
 # SPDX-License-Identifier: MIT
-from autogen.cache.cache import Cache
-from autogen.oai.client import ModelClient, OpenAIWrapper
-from autogen.oai.completion import ChatCompletion, Completion
-from autogen.oai.openai_utils import (
-    config_list_from_dotenv,
-    config_list_from_json,
-    config_list_from_models,
-    config_list_gpt4_gpt35,
-    config_list_openai_aoai,
-    filter_config,
-    get_config_list,
-)
+import importlib
+
+# Public names and the module defining each, imported on first access (PEP 562). Importing a light submodule such as
+# ``autogen.oai.rate_limit`` then does not load the model clients and the openai package.
+_LAZY_EXPORTS = {
+    "Cache": "autogen.cache.cache",
+    "ModelClient": "autogen.oai.client",
+    "OpenAIWrapper": "autogen.oai.client",
+    "register_provider": "autogen.oai.client",
+    "ChatCompletion": "autogen.oai.completion",
+    "Completion": "autogen.oai.completion",
+    **dict.fromkeys(
+        (
+            "config_list_from_dotenv",
+            "config_list_from_json",
+            "config_list_from_models",
+            "config_list_gpt4_gpt35",
+            "config_list_openai_aoai",
+            "filter_config",
+            "get_config_list",
+        ),
+        "autogen.oai.openai_utils",
+    ),
+}
 
 __all__ = [
     "OpenAIWrapper",
     "ModelClient",
+    "register_provider",
     "Completion",
     "ChatCompletion",
     "get_config_list",
@@ -31,3 +44,17 @@ __all__ = [
     "filter_config",
     "Cache",
 ]
+
+
+def __getattr__(name: str):
+    """Import a public name on first access."""
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
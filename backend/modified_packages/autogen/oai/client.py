@@ -6,19 +6,31 @@
 # SPDX-License-Identifier: MIT
 from __future__ import annotations
 
+import asyncio
+import atexit
+import functools
+import importlib
 import inspect
 import logging
+import copy
 import sys
+import threading
+import time
 import uuid
-from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple, Union
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple, Type, Union
 
 from flaml.automl.logger import logger_formatter
 from pydantic import BaseModel
 
-from autogen.cache import Cache
+from autogen import tracing
+from autogen.cache import AbstractCache, Cache
 from autogen.io.base import IOStream
 from autogen.logger.logger_utils import get_current_ts
-from autogen.oai.openai_utils import OAI_PRICE1K, get_key, is_valid_api_key
+from autogen.oai.openai_utils import OAI_PRICE1K, get_incremental_key, is_valid_api_key
+from autogen.oai.rate_limit import ModelRateLimiter, get_rate_limiter
+from autogen.oai.routing import LatencyRouter
 from autogen.runtime_logging import log_chat_completion, log_new_client, log_new_wrapper, logging_enabled
 from autogen.token_count_utils import count_token
 
@@ -29,14 +41,17 @@ except ImportError:
     ERROR: Optional[ImportError] = ImportError("Please install openai>=1 and diskcache to use autogen.OpenAIWrapper.")
     OpenAI = object
     AzureOpenAI = object
+    AsyncOpenAI = object
+    AsyncAzureOpenAI = object
 else:
     # raises exception if openai>=1 is installed and something is wrong with imports
-    from openai import APIError, APITimeoutError, AzureOpenAI, OpenAI
+    from openai import APIError, APITimeoutError, AsyncAzureOpenAI, AsyncOpenAI, AzureOpenAI, OpenAI, RateLimitError
     from openai import __version__ as OPENAIVERSION
-    from openai.resources import Completions
+    from openai.resources import AsyncCompletions, Completions
     from openai.types.chat import ChatCompletion
     from openai.types.chat.chat_completion import ChatCompletionMessage, Choice  # type: ignore [attr-defined]
     from openai.types.chat.chat_completion_chunk import (
+        ChatCompletionChunk,
         ChoiceDeltaFunctionCall,
         ChoiceDeltaToolCall,
         ChoiceDeltaToolCallFunction,
@@ -48,78 +63,136 @@ else:
         TOOL_ENABLED = True
     ERROR = None
 
-try:
-    from autogen.oai.gemini import GeminiClient
-
-    gemini_import_exception: Optional[ImportError] = None
-except ImportError as e:
-    gemini_import_exception = e
-
-try:
-    from autogen.oai.anthropic import AnthropicClient
-
-    anthropic_import_exception: Optional[ImportError] = None
-except ImportError as e:
-    anthropic_import_exception = e
-
-try:
-    from autogen.oai.mistral import MistralAIClient
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    # Add the console handler.
+    _ch = logging.StreamHandler(stream=sys.stdout)
+    _ch.setFormatter(logger_formatter)
+    logger.addHandler(_ch)
 
-    mistral_import_exception: Optional[ImportError] = None
-except ImportError as e:
-    mistral_import_exception = e
+LEGACY_DEFAULT_CACHE_SEED = 41
+# Completion tokens reserved under a tokens-per-minute limit when a request sets no max_tokens
+DEFAULT_MAX_TOKENS = 1024
+# Seconds a model's rate limiter pauses after a rate limit error without a retry-after header
+RATE_LIMIT_BACKOFF = 1.0
+LEGACY_CACHE_DIR = ".cache"
+OPEN_API_BASE_URL_PREFIX = "https://api.openai.com"
 
-try:
-    from autogen.oai.together import TogetherClient
+@dataclass
+class _Provider:
+    """A registered model client: the class, or the "module:ClassName" path it is imported from on first use."""
+
+    client_cls: Union[Type[ModelClient], str]
+    install_hint: Optional[str] = None
+
+
+# Model clients for api_type values other than "openai" and "azure", keyed by the api_type prefix they serve. Each
+# provider module, and the SDK it needs, is imported when a config entry with its api_type is first seen, so import
+# time and memory grow only with the providers actually configured.
+_providers: Dict[str, _Provider] = {
+    "google": _Provider(
+        "autogen.oai.gemini:GeminiClient", "Please install `google-generativeai` to use Google OpenAI API."
+    ),
+    "anthropic": _Provider("autogen.oai.anthropic:AnthropicClient", "Please install `anthropic` to use Anthropic API."),
+    "mistral": _Provider(
+        "autogen.oai.mistral:MistralAIClient", "Please install `mistralai` to use the Mistral.AI API."
+    ),
+    "together": _Provider(
+        "autogen.oai.together:TogetherClient", "Please install `together` to use the Together.AI API."
+    ),
+    "groq": _Provider("autogen.oai.groq:GroqClient", "Please install `groq` to use the Groq API."),
+    "cohere": _Provider("autogen.oai.cohere:CohereClient", "Please install `cohere` to use the Cohere API."),
+    "ollama": _Provider("autogen.oai.ollama:OllamaClient", "Please install `ollama` to use the Ollama API."),
+    "bedrock": _Provider("autogen.oai.bedrock:BedrockClient", "Please install `boto3` to use the Amazon Bedrock API."),
+}
+_providers_lock = threading.Lock()
+
+
+def register_provider(
+    api_type: str, client_cls: Union[Type[ModelClient], str], install_hint: Optional[str] = None
+) -> None:
+    """Register the model client for config entries whose `api_type` starts with `api_type`.
+
+    OpenAIWrapper creates the client with the entry's OpenAI-style arguments (`api_key`, `base_url`, ...) as keyword
+    arguments. A registration replaces an earlier one for the same `api_type`, including a built-in one. Entries with
+    an `api_type` starting with "azure" always use the Azure OpenAI client.
+
+    Args:
+        api_type: The `api_type` prefix the client serves, e.g. "anthropic".
+        client_cls: A class following the ModelClient protocol, or its "module:ClassName" path. A path is imported
+            only when a config entry first needs the client.
+        install_hint: Message of the ImportError raised when the client cannot be imported.
+
+    Example:
+        ```python
+        register_provider("acme", "acme_autogen.client:AcmeClient", "Please install `acme-autogen`.")
+        client = OpenAIWrapper(config_list=[{"model": "acme-large", "api_type": "acme", "api_key": "..."}])
+        ```
+    """
+    if isinstance(client_cls, str) and ":" not in client_cls:
+        raise ValueError(f'client_cls must be a class or a "module:ClassName" path, got {client_cls!r}.')
+    with _providers_lock:
+        _providers[api_type] = _Provider(client_cls, install_hint)
 
-    together_import_exception: Optional[ImportError] = None
-except ImportError as e:
-    together_import_exception = e
 
-try:
-    from autogen.oai.groq import GroqClient
+def _provider_client_cls(api_type: str) -> Optional[Type[ModelClient]]:
+    """Return the client class registered for an api_type, importing it on first use.
 
-    groq_import_exception: Optional[ImportError] = None
-except ImportError as e:
-    groq_import_exception = e
+    Returns None if no registered prefix matches; the longest matching prefix wins.
 
-try:
-    from autogen.oai.cohere import CohereClient
+    Raises:
+        ImportError: If the client's module or the SDK it needs cannot be imported.
+    """
+    with _providers_lock:
+        prefix = max((prefix for prefix in _providers if api_type.startswith(prefix)), key=len, default=None)
+        if prefix is None:
+            return None
+        provider = _providers[prefix]
+        if isinstance(provider.client_cls, str):
+            module_name, _, class_name = provider.client_cls.partition(":")
+            try:
+                client_cls = getattr(importlib.import_module(module_name), class_name)
+            except ImportError as e:
+                raise ImportError(
+                    provider.install_hint or f"Could not import {provider.client_cls} for api_type {api_type!r}: {e}"
+                ) from e
+            # Later entries with this api_type skip the import
+            provider.client_cls = client_cls
+        return provider.client_cls
 
-    cohere_import_exception: Optional[ImportError] = None
-except ImportError as e:
-    cohere_import_exception = e
 
-try:
-    from autogen.oai.ollama import OllamaClient
+# Process-wide caches for the legacy cache_seed argument, keyed by seed
+_legacy_caches: Dict[str, Cache] = {}
+_legacy_caches_lock = threading.Lock()
 
-    ollama_import_exception: Optional[ImportError] = None
-except ImportError as e:
-    ollama_import_exception = e
 
-try:
-    from autogen.oai.bedrock import BedrockClient
+def _legacy_cache(cache_seed: Union[int, str]) -> Cache:
+    """Return the shared cache for a legacy cache_seed: an in-memory LRU in front of the DiskCache.
 
-    bedrock_import_exception: Optional[ImportError] = None
-except ImportError as e:
-    bedrock_import_exception = e
+    Reusing one instance per seed keeps recent responses in memory, so repeated deterministic calls skip the disk. The
+    instance is shared, so the `with` blocks around each lookup leave the DiskCache open; it is closed at exit.
+    """
+    cache = _legacy_caches.get(str(cache_seed))
+    if cache is None:
+        with _legacy_caches_lock:
+            cache = _legacy_caches.get(str(cache_seed))
+            if cache is None:
+                cache = Cache.tiered(cache_seed, cache_path_root=LEGACY_CACHE_DIR, shared=True)
+                _legacy_caches[str(cache_seed)] = cache
+                atexit.register(cache.close)
+    return cache
 
-logger = logging.getLogger(__name__)
-if not logger.handlers:
-    # Add the console handler.
-    _ch = logging.StreamHandler(stream=sys.stdout)
-    _ch.setFormatter(logger_formatter)
-    logger.addHandler(_ch)
 
-LEGACY_DEFAULT_CACHE_SEED = 41
-LEGACY_CACHE_DIR = ".cache"
-OPEN_API_BASE_URL_PREFIX = "https://api.openai.com"
+def _create_trace_attributes(wrapper: "OpenAIWrapper", **config: Any) -> Dict[str, Any]:
+    return {"agent": getattr(config.get("agent"), "name", None), "llm.stream": bool(config.get("stream"))}
 
 
 class ModelClient(Protocol):
     """
     A client class must implement the following methods:
     - create must return a response object that implements the ModelClientResponseProtocol
+    - a_create is optional; if implemented as a coroutine with the same contract as create, OpenAIWrapper.a_create
+      awaits it instead of running create in a worker thread
     - cost must return the cost of the response
     - get_usage must return a dict with the following keys:
         - prompt_tokens
@@ -171,12 +244,148 @@ class PlaceHolderClient:
         self.config = config
 
 
+class _ChatCompletionStream:
+    """Assembles streamed chat completion chunks into a ChatCompletion, echoing content to the IOStream.
+
+    Shared by the sync and async paths of `OpenAIClient`.
+    """
+
+    def __init__(self, params: Dict[str, Any]):
+        self.params = params
+        self.iostream = IOStream.get_default()
+        self.response_contents = [""] * params.get("n", 1)
+        self.finish_reasons = [""] * params.get("n", 1)
+        self.completion_tokens = 0
+        # Prepare for potential function call
+        self.full_function_call: Optional[Dict[str, Any]] = None
+        self.full_tool_calls: Optional[List[Optional[Dict[str, Any]]]] = None
+        self.last_chunk = None
+
+        # Set the terminal text color to green
+        self.iostream.print("\033[32m", end="")
+
+    def add(self, chunk: ChatCompletionChunk) -> None:
+        """Fold one chunk into the response."""
+        self.last_chunk = chunk
+        if not chunk.choices:
+            return
+        for choice in chunk.choices:
+            content = choice.delta.content
+            tool_calls_chunks = choice.delta.tool_calls
+            self.finish_reasons[choice.index] = choice.finish_reason
+
+            # todo: remove this after function calls are removed from the API
+            # the code should work regardless of whether function calls are removed or not, but test_chat_functions_stream should fail
+            # begin block
+            function_call_chunk = choice.delta.function_call if hasattr(choice.delta, "function_call") else None
+            # Handle function call
+            if function_call_chunk:
+                self.full_function_call, self.completion_tokens = OpenAIWrapper._update_function_call_from_chunk(
+                    function_call_chunk, self.full_function_call, self.completion_tokens
+                )
+                if not content:
+                    continue
+            # end block
+
+            # Handle tool calls
+            if tool_calls_chunks:
+                for tool_calls_chunk in tool_calls_chunks:
+                    # the current tool call to be reconstructed
+                    ix = tool_calls_chunk.index
+                    if self.full_tool_calls is None:
+                        self.full_tool_calls = []
+                    if ix >= len(self.full_tool_calls):
+                        # in case ix is not sequential
+                        self.full_tool_calls = self.full_tool_calls + [None] * (ix - len(self.full_tool_calls) + 1)
+
+                    self.full_tool_calls[ix], self.completion_tokens = OpenAIWrapper._update_tool_calls_from_chunk(
+                        tool_calls_chunk, self.full_tool_calls[ix], self.completion_tokens
+                    )
+
+            # If content is present, print it to the terminal and update response variables
+            if content is not None:
+                self.iostream.print(content, end="", flush=True)
+                self.response_contents[choice.index] += content
+                self.completion_tokens += 1
+
+    def completion(self) -> ChatCompletion:
+        """Build the final ChatCompletion object from the accumulated data."""
+        # Reset the terminal text color
+        self.iostream.print("\033[0m\n")
+
+        chunk = self.last_chunk
+        model = chunk.model.replace("gpt-35", "gpt-3.5")  # hack for Azure API
+        prompt_tokens = count_token(self.params["messages"], model)
+        response = ChatCompletion(
+            id=chunk.id,
+            model=chunk.model,
+            created=chunk.created,
+            object="chat.completion",
+            choices=[],
+            usage=CompletionUsage(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=self.completion_tokens,
+                total_tokens=prompt_tokens + self.completion_tokens,
+            ),
+        )
+        for i in range(len(self.response_contents)):
+            if OPENAIVERSION >= "1.5":  # pragma: no cover
+                # OpenAI versions 1.5.0 and above
+                choice = Choice(
+                    index=i,
+                    finish_reason=self.finish_reasons[i],
+                    message=ChatCompletionMessage(
+                        role="assistant",
+                        content=self.response_contents[i],
+                        function_call=self.full_function_call,
+                        tool_calls=self.full_tool_calls,
+                    ),
+                    logprobs=None,
+                )
+            else:
+                # OpenAI versions below 1.5.0
+                choice = Choice(  # type: ignore [call-arg]
+                    index=i,
+                    finish_reason=self.finish_reasons[i],
+                    message=ChatCompletionMessage(
+                        role="assistant",
+                        content=self.response_contents[i],
+                        function_call=self.full_function_call,
+                        tool_calls=self.full_tool_calls,
+                    ),
+                )
+
+            response.choices.append(choice)
+        return response
+
+
 class OpenAIClient:
     """Follows the Client protocol and wraps the OpenAI client."""
 
-    def __init__(self, client: Union[OpenAI, AzureOpenAI]):
+    def __init__(
+        self,
+        client: Union[OpenAI, AzureOpenAI],
+        async_client_factory: Optional[Callable[[], Union[AsyncOpenAI, AsyncAzureOpenAI]]] = None,
+    ):
+        """
+        Args:
+            client: The openai client used by `create`.
+            async_client_factory: Creates the async client used by `a_create`. An async client's connection pool
+                belongs to the event loop it first ran on, so one is created lazily for each running loop.
+        """
         self._oai_client = client
-        
+        self._async_client_factory = async_client_factory
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+    def _async_client(self) -> Optional[Union[AsyncOpenAI, AsyncAzureOpenAI]]:
+        if self._async_client_factory is None:
+            return None
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = self._async_client_factory()
+        return client
+
     def message_retrieval(
         self, response: Union[ChatCompletion, Completion]
     ) -> Union[List[str], List[ChatCompletionMessage]]:
@@ -210,130 +419,48 @@ class OpenAIClient:
         Returns:
             The completion.
         """
-        iostream = IOStream.get_default()
-
         completions: Completions = self._oai_client.chat.completions if "messages" in params else self._oai_client.completions  # type: ignore [attr-defined]
         # If streaming is enabled and has messages, then iterate over the chunks of the response.
         if params.get("stream", False) and "messages" in params:
-            response_contents = [""] * params.get("n", 1)
-            finish_reasons = [""] * params.get("n", 1)
-            completion_tokens = 0
+            stream = _ChatCompletionStream(params)
+            # Send the chat completion request to OpenAI's API and process the response in chunks
+            for chunk in completions.create(**params):
+                stream.add(chunk)
+            return stream.completion()
 
-            # Set the terminal text color to green
-            iostream.print("\033[32m", end="")
+        # If streaming is not enabled, send a regular chat completion request
+        params = params.copy()
+        params["stream"] = False
+        return completions.create(**params)
 
-            # Prepare for potential function call
-            full_function_call: Optional[Dict[str, Any]] = None
-            full_tool_calls: Optional[List[Optional[Dict[str, Any]]]] = None
+    async def a_create(self, params: Dict[str, Any]) -> ChatCompletion:
+        """Create a completion for a given config using openai's async client.
 
-            # Send the chat completion request to OpenAI's API and process the response in chunks
-            for chunk in completions.create(**params):
-                if chunk.choices:
-                    for choice in chunk.choices:
-                        content = choice.delta.content
-                        tool_calls_chunks = choice.delta.tool_calls
-                        finish_reasons[choice.index] = choice.finish_reason
-
-                        # todo: remove this after function calls are removed from the API
-                        # the code should work regardless of whether function calls are removed or not, but test_chat_functions_stream should fail
-                        # begin block
-                        function_call_chunk = (
-                            choice.delta.function_call if hasattr(choice.delta, "function_call") else None
-                        )
-                        # Handle function call
-                        if function_call_chunk:
-                            # Handle function call
-                            if function_call_chunk:
-                                full_function_call, completion_tokens = OpenAIWrapper._update_function_call_from_chunk(
-                                    function_call_chunk, full_function_call, completion_tokens
-                                )
-                            if not content:
-                                continue
-                        # end block
-
-                        # Handle tool calls
-                        if tool_calls_chunks:
-                            for tool_calls_chunk in tool_calls_chunks:
-                                # the current tool call to be reconstructed
-                                ix = tool_calls_chunk.index
-                                if full_tool_calls is None:
-                                    full_tool_calls = []
-                                if ix >= len(full_tool_calls):
-                                    # in case ix is not sequential
-                                    full_tool_calls = full_tool_calls + [None] * (ix - len(full_tool_calls) + 1)
-
-                                full_tool_calls[ix], completion_tokens = OpenAIWrapper._update_tool_calls_from_chunk(
-                                    tool_calls_chunk, full_tool_calls[ix], completion_tokens
-                                )
-                                if not content:
-                                    continue
-
-                        # End handle tool calls
-
-                        # If content is present, print it to the terminal and update response variables
-                        if content is not None:
-                            iostream.print(content, end="", flush=True)
-                            response_contents[choice.index] += content
-                            completion_tokens += 1
-                        else:
-                            # iostream.print()
-                            pass
-
-            # Reset the terminal text color
-            iostream.print("\033[0m\n")
-
-            # Prepare the final ChatCompletion object based on the accumulated data
-            model = chunk.model.replace("gpt-35", "gpt-3.5")  # hack for Azure API
-            prompt_tokens = count_token(params["messages"], model)
-            response = ChatCompletion(
-                id=chunk.id,
-                model=chunk.model,
-                created=chunk.created,
-                object="chat.completion",
-                choices=[],
-                usage=CompletionUsage(
-                    prompt_tokens=prompt_tokens,
-                    completion_tokens=completion_tokens,
-                    total_tokens=prompt_tokens + completion_tokens,
-                ),
-            )
-            for i in range(len(response_contents)):
-                if OPENAIVERSION >= "1.5":  # pragma: no cover
-                    # OpenAI versions 1.5.0 and above
-                    choice = Choice(
-                        index=i,
-                        finish_reason=finish_reasons[i],
-                        message=ChatCompletionMessage(
-                            role="assistant",
-                            content=response_contents[i],
-                            function_call=full_function_call,
-                            tool_calls=full_tool_calls,
-                        ),
-                        logprobs=None,
-                    )
-                else:
-                    # OpenAI versions below 1.5.0
-                    choice = Choice(  # type: ignore [call-arg]
-                        index=i,
-                        finish_reason=finish_reasons[i],
-                        message=ChatCompletionMessage(
-                            role="assistant",
-                            content=response_contents[i],
-                            function_call=full_function_call,
-                            tool_calls=full_tool_calls,
-                        ),
-                    )
+        Falls back to running `create` in a worker thread if no async client was given.
 
-                response.choices.append(choice)
-        else:
-            # If streaming is not enabled, send a regular chat completion request
-            params = params.copy()
-            params["stream"] = False
-            response = completions.create(**params)
+        Args:
+            params: The params for the completion.
 
-        return response
+        Returns:
+            The completion.
+        """
+        async_client = self._async_client()
+        if async_client is None:
+            return await asyncio.to_thread(self.create, params)
 
-    def cost(self, response: Union[ChatCompletion, Completion]) -> float:
+        completions: AsyncCompletions = async_client.chat.completions if "messages" in params else async_client.completions  # type: ignore [attr-defined]
+        if params.get("stream", False) and "messages" in params:
+            stream = _ChatCompletionStream(params)
+            async for chunk in await completions.create(**params):
+                stream.add(chunk)
+            return stream.completion()
+
+        params = params.copy()
+        params["stream"] = False
+        return await completions.create(**params)
+
+    @staticmethod
+    def cost(response: Union[ChatCompletion, Completion]) -> float:
         """Calculate the cost of the response."""
         model = response.model
         if model not in OAI_PRICE1K:
@@ -364,6 +491,57 @@ class OpenAIClient:
         }
 
 
+@dataclass
+class _CreateCall:
+    """One config-list entry's share of an `OpenAIWrapper.create` call."""
+
+    index: int
+    client: ModelClient
+    params: Dict[str, Any]
+    cache: Optional[AbstractCache]
+    key: Optional[str]
+    filter_func: Optional[Callable[..., bool]]
+    context: Optional[Dict[str, Any]]
+    agent: Any
+    price: Optional[Tuple[float, float]]
+    rate_limiter: Optional[ModelRateLimiter] = None
+    priority: Union[str, int, None] = None
+
+
+class _InFlight:
+    """Identical requests in flight, so that concurrent callers share one upstream call.
+
+    Only cacheable calls are coalesced: a caller arriving a moment after the leader finished would get the leader's
+    response from the cache anyway. Threads and coroutines are tracked separately, and coroutines per event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Any, Any] = {}
+
+    def lead(self, key: Any, flight: Any) -> Any:
+        """Register `flight` under `key` and return None, or return the flight already there."""
+        with self._lock:
+            existing = self._flights.get(key)
+            if existing is None:
+                self._flights[key] = flight
+            return existing
+
+    def land(self, key: Any, flight: Any) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+
+class _SyncFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+
+_in_flight = _InFlight()
+
+
 class OpenAIWrapper:
     """A wrapper class for openai client."""
 
@@ -378,6 +556,10 @@ class OpenAIWrapper:
         "api_type",
         "tags",
         "price",
+        "weight",
+        "route_group",
+        "rate_limit",
+        "priority",
     }
 
     openai_kwargs = set(inspect.getfullargspec(OpenAI.__init__).kwonlyargs)
@@ -416,11 +598,16 @@ class OpenAIWrapper:
 
             base_config: base config. It can contain both keyword arguments for openai client
                 and additional kwargs.
+                It can also contain `routing`, a dict of `LatencyRouter` options (or True for the defaults), to try
+                the config_list entries in order of observed latency and health instead of strictly in order, and to
+                hedge slow requests in `a_create`. Entries may then set `weight` and `route_group`, see
+                `autogen.oai.routing.LatencyRouter`.
                 When using OpenAI or Azure OpenAI endpoints, please specify a non-empty 'model' either in `base_config` or in each config of `config_list`.
         """
 
         if logging_enabled():
             log_new_wrapper(self, locals())
+        routing = base_config.pop("routing", None)
         openai_config, extra_kwargs = self._separate_openai_config(base_config)
         # It's OK if "model" is not provided in base_config or config_list
         # Because one can provide "model" at `create` time.
@@ -438,8 +625,20 @@ class OpenAIWrapper:
         else:
             self._register_default_client(extra_kwargs, openai_config)
             self._config_list = [extra_kwargs]
+        self._router: Optional[LatencyRouter] = None
+        if routing is not None and routing is not False:
+            options = routing if isinstance(routing, dict) else {}
+            endpoints = [self._endpoint_key(config, openai_config) for config in (config_list or [extra_kwargs])]
+            self._router = LatencyRouter.from_config(self._config_list, endpoints, **options)
         self.wrapper_id = id(self)
 
+    @staticmethod
+    def _endpoint_key(config: Dict[str, Any], openai_config: Dict[str, Any]) -> Tuple[str, Optional[str], Optional[str]]:
+        """Identify the endpoint a config entry calls, so that wrappers calling the same one share latency stats."""
+        merged = {**openai_config, **config}
+        base_url = merged.get("base_url") or merged.get("azure_endpoint")
+        return (merged.get("api_type") or "openai", str(base_url) if base_url else None, merged.get("model"))
+
     def _separate_openai_config(self, config: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         """Separate the config into openai_config and extra_kwargs."""
         openai_config = {k: v for k, v in config.items() if k in self.openai_kwargs}
@@ -477,6 +676,19 @@ class OpenAIWrapper:
             if key in config:
                 openai_config[key] = config[key]
 
+    @staticmethod
+    def _async_openai_client_factory(
+        client_cls: Union[Type[AsyncOpenAI], Type[AsyncAzureOpenAI]], openai_config: Dict[str, Any]
+    ) -> Optional[Callable[[], Union[AsyncOpenAI, AsyncAzureOpenAI]]]:
+        """Return a factory for the async counterpart of an openai client.
+
+        Returns None if the config passes its own `http_client`, which is synchronous and cannot drive an async
+        client. `OpenAIClient.a_create` then runs `create` in a worker thread.
+        """
+        if openai_config.get("http_client") is not None:
+            return None
+        return functools.partial(client_cls, **openai_config)
+
     def _register_default_client(self, config: Dict[str, Any], openai_config: Dict[str, Any]) -> None:
         """Create a client with the given config to override openai_config,
         after removing extra kwargs.
@@ -498,56 +710,22 @@ class OpenAIWrapper:
             )
             # TODO: logging for custom client
         else:
-            if api_type is not None and api_type.startswith("azure"):
+            is_azure = api_type is not None and api_type.startswith("azure")
+            # Imports the provider's client module the first time its api_type is seen
+            provider_cls = _provider_client_cls(api_type) if api_type is not None and not is_azure else None
+            if is_azure:
                 self._configure_azure_openai(config, openai_config)
                 client = AzureOpenAI(**openai_config)
-                self._clients.append(OpenAIClient(client))
-            elif api_type is not None and api_type.startswith("google"):
-                if gemini_import_exception:
-                    raise ImportError("Please install `google-generativeai` to use Google OpenAI API.")
-                client = GeminiClient(**openai_config)
-                self._clients.append(client)
-            elif api_type is not None and api_type.startswith("anthropic"):
-                if "api_key" not in config:
+                self._clients.append(OpenAIClient(client, self._async_openai_client_factory(AsyncAzureOpenAI, openai_config)))
+            elif provider_cls is not None:
+                if api_type.startswith("bedrock") or (api_type.startswith("anthropic") and "api_key" not in config):
+                    # Anthropic models can also be served through Bedrock
                     self._configure_openai_config_for_bedrock(config, openai_config)
-                if anthropic_import_exception:
-                    raise ImportError("Please install `anthropic` to use Anthropic API.")
-                client = AnthropicClient(**openai_config)
-                self._clients.append(client)
-            elif api_type is not None and api_type.startswith("mistral"):
-                if mistral_import_exception:
-                    raise ImportError("Please install `mistralai` to use the Mistral.AI API.")
-                client = MistralAIClient(**openai_config)
-                self._clients.append(client)
-            elif api_type is not None and api_type.startswith("together"):
-                if together_import_exception:
-                    raise ImportError("Please install `together` to use the Together.AI API.")
-                client = TogetherClient(**openai_config)
-                self._clients.append(client)
-            elif api_type is not None and api_type.startswith("groq"):
-                if groq_import_exception:
-                    raise ImportError("Please install `groq` to use the Groq API.")
-                client = GroqClient(**openai_config)
-                self._clients.append(client)
-            elif api_type is not None and api_type.startswith("cohere"):
-                if cohere_import_exception:
-                    raise ImportError("Please install `cohere` to use the Cohere API.")
-                client = CohereClient(**openai_config)
-                self._clients.append(client)
-            elif api_type is not None and api_type.startswith("ollama"):
-                if ollama_import_exception:
-                    raise ImportError("Please install `ollama` to use the Ollama API.")
-                client = OllamaClient(**openai_config)
-                self._clients.append(client)
-            elif api_type is not None and api_type.startswith("bedrock"):
-                self._configure_openai_config_for_bedrock(config, openai_config)
-                if bedrock_import_exception:
-                    raise ImportError("Please install `boto3` to use the Amazon Bedrock API.")
-                client = BedrockClient(**openai_config)
+                client = provider_cls(**openai_config)
                 self._clients.append(client)
             else:
                 client = OpenAI(**openai_config)
-                self._clients.append(OpenAIClient(client))
+                self._clients.append(OpenAIClient(client, self._async_openai_client_factory(AsyncOpenAI, openai_config)))
 
             if logging_enabled():
                 log_new_client(client, self, openai_config)
@@ -626,6 +804,7 @@ class OpenAIWrapper:
             ]
         return params
 
+    @tracing.traced("llm.create", _create_trace_attributes)
     def create(self, **config: Any) -> ModelClient.ModelClientResponseProtocol:
         """Make a completion for a given config using available clients.
         Besides the kwargs allowed in openai's [or other] client, we allow the following additional kwargs.
@@ -666,8 +845,294 @@ class OpenAIWrapper:
         if ERROR:
             raise ERROR
         invocation_id = str(uuid.uuid4())
-        last = len(self._clients) - 1
-        # Check if all configs in config list are activated
+        self._check_clients_activated()
+        order = self._route_order()
+        for position, i in enumerate(order):
+            is_last = position == len(order) - 1
+            client = self._clients[i]
+            call = self._prepare_create_call(i, client, config)
+            response = self._cached_response(call, invocation_id)
+            flight = None
+            if response is None and call.key is not None:
+                flight = _SyncFlight()
+                leader = _in_flight.lead(call.key, flight)
+                if leader is not None:
+                    # An identical request is in flight; share its response
+                    flight = None
+                    leader.done.wait()
+                    response = self._shared_response(call, leader.response, invocation_id)
+            if response is None:
+                request_ts = get_current_ts()
+                try:
+                    response = self._client_create(call)
+                except APIError as err:
+                    self._handle_create_error(call, err, is_last, invocation_id, request_ts)
+                    continue
+                else:
+                    self._record_response(call, response, invocation_id, request_ts)
+                finally:
+                    if flight is not None:
+                        flight.response = response
+                        _in_flight.land(call.key, flight)
+                        flight.done.set()
+                if self._accept_response(call, response, is_last):
+                    return response
+            elif self._accept_response(call, response, is_last, cached=True):
+                return response
+        raise RuntimeError("Should not reach here.")
+
+    @tracing.traced("llm.create", _create_trace_attributes)
+    async def a_create(self, **config: Any) -> ModelClient.ModelClientResponseProtocol:
+        """Make a completion for a given config using available clients, without blocking the event loop.
+
+        Accepts the same arguments as `create` and goes through the same cache lookup, usage accounting and
+        config-list fallback. Clients with an `a_create` coroutine, such as the OpenAI and Azure OpenAI clients
+        backed by `AsyncOpenAI`, are awaited directly; other clients run `create` in a worker thread. Cache
+        lookups stay synchronous, which is cheap with the default in-memory L1 cache.
+
+        With `routing` configured, a request still pending after its endpoint's hedge deadline is duplicated to the
+        next config in the routing order; the first success is used and the other request is cancelled.
+
+        Raises:
+            - RuntimeError: If all declared custom model clients are not registered
+            - APIError: If any model client create call raises an APIError
+        """
+        if ERROR:
+            raise ERROR
+        invocation_id = str(uuid.uuid4())
+        self._check_clients_activated()
+        pending = self._route_order()
+        while pending:
+            i = pending.pop(0)
+            call = self._prepare_create_call(i, self._clients[i], config)
+            response = self._cached_response(call, invocation_id)
+            flight = flight_key = None
+            if response is None and call.key is not None:
+                flight_key = (asyncio.get_running_loop(), call.key)
+                flight = asyncio.get_running_loop().create_future()
+                leader = _in_flight.lead(flight_key, flight)
+                if leader is not None:
+                    # An identical request is in flight; share its response
+                    flight = None
+                    response = self._shared_response(call, await asyncio.shield(leader), invocation_id)
+            if response is not None:
+                if self._accept_response(call, response, not pending, cached=True):
+                    return response
+                continue
+            request_ts = get_current_ts()
+            primary = call
+            try:
+                call, response, err = await self._a_create_hedged(call, pending, config, invocation_id, request_ts)
+                if err is None:
+                    self._record_response(call, response, invocation_id, request_ts)
+            finally:
+                if flight is not None:
+                    # A hedge may have answered from another config, whose response only suits identical params
+                    flight.set_result(response if call.key == primary.key else None)
+                    _in_flight.land(flight_key, flight)
+            if err is not None:
+                self._handle_create_error(call, err, not pending, invocation_id, request_ts)
+                continue
+            if self._accept_response(call, response, not pending):
+                return response
+        raise RuntimeError("Should not reach here.")
+
+    def _route_order(self) -> List[int]:
+        """Indices of the config list entries in the order to try them."""
+        if self._router is None:
+            return list(range(len(self._clients)))
+        return self._router.order()
+
+    def _record_latency(self, i: int, start: float, ok: bool) -> None:
+        if self._router is not None:
+            self._router.record(i, time.monotonic() - start, ok)
+
+    @staticmethod
+    def _estimate_tokens(call: "_CreateCall") -> int:
+        """Tokens to reserve for a call: the prompt plus the most the completion may use."""
+        params = call.params
+        if call.rate_limiter is None or call.rate_limiter.tokens is None:
+            return 0
+        completion_tokens = params.get("max_tokens") or params.get("max_completion_tokens") or DEFAULT_MAX_TOKENS
+        return OpenAIWrapper._prompt_tokens(params) + completion_tokens * params.get("n", 1)
+
+    @staticmethod
+    def _prompt_tokens(params: Dict[str, Any]) -> int:
+        model = params.get("model") or "gpt-4o"
+        try:
+            return count_token(params.get("messages") or params.get("prompt") or "", model)
+        except Exception:
+            return len(str(params.get("messages") or params.get("prompt") or "")) // 4
+
+    def _settle_reservation(
+        self,
+        call: "_CreateCall",
+        estimated: int,
+        response: Optional[ModelClient.ModelClientResponseProtocol] = None,
+        err: Optional[BaseException] = None,
+    ) -> None:
+        """Correct the token reservation to the actual usage, and back off on rate limit errors."""
+        limiter = call.rate_limiter
+        if limiter is None:
+            return
+        if response is not None:
+            limiter.settle(estimated, call.client.get_usage(response).get("total_tokens"))
+            return
+        # A failed request produced no completion; holding its estimate would starve every caller sharing the limiter
+        limiter.settle(estimated, 0)
+        if isinstance(err, RateLimitError):
+            # The next requests would be rejected too
+            limiter.backoff(self._retry_after(err))
+
+    @staticmethod
+    def _retry_after(err: APIError) -> float:
+        try:
+            return float(err.response.headers.get("retry-after"))
+        except (AttributeError, TypeError, ValueError):
+            return RATE_LIMIT_BACKOFF
+
+    def _client_create(self, call: "_CreateCall") -> ModelClient.ModelClientResponseProtocol:
+        """Call one client's create under its rate limit, timing it for the router."""
+        estimated = self._estimate_tokens(call)
+        if call.rate_limiter is not None:
+            call.rate_limiter.acquire(estimated, call.priority)
+        start = time.monotonic()
+        try:
+            response = call.client.create(call.params)
+        except APIError as err:
+            self._record_latency(call.index, start, ok=False)
+            self._settle_reservation(call, estimated, err=err)
+            raise
+        except Exception as err:
+            self._settle_reservation(call, estimated, err=err)
+            raise
+        self._record_latency(call.index, start, ok=True)
+        self._settle_reservation(call, estimated, response)
+        return response
+
+    async def _a_reserve(self, call: "_CreateCall") -> int:
+        """Wait for room under the call's rate limit; returns the tokens reserved."""
+        estimated = self._estimate_tokens(call)
+        if call.rate_limiter is not None:
+            await call.rate_limiter.a_acquire(estimated, call.priority)
+        return estimated
+
+    async def _a_client_create(
+        self, call: "_CreateCall", estimated: Optional[int] = None
+    ) -> ModelClient.ModelClientResponseProtocol:
+        """Await one client's create call under its rate limit, timing it for the router.
+
+        Args:
+            call: The call to send.
+            estimated: Tokens already reserved for the call. None to reserve them first.
+        """
+        if estimated is None:
+            estimated = await self._a_reserve(call)
+        client = call.client
+        start = time.monotonic()
+        try:
+            if hasattr(client, "a_create"):
+                response = await client.a_create(call.params)
+            else:
+                response = await asyncio.to_thread(client.create, call.params)
+        except APIError as err:
+            self._record_latency(call.index, start, ok=False)
+            self._settle_reservation(call, estimated, err=err)
+            raise
+        except asyncio.CancelledError:
+            # A hedged loser: its latency is only a lower bound. It was sent, so its prompt still counts against the
+            # token limit, but the completion budget it reserved is returned.
+            if self._router is not None:
+                self._router.record_censored(call.index, time.monotonic() - start)
+            if call.rate_limiter is not None and estimated:
+                call.rate_limiter.settle(estimated, self._prompt_tokens(call.params))
+            raise
+        except Exception as err:
+            self._settle_reservation(call, estimated, err=err)
+            raise
+        self._record_latency(call.index, start, ok=True)
+        self._settle_reservation(call, estimated, response)
+        return response
+
+    def _shared_response(
+        self,
+        call: "_CreateCall",
+        response: Optional[ModelClient.ModelClientResponseProtocol],
+        invocation_id: str,
+    ) -> Optional[ModelClient.ModelClientResponseProtocol]:
+        """Give a coalesced caller its own copy of the leader's response, logged like a cache hit."""
+        if response is None:
+            # The leader failed; this caller makes its own request
+            return None
+        response = copy.copy(response)
+        response.message_retrieval_function = call.client.message_retrieval
+        if logging_enabled():
+            log_chat_completion(
+                invocation_id=invocation_id,
+                client_id=id(call.client),
+                wrapper_id=id(self),
+                agent=call.agent,
+                request=call.params,
+                response=response,
+                is_cached=1,
+                cost=response.cost,
+                start_time=get_current_ts(),
+            )
+        return response
+
+    async def _a_create_hedged(
+        self,
+        call: "_CreateCall",
+        pending: List[int],
+        config: Dict[str, Any],
+        invocation_id: str,
+        request_ts: str,
+    ) -> Tuple["_CreateCall", Optional[ModelClient.ModelClientResponseProtocol], Optional[APIError]]:
+        """Send `call`, and if it outlasts its hedge deadline, race a duplicate to the next entry in `pending`.
+
+        The backup entry is taken off `pending` once it is sent. Returns the call that produced the first success and
+        its response, or the call that failed last and its error.
+        """
+        hedge_after = None
+        if self._router is not None and pending and not call.params.get("stream", False):
+            # Streamed replies are echoed as they arrive, so two of them would interleave
+            hedge_after = self._router.hedge_after(call.index)
+
+        # Wait for the rate limit first, so the hedge deadline only covers the request itself
+        estimated = await self._a_reserve(call)
+        calls = {asyncio.ensure_future(self._a_client_create(call, estimated)): call}
+        try:
+            if hedge_after is not None:
+                done, _ = await asyncio.wait(calls, timeout=hedge_after)
+                if not done:
+                    backup_index = pending.pop(0)
+                    backup = self._prepare_create_call(backup_index, self._clients[backup_index], config)
+                    self._router.hedges += 1
+                    calls[asyncio.ensure_future(self._a_client_create(backup))] = backup
+
+            failed = None
+            while calls:
+                done, _ = await asyncio.wait(calls, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    finished = calls.pop(task)
+                    err = task.exception()
+                    if err is None:
+                        if finished is not call:
+                            self._router.hedge_wins += 1
+                        return finished, task.result(), None
+                    if not isinstance(err, APIError):
+                        raise err
+                    if calls:
+                        # The other request is still running; report this failure without giving up
+                        self._handle_create_error(finished, err, False, invocation_id, request_ts)
+                    failed = (finished, None, err)
+            return failed
+        finally:
+            for task in calls:
+                task.cancel()
+
+    def _check_clients_activated(self) -> None:
+        """Raise if a custom model client in the config list has not been registered."""
         non_activated = [
             client.config["model_client_cls"] for client in self._clients if isinstance(client, PlaceHolderClient)
         ]
@@ -675,152 +1140,195 @@ class OpenAIWrapper:
             raise RuntimeError(
                 f"Model client(s) {non_activated} are not activated. Please register the custom model clients using `register_model_client` or filter them out form the config list."
             )
-        for i, client in enumerate(self._clients):
-            # merge the input config with the i-th config in the config list
-            full_config = {**config, **self._config_list[i]}
-            # separate the config into create_config and extra_kwargs
-            create_config, extra_kwargs = self._separate_create_config(full_config)
-            api_type = extra_kwargs.get("api_type")
-            if api_type and api_type.startswith("azure") and "model" in create_config:
-                create_config["model"] = create_config["model"].replace(".", "")
-            # construct the create params
-            params = self._construct_create_params(create_config, extra_kwargs)
-            # get the cache_seed, filter_func and context
-            cache_seed = extra_kwargs.get("cache_seed", LEGACY_DEFAULT_CACHE_SEED)
-            cache = extra_kwargs.get("cache")
-            filter_func = extra_kwargs.get("filter_func")
-            context = extra_kwargs.get("context")
-            agent = extra_kwargs.get("agent")
-            price = extra_kwargs.get("price", None)
-            if isinstance(price, list):
-                price = tuple(price)
-            elif isinstance(price, float) or isinstance(price, int):
-                logger.warning(
-                    "Input price is a float/int. Using the same price for prompt and completion tokens. Use a list/tuple if prompt and completion token prices are different."
-                )
-                price = (price, price)
-
-            total_usage = None
-            actual_usage = None
-
-            cache_client = None
-            if cache is not None:
-                # Use the cache object if provided.
-                cache_client = cache
-            elif cache_seed is not None:
-                # Legacy cache behavior, if cache_seed is given, use DiskCache.
-                cache_client = Cache.disk(cache_seed, LEGACY_CACHE_DIR)
-
-            if cache_client is not None:
-                with cache_client as cache:
-                    # Try to get the response from cache
-                    key = get_key(params)
-                    request_ts = get_current_ts()
-
-                    response: ModelClient.ModelClientResponseProtocol = cache.get(key, None)
-
-                    if response is not None:
-                        response.message_retrieval_function = client.message_retrieval
-                        try:
-                            response.cost  # type: ignore [attr-defined]
-                        except AttributeError:
-                            # update attribute if cost is not calculated
-                            response.cost = client.cost(response)
-                            cache.set(key, response)
-                        total_usage = client.get_usage(response)
-
-                        if logging_enabled():
-                            # Log the cache hit
-                            # TODO: log the config_id and pass_filter etc.
-                            log_chat_completion(
-                                invocation_id=invocation_id,
-                                client_id=id(client),
-                                wrapper_id=id(self),
-                                agent=agent,
-                                request=params,
-                                response=response,
-                                is_cached=1,
-                                cost=response.cost,
-                                start_time=request_ts,
-                            )
-
-                        # check the filter
-                        pass_filter = filter_func is None or filter_func(context=context, response=response)
-                        if pass_filter or i == last:
-                            # Return the response if it passes the filter or it is the last client
-                            response.config_id = i
-                            response.pass_filter = pass_filter
-                            self._update_usage(actual_usage=actual_usage, total_usage=total_usage)
-                            return response
-                        continue  # filter is not passed; try the next config
+
+    def _prepare_create_call(self, i: int, client: ModelClient, config: Dict[str, Any]) -> "_CreateCall":
+        """Merge the create config with the i-th config in the config list."""
+        full_config = {**config, **self._config_list[i]}
+        # separate the config into create_config and extra_kwargs
+        create_config, extra_kwargs = self._separate_create_config(full_config)
+        api_type = extra_kwargs.get("api_type")
+        if api_type and api_type.startswith("azure") and "model" in create_config:
+            create_config["model"] = create_config["model"].replace(".", "")
+        # construct the create params
+        params = self._construct_create_params(create_config, extra_kwargs)
+        # get the cache_seed, filter_func and context
+        cache_seed = extra_kwargs.get("cache_seed", LEGACY_DEFAULT_CACHE_SEED)
+        cache = extra_kwargs.get("cache")
+        price = extra_kwargs.get("price", None)
+        if isinstance(price, list):
+            price = tuple(price)
+        elif isinstance(price, float) or isinstance(price, int):
+            logger.warning(
+                "Input price is a float/int. Using the same price for prompt and completion tokens. Use a list/tuple if prompt and completion token prices are different."
+            )
+            price = (price, price)
+
+        cache_client = None
+        if cache is not None:
+            # Use the cache object if provided.
+            cache_client = cache
+        elif cache_seed is not None:
+            # Legacy cache behavior, if cache_seed is given, use DiskCache behind an in-memory L1.
+            cache_client = _legacy_cache(cache_seed)
+
+        return _CreateCall(
+            index=i,
+            client=client,
+            params=params,
+            cache=cache_client,
+            key=get_incremental_key(params) if cache_client is not None else None,
+            filter_func=extra_kwargs.get("filter_func"),
+            context=extra_kwargs.get("context"),
+            agent=extra_kwargs.get("agent"),
+            price=price,
+            rate_limiter=self._rate_limiter(extra_kwargs.get("rate_limit"), params),
+            priority=extra_kwargs.get("priority"),
+        )
+
+    @staticmethod
+    def _rate_limiter(rate_limit: Optional[Dict[str, Any]], params: Dict[str, Any]) -> Optional[ModelRateLimiter]:
+        """The shared limiter for a config's `rate_limit`, e.g. {"rpm": 500, "tpm": 30000}, keyed by model."""
+        if not rate_limit:
+            return None
+        key = rate_limit.get("key") or params.get("model") or "default"
+        return get_rate_limiter(key, rate_limit.get("rpm"), rate_limit.get("tpm"))
+
+    def _cached_response(
+        self, call: "_CreateCall", invocation_id: str
+    ) -> Optional[ModelClient.ModelClientResponseProtocol]:
+        """Look the call up in its cache, returning None on a miss or when caching is off."""
+        if call.cache is None:
+            return None
+        client = call.client
+        with call.cache as cache:
+            # Try to get the response from cache
+            request_ts = get_current_ts()
+            response: ModelClient.ModelClientResponseProtocol = cache.get(call.key, None)
+            if response is None:
+                return None
+
+            response.message_retrieval_function = client.message_retrieval
             try:
-                request_ts = get_current_ts()
-                response = client.create(params)
-            except APITimeoutError as err:
-                logger.debug(f"config {i} timed out", exc_info=True)
-                if i == last:
-                    raise TimeoutError(
-                        "OpenAI API call timed out. This could be due to congestion or too small a timeout value. The timeout can be specified by setting the 'timeout' value (in seconds) in the llm_config (if you are using agents) or the OpenAIWrapper constructor (if you are using the OpenAIWrapper directly)."
-                    ) from err
-            except APIError as err:
-                error_code = getattr(err, "code", None)
-                if logging_enabled():
-                    log_chat_completion(
-                        invocation_id=invocation_id,
-                        client_id=id(client),
-                        wrapper_id=id(self),
-                        agent=agent,
-                        request=params,
-                        response=f"error_code:{error_code}, config {i} failed",
-                        is_cached=0,
-                        cost=0,
-                        start_time=request_ts,
-                    )
+                response.cost  # type: ignore [attr-defined]
+            except AttributeError:
+                # update attribute if cost is not calculated
+                response.cost = client.cost(response)
+                cache.set(call.key, response)
 
-                if error_code == "content_filter":
-                    # raise the error for content_filter
-                    raise
-                logger.debug(f"config {i} failed", exc_info=True)
-                if i == last:
-                    raise
-            else:
-                # add cost calculation before caching no matter filter is passed or not
-                if price is not None:
-                    response.cost = self._cost_with_customized_price(response, price)
-                else:
-                    response.cost = client.cost(response)
-                actual_usage = client.get_usage(response)
-                total_usage = actual_usage.copy() if actual_usage is not None else total_usage
-                self._update_usage(actual_usage=actual_usage, total_usage=total_usage)
-                if cache_client is not None:
-                    # Cache the response
-                    with cache_client as cache:
-                        cache.set(key, response)
-
-                if logging_enabled():
-                    # TODO: log the config_id and pass_filter etc.
-                    log_chat_completion(
-                        invocation_id=invocation_id,
-                        client_id=id(client),
-                        wrapper_id=id(self),
-                        agent=agent,
-                        request=params,
-                        response=response,
-                        is_cached=0,
-                        cost=response.cost,
-                        start_time=request_ts,
-                    )
+        if logging_enabled():
+            # Log the cache hit
+            # TODO: log the config_id and pass_filter etc.
+            log_chat_completion(
+                invocation_id=invocation_id,
+                client_id=id(client),
+                wrapper_id=id(self),
+                agent=call.agent,
+                request=call.params,
+                response=response,
+                is_cached=1,
+                cost=response.cost,
+                start_time=request_ts,
+            )
+        return response
 
-                response.message_retrieval_function = client.message_retrieval
-                # check the filter
-                pass_filter = filter_func is None or filter_func(context=context, response=response)
-                if pass_filter or i == last:
-                    # Return the response if it passes the filter or it is the last client
-                    response.config_id = i
-                    response.pass_filter = pass_filter
-                    return response
-                continue  # filter is not passed; try the next config
-        raise RuntimeError("Should not reach here.")
+    def _handle_create_error(
+        self, call: "_CreateCall", err: APIError, is_last: bool, invocation_id: str, request_ts: str
+    ) -> None:
+        """Re-raise a failed create call if no config is left to fall back to."""
+        i = call.index
+        if isinstance(err, APITimeoutError):
+            logger.debug(f"config {i} timed out", exc_info=(type(err), err, err.__traceback__))
+            if is_last:
+                raise TimeoutError(
+                    "OpenAI API call timed out. This could be due to congestion or too small a timeout value. The timeout can be specified by setting the 'timeout' value (in seconds) in the llm_config (if you are using agents) or the OpenAIWrapper constructor (if you are using the OpenAIWrapper directly)."
+                ) from err
+            return
+
+        error_code = getattr(err, "code", None)
+        tracing.current_span().add("llm.errors", 1)
+        if logging_enabled():
+            log_chat_completion(
+                invocation_id=invocation_id,
+                client_id=id(call.client),
+                wrapper_id=id(self),
+                agent=call.agent,
+                request=call.params,
+                response=f"error_code:{error_code}, config {i} failed",
+                is_cached=0,
+                cost=0,
+                start_time=request_ts,
+            )
+
+        if error_code == "content_filter":
+            # raise the error for content_filter
+            raise err
+        logger.debug(f"config {i} failed", exc_info=(type(err), err, err.__traceback__))
+        if is_last:
+            raise err
+
+    def _record_response(
+        self,
+        call: "_CreateCall",
+        response: ModelClient.ModelClientResponseProtocol,
+        invocation_id: str,
+        request_ts: str,
+    ) -> None:
+        """Price, account, cache and log a fresh response."""
+        client = call.client
+        # add cost calculation before caching no matter filter is passed or not
+        if call.price is not None:
+            response.cost = self._cost_with_customized_price(response, call.price)
+        else:
+            response.cost = client.cost(response)
+        actual_usage = client.get_usage(response)
+        total_usage = actual_usage.copy() if actual_usage is not None else None
+        self._update_usage(actual_usage=actual_usage, total_usage=total_usage)
+        span = tracing.current_span()
+        if span.recording and actual_usage is not None:
+            # Added up the enclosing spans too, giving the tokens and cost of each reply and turn
+            for key in ("prompt_tokens", "completion_tokens", "cost"):
+                span.add(f"llm.{key}", actual_usage.get(key) or 0)
+        if call.cache is not None:
+            # Cache the response
+            with call.cache as cache:
+                cache.set(call.key, response)
+
+        if logging_enabled():
+            # TODO: log the config_id and pass_filter etc.
+            log_chat_completion(
+                invocation_id=invocation_id,
+                client_id=id(client),
+                wrapper_id=id(self),
+                agent=call.agent,
+                request=call.params,
+                response=response,
+                is_cached=0,
+                cost=response.cost,
+                start_time=request_ts,
+            )
+
+        response.message_retrieval_function = client.message_retrieval
+
+    def _accept_response(
+        self,
+        call: "_CreateCall",
+        response: ModelClient.ModelClientResponseProtocol,
+        is_last: bool,
+        cached: bool = False,
+    ) -> bool:
+        """Check the filter; return whether the response should be returned rather than trying the next config."""
+        pass_filter = call.filter_func is None or call.filter_func(context=call.context, response=response)
+        if not pass_filter and not is_last:
+            return False
+        # Return the response if it passes the filter or it is the last client
+        response.config_id = call.index
+        response.pass_filter = pass_filter
+        tracing.current_span().set_attributes(
+            {"llm.model": call.params.get("model"), "llm.config_id": call.index, "llm.cached": cached}
+        )
+        if cached:
+            self._update_usage(actual_usage=None, total_usage=call.client.get_usage(response))
+        return True
 
     @staticmethod
     def _cost_with_customized_price(
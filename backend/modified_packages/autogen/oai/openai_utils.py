@@ -4,13 +4,17 @@
 #
 # Portions derived from  https://github.com/microsoft/autogen are under the MIT License.
 # SPDX-License-Identifier: MIT
+import copy
+import hashlib
 import importlib.metadata
 import json
 import logging
 import os
 import re
 import tempfile
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Set, Union
 
@@ -105,6 +109,119 @@ def get_key(config: Dict[str, Any]) -> str:
     return json.dumps(config, sort_keys=True)
 
 
+class IncrementalKeyHasher:
+    """Computes cache keys for create params without re-serializing content it has already hashed.
+
+    `get_key` JSON-serializes the whole params, including the full message history and tool schemas, on every call.
+    This hasher builds a structural hash instead:
+
+    - The message list is a hash chain over per-message digests. Each link is memoized by the previous chain value
+      and a tuple of the message's items, which for string values hashes and compares in O(1) because the strings
+      are shared even across deep copies. A growing conversation therefore only serializes its new messages.
+    - Other list and dict params, such as tool schemas, are hashed once per object and revalidated by equality
+      against a deep snapshot, which is cheap for unchanged objects.
+
+    Two params get the same key exactly when `get_key` would return the same string, barring hash collisions. The
+    keys themselves differ from `get_key`'s, so entries cached under the old scheme are not reused.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        """
+        Args:
+            maxsize (int): Maximum entries in each of the digest memos.
+        """
+        self.maxsize = maxsize
+        self._object_digests: OrderedDict = OrderedDict()
+        self._chain_digests: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _hash(data: str) -> str:
+        return hashlib.blake2b(data.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+    def _remember(self, memo: OrderedDict, key: Any, value: Any) -> None:
+        memo[key] = value
+        if len(memo) > self.maxsize:
+            memo.popitem(last=False)
+
+    def _value_digest(self, value: Any) -> str:
+        """Digest of a JSON-serializable value, memoized by object identity."""
+        entry = self._object_digests.get(id(value))
+        if entry is not None and entry[0] is value and entry[1] == value:
+            self._object_digests.move_to_end(id(value))
+            return entry[2]
+        digest = self._hash(json.dumps(value, sort_keys=True))
+        # Keeping a reference to value stops its id from being reused while the entry lives
+        self._remember(self._object_digests, id(value), (value, copy.deepcopy(value), digest))
+        return digest
+
+    def _messages_digest(self, messages: List[Any]) -> str:
+        chains = self._chain_digests
+        chain = ""
+        for message in messages:
+            link = None
+            if type(message) is dict:
+                # Types are part of the link since True == 1 but they serialize differently
+                link = (chain, tuple(message.items()), tuple(map(type, message.values())))
+                try:
+                    next_chain = chains.get(link)
+                except TypeError:
+                    # Unhashable values such as tool_calls
+                    link = None
+                else:
+                    if next_chain is not None:
+                        chains.move_to_end(link)
+                        chain = next_chain
+                        continue
+            if link is not None:
+                digest = self._hash(json.dumps(message, sort_keys=True))
+            else:
+                digest = self._value_digest(message)
+            next_chain = self._hash(f"{chain}:{digest}")
+            self._remember(chains, link if link is not None else (chain, digest), next_chain)
+            chain = next_chain
+        return chain
+
+    def key(self, config: Dict[str, Any]) -> str:
+        """Get a unique identifier of a configuration, like `get_key`.
+
+        Args:
+            config (dict): A configuration.
+
+        Returns:
+            str: A unique identifier which can be used as a cache key.
+        """
+        parts = []
+        with self._lock:
+            for name in sorted(config):
+                if name in NON_CACHE_KEY:
+                    continue
+                value = config[name]
+                if name == "messages" and isinstance(value, list):
+                    part = "m:" + self._messages_digest(value)
+                elif isinstance(value, (dict, list)):
+                    part = "v:" + self._value_digest(value)
+                else:
+                    part = json.dumps(value)
+                parts.append(f"{json.dumps(name)}={part}")
+        return "v2:" + self._hash("\n".join(parts))
+
+
+_key_hasher = IncrementalKeyHasher()
+
+
+def get_incremental_key(config: Dict[str, Any]) -> str:
+    """Get a unique identifier of a configuration, hashing only content not seen before.
+
+    Args:
+        config (dict): A configuration.
+
+    Returns:
+        str: A unique identifier which can be used as a cache key.
+    """
+    return _key_hasher.key(config)
+
+
 def is_valid_api_key(api_key: str) -> bool:
     """Determine if input is valid OpenAI API key.
 
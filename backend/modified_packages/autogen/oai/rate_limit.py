@@ -0,0 +1,319 @@
+# Copyright (c) 2023 - 2024, Owners of https://github.com/autogen-ai
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Portions derived from  https://github.com/microsoft/autogen are under the MIT License.
+# SPDX-License-Identifier: MIT
+"""Per-model request and token rate limits shared by every OpenAIWrapper in the process."""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Union
+
+# Lower values are served first when requests queue for capacity
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+DEFAULT_PRIORITY = "normal"
+
+
+def resolve_priority(priority: Union[str, int, None]) -> int:
+    """Map a priority name or number to its rank; lower ranks are served first."""
+    if priority is None:
+        return PRIORITIES[DEFAULT_PRIORITY]
+    if isinstance(priority, int):
+        return priority
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {priority}. Use one of {list(PRIORITIES)} or an int.")
+    return PRIORITIES[priority]
+
+
+class TokenBucket:
+    """A bucket holding up to `capacity` units, refilled continuously at `rate_per_minute`.
+
+    The level may go negative when usage is settled after the fact, which delays later requests accordingly.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None, now: float = 0.0):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be greater than 0")
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        self.level = self.capacity
+        self._updated = now
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available. Amounts above the capacity wait for a full bucket."""
+        self.refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float) -> None:
+        self.level -= amount
+
+
+class _Waiter:
+    __slots__ = ("rank", "seq", "tokens", "granted", "cancelled", "event", "loop", "future")
+
+    def __init__(self, rank: int, seq: int, tokens: int):
+        self.rank = rank
+        self.seq = seq
+        self.tokens = tokens
+        self.granted = False
+        self.cancelled = False
+        self.event: Optional[threading.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.future: Optional[asyncio.Future] = None
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.rank, self.seq) < (other.rank, other.seq)
+
+    def grant(self) -> None:
+        self.granted = True
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class ModelRateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets for one model, with a priority wait queue.
+
+    Callers reserve one request and an estimate of its tokens before calling the API, and settle the estimate
+    against the actual usage afterwards. When capacity runs out, callers queue and are admitted by priority, then
+    in arrival order. Threads wait with `acquire` and coroutines with `a_acquire`, on the same queue.
+
+    Attributes:
+        granted (int): Reservations granted.
+        queued (int): Reservations that had to wait.
+        wait_seconds (float): Total time spent waiting.
+        backoffs (int): Calls to `backoff`, i.e. rate limit errors reported by the API.
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            rpm (Optional[float]): Requests per minute. None for no request limit.
+            tpm (Optional[float]): Tokens per minute. None for no token limit.
+            clock (Callable[[], float]): Monotonic clock, overridable for tests.
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._queue: list = []
+        self._seq = itertools.count()
+        self._blocked_until = 0.0
+        self.requests: Optional[TokenBucket] = None
+        self.tokens: Optional[TokenBucket] = None
+        self.configure(rpm, tpm)
+        self.granted = 0
+        self.queued = 0
+        self.wait_seconds = 0.0
+        self.backoffs = 0
+
+    def configure(self, rpm: Optional[float], tpm: Optional[float]) -> None:
+        """Change the limits, keeping the current levels where a limit stays set."""
+        now = self._clock()
+        with self._lock:
+            self.rpm, self.tpm = rpm, tpm
+            self.requests = self._rebucket(self.requests, rpm, now)
+            self.tokens = self._rebucket(self.tokens, tpm, now)
+
+    @staticmethod
+    def _rebucket(bucket: Optional[TokenBucket], rate: Optional[float], now: float) -> Optional[TokenBucket]:
+        if rate is None:
+            return None
+        if bucket is None:
+            return TokenBucket(rate, now=now)
+        bucket.refill(now)
+        level = min(bucket.level, rate)
+        bucket = TokenBucket(rate, now=now)
+        bucket.level = level
+        return bucket
+
+    def _time_until(self, tokens: int, now: float) -> float:
+        wait = max(0.0, self._blocked_until - now)
+        if self.requests is not None:
+            wait = max(wait, self.requests.time_until(1, now))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.time_until(tokens, now))
+        return wait
+
+    def _consume(self, tokens: int) -> None:
+        if self.requests is not None:
+            self.requests.consume(1)
+        if self.tokens is not None:
+            self.tokens.consume(tokens)
+        self.granted += 1
+
+    def _dispatch(self) -> Optional[float]:
+        """Grant queued reservations in order while capacity lasts. Returns the wait for the next one, if any."""
+        now = self._clock()
+        while self._queue:
+            waiter = self._queue[0]
+            if waiter.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            wait = self._time_until(waiter.tokens, now)
+            if wait > 0:
+                return wait
+            heapq.heappop(self._queue)
+            self._consume(waiter.tokens)
+            waiter.grant()
+        return None
+
+    def _try_fast(self, tokens: int) -> bool:
+        if not self._queue and self._time_until(tokens, self._clock()) <= 0:
+            self._consume(tokens)
+            return True
+        return False
+
+    def _enqueue(self, tokens: int, priority: Union[str, int, None]) -> _Waiter:
+        waiter = _Waiter(resolve_priority(priority), next(self._seq), tokens)
+        heapq.heappush(self._queue, waiter)
+        self.queued += 1
+        return waiter
+
+    def acquire(self, tokens: int = 0, priority: Union[str, int, None] = None) -> None:
+        """Block the calling thread until one request and `tokens` tokens are reserved.
+
+        Args:
+            tokens (int): Estimated tokens of the request, prompt plus completion.
+            priority (Union[str, int, None]): "high", "normal" (default), "low" or a rank; lower ranks go first.
+        """
+        with self._lock:
+            if self._try_fast(tokens):
+                return
+            waiter = self._enqueue(tokens, priority)
+            waiter.event = threading.Event()
+            delay = self._dispatch()
+        start = time.monotonic()
+        try:
+            while not waiter.granted:
+                waiter.event.wait(delay)
+                with self._lock:
+                    delay = self._dispatch()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        finally:
+            with self._lock:
+                self.wait_seconds += time.monotonic() - start
+
+    async def a_acquire(self, tokens: int = 0, priority: Union[str, int, None] = None) -> None:
+        """Wait without blocking the event loop until one request and `tokens` tokens are reserved.
+
+        Args:
+            tokens (int): Estimated tokens of the request, prompt plus completion.
+            priority (Union[str, int, None]): "high", "normal" (default), "low" or a rank; lower ranks go first.
+        """
+        with self._lock:
+            if self._try_fast(tokens):
+                return
+            waiter = self._enqueue(tokens, priority)
+            waiter.loop = asyncio.get_running_loop()
+            waiter.future = waiter.loop.create_future()
+            delay = self._dispatch()
+        start = time.monotonic()
+        try:
+            while not waiter.granted:
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), delay)
+                except asyncio.TimeoutError:
+                    pass
+                with self._lock:
+                    delay = self._dispatch()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        finally:
+            with self._lock:
+                self.wait_seconds += time.monotonic() - start
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        with self._lock:
+            if waiter.granted:
+                # Granted just as the caller gave up; hand the capacity back
+                self._settle_locked(waiter.tokens, 0, request=True)
+            waiter.cancelled = True
+            self._dispatch()
+
+    def _settle_locked(self, estimated: int, actual: int, request: bool = False) -> None:
+        if request and self.requests is not None:
+            self.requests.consume(-1)
+        if self.tokens is not None:
+            self.tokens.consume(actual - estimated)
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Correct a reservation of `estimated` tokens to the `actual` usage reported by the API."""
+        if actual is None or self.tokens is None:
+            return
+        with self._lock:
+            self._settle_locked(estimated, actual)
+            self._dispatch()
+
+    def backoff(self, seconds: float) -> None:
+        """Admit nothing for `seconds`, e.g. after the API answered with a rate limit error."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+            self.backoffs += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the limits, current levels, queue length and counters."""
+        with self._lock:
+            now = self._clock()
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket.refill(now)
+            return {
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "requests_available": self.requests.level if self.requests is not None else None,
+                "tokens_available": self.tokens.level if self.tokens is not None else None,
+                "waiting": sum(1 for waiter in self._queue if not waiter.cancelled),
+                "granted": self.granted,
+                "queued": self.queued,
+                "wait_seconds": self.wait_seconds,
+                "backoffs": self.backoffs,
+            }
+
+
+_rate_limiters: Dict[str, ModelRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(key: str, rpm: Optional[float] = None, tpm: Optional[float] = None) -> ModelRateLimiter:
+    """Get the process-wide limiter for a model, creating it or updating its limits.
+
+    Args:
+        key (str): Usually the model name. Deployments with separate quotas should use separate keys.
+        rpm (Optional[float]): Requests per minute. None for no request limit.
+        tpm (Optional[float]): Tokens per minute. None for no token limit.
+    """
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None:
+            limiter = _rate_limiters[key] = ModelRateLimiter(rpm, tpm)
+        elif (limiter.rpm, limiter.tpm) != (rpm, tpm):
+            limiter.configure(rpm, tpm)
+        return limiter
+
+
+def rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every limiter, keyed like `get_rate_limiter`."""
+    with _rate_limiters_lock:
+        limiters = dict(_rate_limiters)
+    return {key: limiter.stats() for key, limiter in limiters.items()}
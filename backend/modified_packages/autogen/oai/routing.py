@@ -0,0 +1,231 @@
+# Copyright (c) 2023 - 2024, Owners of https://github.com/autogen-ai
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Portions derived from  https://github.com/microsoft/autogen are under the MIT License.
+# SPDX-License-Identifier: MIT
+"""Latency-aware routing and request hedging across the entries of a config list."""
+import math
+import random
+import threading
+from collections import deque
+from typing import Any, Dict, Hashable, List, Optional
+
+DEFAULT_ALPHA = 0.2
+DEFAULT_WINDOW = 200
+DEFAULT_MIN_SAMPLES = 20
+# Floor for the success rate used in weights, so a failing endpoint still gets the odd probe and can recover
+MIN_HEALTH = 0.01
+
+
+class EndpointStats:
+    """EWMA latency and error rate of one endpoint, plus a window of recent latencies for percentiles.
+
+    Shared by every `OpenAIWrapper` in the process that calls the same endpoint, see `get_endpoint_stats`.
+    """
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA, window: int = DEFAULT_WINDOW):
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.count = 0
+        self._latencies: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        """Record one finished request.
+
+        Args:
+            latency (float): Seconds from send to response or error.
+            ok (bool): Whether the request succeeded.
+        """
+        with self._lock:
+            self.count += 1
+            self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+            if not ok:
+                # A fast failure says nothing about how long a success takes
+                return
+            self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+            self._latencies.append(latency)
+
+    def record_censored(self, latency: float) -> None:
+        """Record a request abandoned after `latency` seconds, e.g. a hedged request that lost the race.
+
+        Its latency is only known to be at least `latency`, so it can raise the EWMA but never lower it. The bound goes
+        into the percentile window: hedged requests are the slow tail, and leaving them out would pull the hedge
+        threshold below the configured percentile and hedge ever more requests.
+        """
+        with self._lock:
+            if self.latency is not None and latency > self.latency:
+                self.latency += self.alpha * (latency - self.latency)
+            self._latencies.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency below which a fraction `q` of recent successful requests finished, or None without samples."""
+        with self._lock:
+            ordered = sorted(self._latencies)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    @property
+    def samples(self) -> int:
+        return len(self._latencies)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"latency": self.latency, "error_rate": self.error_rate, "count": self.count}
+
+
+_endpoint_stats: Dict[Hashable, EndpointStats] = {}
+_endpoint_stats_lock = threading.Lock()
+
+
+def get_endpoint_stats(endpoint: Hashable, alpha: float = DEFAULT_ALPHA, window: int = DEFAULT_WINDOW) -> EndpointStats:
+    """Get the process-wide stats of an endpoint, creating them on first use."""
+    with _endpoint_stats_lock:
+        stats = _endpoint_stats.get(endpoint)
+        if stats is None:
+            stats = _endpoint_stats[endpoint] = EndpointStats(alpha, window)
+        return stats
+
+
+def clear_endpoint_stats() -> None:
+    """Forget all recorded latencies and error rates."""
+    with _endpoint_stats_lock:
+        _endpoint_stats.clear()
+
+
+class LatencyRouter:
+    """Orders the entries of a config list by observed latency and health, and decides when to hedge.
+
+    Entries are grouped by `route_group`, which defaults to the entry's model, so that different deployments of the
+    same model count as equivalent. Groups keep their config-list order, so fallbacks to a different model still
+    happen only after the preferred model has failed. Within a group the first entry is drawn at random with
+    probability proportional to `weight * success rate / EWMA latency`, which spreads traffic over deployments by
+    their configured weights and shifts it away from slow or failing ones.
+
+    A hedge fires when a request is still pending after the `hedge_percentile` latency of its endpoint (or a fixed
+    `hedge_delay`): a duplicate goes to the next entry in the order, the first success wins and the other request is
+    cancelled.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[Hashable],
+        groups: List[Hashable],
+        weights: Optional[List[float]] = None,
+        alpha: float = DEFAULT_ALPHA,
+        window: int = DEFAULT_WINDOW,
+        hedge_percentile: Optional[float] = 0.95,
+        hedge_delay: Optional[float] = None,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            endpoints (List[Hashable]): Identity of each config entry's endpoint; entries with the same identity share
+                their stats.
+            groups (List[Hashable]): Route group of each entry. Entries in the same group are interchangeable.
+            weights (Optional[List[float]]): Relative share of traffic of each entry within its group. Defaults to 1.
+            alpha (float): Smoothing factor of the EWMAs.
+            window (int): Number of recent latencies kept per endpoint for percentiles.
+            hedge_percentile (Optional[float]): Latency percentile after which a request is hedged. None disables
+                percentile hedging.
+            hedge_delay (Optional[float]): Fixed seconds after which a request is hedged. Overrides the percentile.
+            min_samples (int): Successful requests an endpoint needs before its percentile is trusted.
+            seed (Optional[int]): Seed for the weighted draws.
+        """
+        if len(groups) != len(endpoints):
+            raise ValueError("groups must have one entry per endpoint")
+        weights = [1.0] * len(endpoints) if weights is None else [float(weight) for weight in weights]
+        if len(weights) != len(endpoints):
+            raise ValueError("weights must have one entry per endpoint")
+        if any(weight < 0 for weight in weights):
+            raise ValueError("weights must not be negative")
+        if hedge_percentile is not None and not 0 < hedge_percentile < 1:
+            raise ValueError("hedge_percentile must be between 0 and 1")
+        self.endpoints = list(endpoints)
+        self.groups = list(groups)
+        self.weights = weights
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self.min_samples = min_samples
+        self._stats = [get_endpoint_stats(endpoint, alpha, window) for endpoint in self.endpoints]
+        self._random = random.Random(seed)
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @classmethod
+    def from_config(cls, config_list: List[Dict[str, Any]], endpoints: List[Hashable], **options: Any):
+        """Create a router for a config list, reading `weight` and `route_group` from its entries.
+
+        Args:
+            config_list (List[Dict[str, Any]]): The config list, one entry per endpoint.
+            endpoints (List[Hashable]): Identity of each entry's endpoint.
+            **options: Keyword arguments of the constructor, e.g. from the `routing` entry of an llm_config.
+        """
+        return cls(
+            endpoints,
+            groups=[config.get("route_group", config.get("model")) for config in config_list],
+            weights=[config.get("weight", 1.0) for config in config_list],
+            **options,
+        )
+
+    def stats(self, index: int) -> EndpointStats:
+        return self._stats[index]
+
+    def record(self, index: int, latency: float, ok: bool) -> None:
+        """Record a finished request to config entry `index`."""
+        self._stats[index].record(latency, ok)
+
+    def record_censored(self, index: int, latency: float) -> None:
+        """Record a request to config entry `index` that was cancelled after `latency` seconds without an answer."""
+        self._stats[index].record_censored(latency)
+
+    def _score(self, index: int, fallback_latency: float) -> float:
+        stats = self._stats[index]
+        latency = stats.latency if stats.latency is not None else fallback_latency
+        return self.weights[index] * max(1.0 - stats.error_rate, MIN_HEALTH) / max(latency, 1e-3)
+
+    def order(self) -> List[int]:
+        """Return the config entry indices in the order to try them."""
+        groups: Dict[Hashable, List[int]] = {}
+        for index, group in enumerate(self.groups):
+            groups.setdefault(group, []).append(index)
+
+        order = []
+        for members in groups.values():
+            if len(members) == 1:
+                order.extend(members)
+                continue
+            # Entries without samples are scored as if they were as fast as the group average
+            known = [self._stats[index].latency for index in members if self._stats[index].latency is not None]
+            fallback_latency = sum(known) / len(known) if known else 1.0
+            scores = {index: self._score(index, fallback_latency) for index in members}
+            # Weighted sampling without replacement: sort by u ** (1 / score)
+            keys = {
+                index: self._random.random() ** (1.0 / scores[index]) if scores[index] > 0 else -1.0
+                for index in members
+            }
+            order.extend(sorted(members, key=lambda index: keys[index], reverse=True))
+        return order
+
+    def hedge_after(self, index: int) -> Optional[float]:
+        """Seconds to wait on config entry `index` before hedging, or None to never hedge it."""
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        if self.hedge_percentile is None or self._stats[index].samples < self.min_samples:
+            return None
+        return self._stats[index].percentile(self.hedge_percentile)
+
+    def summary(self) -> Dict[str, Any]:
+        """Stats of every entry, plus the hedge counters of this router."""
+        return {
+            "endpoints": [
+                {"endpoint": str(endpoint), "group": str(group), "weight": weight, **stats.snapshot()}
+                for endpoint, group, weight, stats in zip(self.endpoints, self.groups, self.weights, self._stats)
+            ],
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
@@ -4,11 +4,13 @@
 #
 # Portions derived from  https://github.com/microsoft/autogen are under the MIT License.
 # SPDX-License-Identifier: MIT
+import bisect
 import glob
 import hashlib
+import itertools
 import os
 import re
-from typing import Callable, List, Tuple, Union
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
 from urllib.parse import urlparse
 
 import chromadb
@@ -26,7 +28,7 @@ import chromadb.utils.embedding_functions as ef
 import pypdf
 from chromadb.api.types import QueryResult
 
-from autogen.token_count_utils import count_token
+from autogen.token_count_utils import count_token, count_tokens_many
 
 try:
     from unstructured.partition.auto import partition
@@ -72,67 +74,186 @@ if HAS_UNSTRUCTURED:
     TEXT_FORMATS = list(set(TEXT_FORMATS))
 VALID_CHUNK_MODES = frozenset({"one_line", "multi_lines"})
 RAG_MINIMUM_MESSAGE_LENGTH = int(os.environ.get("RAG_MINIMUM_MESSAGE_LENGTH", 5))
+TOKENIZE_BLOCK_LINES = 1024
 
 
-def split_text_to_chunks(
-    text: str,
+def _chunk_lines(
+    lines: Iterable[str],
     max_tokens: int = 4000,
     chunk_mode: str = "multi_lines",
     must_break_at_empty_line: bool = True,
-    overlap: int = 0,  # number of overlapping lines
-):
-    """Split a long text into chunks of max_tokens."""
+    overlap: int = 0,
+    lookahead_tokens: Optional[int] = None,
+) -> Iterator[str]:
+    """Chunking engine shared by `split_text_to_chunks` and `iter_text_chunks`.
+
+    Lines are tokenized once into a prefix-sum array, so the token count of any
+    window is a subtraction and the largest cut that fits is a binary search.
+    The last empty line at or before every position is tracked alongside, so
+    `must_break_at_empty_line` does not rescan lines either. The remaining text
+    is a `start` offset into the buffer instead of a re-sliced list; only the
+    first line of the window can be split mid-line, and its token count is kept
+    separately in `head_tokens`.
+
+    With `lookahead_tokens=None` all lines are read up front and the chunks are
+    exactly those of the original quadratic implementation. Otherwise only
+    enough lines to exceed `lookahead_tokens` are buffered, and the estimated
+    cut is computed over that window instead of the whole remaining text.
+    """
     if chunk_mode not in VALID_CHUNK_MODES:
         raise AssertionError
     if chunk_mode == "one_line":
         must_break_at_empty_line = False
         overlap = 0
-    chunks = []
-    lines = text.split("\n")
-    num_lines = len(lines)
-    if num_lines < 3 and must_break_at_empty_line:
+    if lookahead_tokens is not None:
+        lookahead_tokens = max(lookahead_tokens, max_tokens)
+
+    lines = iter(lines)
+    buffer: List[str] = []
+    tokens: List[int] = []
+    prefix: List[int] = [0]  # prefix[i] is the token count of buffer[:i]
+    last_blank: List[int] = []  # index of the last empty line <= i, or -1
+    exhausted = False
+    start = 0
+
+    def fill(min_lines: int = 0) -> None:
+        nonlocal exhausted
+        while not exhausted and (
+            lookahead_tokens is None
+            or len(buffer) - start < min_lines
+            or prefix[-1] - prefix[start] <= lookahead_tokens
+        ):
+            # Lines are tokenized in blocks to use the batch encoder
+            block = list(itertools.islice(lines, TOKENIZE_BLOCK_LINES))
+            if len(block) < TOKENIZE_BLOCK_LINES:
+                exhausted = True
+            for line, num_tokens in zip(block, count_tokens_many(block)):
+                buffer.append(line)
+                tokens.append(num_tokens)
+                prefix.append(prefix[-1] + num_tokens)
+                if line.strip() == "":
+                    last_blank.append(len(buffer) - 1)
+                else:
+                    last_blank.append(last_blank[-1] if last_blank else -1)
+
+    fill(min_lines=3)
+    if len(buffer) < 3 and must_break_at_empty_line:
         logger.warning("The input text has less than 3 lines. Set `must_break_at_empty_line` to `False`")
         must_break_at_empty_line = False
-    lines_tokens = [count_token(line) for line in lines]
-    sum_tokens = sum(lines_tokens)
-    while sum_tokens > max_tokens:
+    head_tokens = tokens[0] if tokens else 0
+
+    while True:
+        if lookahead_tokens is not None:
+            if start > 1024 and start * 2 > len(buffer):
+                # Drop consumed lines so the buffer stays bounded
+                offset = prefix[start]
+                del buffer[:start], tokens[:start], last_blank[:start]
+                prefix[:] = [value - offset for value in prefix[start:]]
+                last_blank[:] = [index - start if index >= start else -1 for index in last_blank]
+                start = 0
+            fill()
+
+        num_lines = len(buffer) - start
+        # Token count of the window; the head line may be a split remainder
+        sum_tokens = prefix[-1] - prefix[start] - tokens[start] + head_tokens if num_lines else 0
+        if sum_tokens <= max_tokens:
+            break
+
         if chunk_mode == "one_line":
             estimated_line_cut = 2
         else:
-            estimated_line_cut = max(int(max_tokens / sum_tokens * len(lines)), 2)
-        cnt = 0
-        prev = ""
-        for cnt in reversed(range(estimated_line_cut)):
-            if must_break_at_empty_line and lines[cnt].strip() != "":
-                continue
-            if sum(lines_tokens[:cnt]) <= max_tokens:
-                prev = "\n".join(lines[:cnt])
-                break
+            estimated_line_cut = max(int(max_tokens / sum_tokens * num_lines), 2)
+        upper = start + min(estimated_line_cut, num_lines) - 1
+        # Largest cut whose tokens fit: prefix is non-decreasing
+        target = max_tokens + prefix[start] + tokens[start] - head_tokens
+        cut = bisect.bisect_right(prefix, target, start + 1, upper + 1) - 1
+        if cut <= start:
+            cnt = 0
+        elif must_break_at_empty_line:
+            cnt = max(last_blank[cut] - start, 0)
+        else:
+            cnt = cut - start
+
+        head = buffer[start]
         if cnt == 0:
+            prev = ""
             logger.warning(
-                f"max_tokens is too small to fit a single line of text. Breaking this line:\n\t{lines[0][:100]} ..."
+                f"max_tokens is too small to fit a single line of text. Breaking this line:\n\t{head[:100]} ..."
             )
             if not must_break_at_empty_line:
-                split_len = max(
-                    int(max_tokens / (lines_tokens[0] * 0.9 * len(lines[0]) + 0.1)), RAG_MINIMUM_MESSAGE_LENGTH
-                )
-                prev = lines[0][:split_len]
-                lines[0] = lines[0][split_len:]
-                lines_tokens[0] = count_token(lines[0])
+                split_len = max(int(max_tokens / (head_tokens * 0.9 * len(head) + 0.1)), RAG_MINIMUM_MESSAGE_LENGTH)
+                prev = head[:split_len]
+                buffer[start] = head[split_len:]
+                head_tokens = count_token(buffer[start])
             else:
                 logger.warning("Failed to split docs with must_break_at_empty_line being True, set to False.")
                 must_break_at_empty_line = False
-        (
-            chunks.append(prev) if len(prev) >= RAG_MINIMUM_MESSAGE_LENGTH else None
-        )  # don't add chunks less than RAG_MINIMUM_MESSAGE_LENGTH characters
-        lines = lines[cnt - overlap if cnt > overlap else cnt :]
-        lines_tokens = lines_tokens[cnt - overlap if cnt > overlap else cnt :]
-        sum_tokens = sum(lines_tokens)
-    text_to_chunk = "\n".join(lines).strip()
-    (
-        chunks.append(text_to_chunk) if len(text_to_chunk) >= RAG_MINIMUM_MESSAGE_LENGTH else None
-    )  # don't add chunks less than RAG_MINIMUM_MESSAGE_LENGTH characters
-    return chunks
+        else:
+            prev = "\n".join([head] + buffer[start + 1 : start + cnt])
+        if len(prev) >= RAG_MINIMUM_MESSAGE_LENGTH:  # don't add chunks less than RAG_MINIMUM_MESSAGE_LENGTH characters
+            yield prev
+        if cnt > 0:
+            start += cnt - overlap if cnt > overlap else cnt
+            head_tokens = tokens[start]
+
+    text_to_chunk = "\n".join(buffer[start:]).strip()
+    if len(text_to_chunk) >= RAG_MINIMUM_MESSAGE_LENGTH:  # don't add chunks less than RAG_MINIMUM_MESSAGE_LENGTH characters
+        yield text_to_chunk
+
+
+def split_text_to_chunks(
+    text: str,
+    max_tokens: int = 4000,
+    chunk_mode: str = "multi_lines",
+    must_break_at_empty_line: bool = True,
+    overlap: int = 0,  # number of overlapping lines
+):
+    """Split a long text into chunks of max_tokens."""
+    return list(_chunk_lines(text.split("\n"), max_tokens, chunk_mode, must_break_at_empty_line, overlap))
+
+
+def _strip_line_endings(lines: Iterable[str]) -> Iterator[str]:
+    """Yield lines without their trailing newline, as `str.split("\n")` would."""
+    line = ""
+    for line in lines:
+        yield line[:-1] if line.endswith("\n") else line
+    if line == "" or line.endswith("\n"):
+        yield ""
+
+
+def iter_text_chunks(
+    lines: Iterable[str],
+    max_tokens: int = 4000,
+    chunk_mode: str = "multi_lines",
+    must_break_at_empty_line: bool = True,
+    overlap: int = 0,
+    lookahead_tokens: Optional[int] = None,
+) -> Iterator[str]:
+    """Lazily split lines, e.g. an open text file, into chunks of max_tokens.
+
+    Only about `lookahead_tokens` tokens of text are held in memory, so large
+    documents can be chunked without reading them whole. Cuts are estimated
+    from the buffered window rather than the whole remaining text, which can
+    move chunk boundaries compared to `split_text_to_chunks`; every chunk still
+    respects `max_tokens`, `overlap` and `must_break_at_empty_line`.
+
+    Args:
+        lines (Iterable[str]): Lines of text, with or without trailing newlines.
+        max_tokens (int): Maximum number of tokens per chunk.
+        chunk_mode (str): "one_line" or "multi_lines".
+        must_break_at_empty_line (bool): Only cut at empty lines when possible.
+        overlap (int): Number of overlapping lines between chunks.
+        lookahead_tokens (int, Optional): Tokens buffered ahead of the current
+            chunk. Defaults to 10 * max_tokens.
+
+    Yields:
+        str: The next chunk.
+    """
+    if lookahead_tokens is None:
+        lookahead_tokens = 10 * max_tokens
+    return _chunk_lines(
+        _strip_line_endings(lines), max_tokens, chunk_mode, must_break_at_empty_line, overlap, lookahead_tokens
+    )
 
 
 def extract_text_from_pdf(file: str) -> str:
@@ -38,7 +38,7 @@ F = TypeVar("F", bound=Callable[..., Any])
 
 def start(
     logger: Optional[BaseLogger] = None,
-    logger_type: Literal["sqlite", "file"] = "sqlite",
+    logger_type: Literal["sqlite", "file", "segment"] = "sqlite",
     config: Optional[Dict[str, Any]] = None,
 ) -> str:
     """
@@ -4,15 +4,132 @@
 #
 # Portions derived from  https://github.com/microsoft/autogen are under the MIT License.
 # SPDX-License-Identifier: MIT
+import functools
+import hashlib
 import json
 import logging
+import os
 import re
-from typing import Dict, List, Union
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
 
 import tiktoken
 
 logger = logging.getLogger(__name__)
 
+TOKEN_COUNT_CACHE_SIZE = int(os.environ.get("AUTOGEN_TOKEN_COUNT_CACHE_SIZE", 8192))
+TOKEN_COUNT_THREADS = int(os.environ.get("AUTOGEN_TOKEN_COUNT_THREADS", 8))
+
+
+class _TokenCountCache:
+    """Thread-safe bounded LRU mapping (encoding, content hash) to a token count.
+
+    Keys hold a fixed-size digest instead of the text, so long repeated
+    messages cost a few bytes each.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_COUNT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._counts: "OrderedDict[Tuple[str, bytes], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(encoding_name: str, text: str) -> Tuple[str, bytes]:
+        return encoding_name, hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def get(self, key: Tuple[str, bytes]) -> Optional[int]:
+        with self._lock:
+            count = self._counts.get(key)
+            if count is None:
+                self.misses += 1
+                return None
+            self._counts.move_to_end(key)
+            self.hits += 1
+            return count
+
+    def put(self, key: Tuple[str, bytes], count: int) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._counts[key] = count
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.maxsize:
+                self._counts.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._counts), "maxsize": self.maxsize}
+
+
+_token_count_cache = _TokenCountCache()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding(model: str) -> tiktoken.Encoding:
+    """Resolve the tiktoken encoding for a model once per model name."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        logger.warning(f"Model {model} not found. Using cl100k_base encoding.")
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def _count_encoded(encoding: tiktoken.Encoding, text: str) -> int:
+    """Token count of `text`, memoized by content hash."""
+    key = _token_count_cache.key(encoding.name, text)
+    count = _token_count_cache.get(key)
+    if count is None:
+        count = len(encoding.encode(text))
+        _token_count_cache.put(key, count)
+    return count
+
+
+def count_tokens_many(
+    texts: List[str], model: str = "gpt-3.5-turbo-0613", num_threads: int = TOKEN_COUNT_THREADS
+) -> List[int]:
+    """Count tokens for many strings at once.
+
+    Cached counts are reused and the remaining strings are encoded with
+    tiktoken's threaded batch encoder.
+
+    Args:
+        texts: (list): Strings to count.
+        model: (str): Model name.
+        num_threads: (int): Threads used by tiktoken for the batch encode.
+
+    Returns:
+        list: Number of tokens for each string, in order.
+    """
+    encoding = _get_encoding(model)
+    keys = [_token_count_cache.key(encoding.name, text) for text in texts]
+    counts = [_token_count_cache.get(key) for key in keys]
+    missing = [index for index, count in enumerate(counts) if count is None]
+    if missing:
+        encoded = encoding.encode_batch([texts[index] for index in missing], num_threads=num_threads)
+        for index, tokens in zip(missing, encoded):
+            counts[index] = len(tokens)
+            _token_count_cache.put(keys[index], counts[index])
+    return counts
+
+
+def token_count_cache_info() -> Dict[str, int]:
+    """Return hit, miss and size statistics of the token count cache."""
+    return _token_count_cache.info()
+
+
+def clear_token_count_cache() -> None:
+    """Drop all memoized token counts."""
+    _token_count_cache.clear()
+
 
 def get_max_token_limit(model: str = "gpt-3.5-turbo-0613") -> int:
     # Handle common azure model names/aliases
@@ -85,27 +202,16 @@ def count_token(input: Union[str, List, Dict], model: str = "gpt-3.5-turbo-0613"
 
 def _num_token_from_text(text: str, model: str = "gpt-3.5-turbo-0613"):
     """Return the number of tokens used by a string."""
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        logger.warning(f"Model {model} not found. Using cl100k_base encoding.")
-        encoding = tiktoken.get_encoding("cl100k_base")
-    return len(encoding.encode(text))
+    return _count_encoded(_get_encoding(model), text)
 
 
-def _num_token_from_messages(messages: Union[List, Dict], model="gpt-3.5-turbo-0613"):
-    """Return the number of tokens used by a list of messages.
+@functools.lru_cache(maxsize=None)
+def _message_token_params(model: str) -> Tuple[str, int, int]:
+    """Return (counting model, tokens per message, tokens per name) for a model.
 
-    retrieved from https://github.com/openai/openai-cookbook/blob/main/examples/How_to_count_tokens_with_tiktoken.ipynb/
+    Aliases resolve to the pinned model they are counted as; the result is
+    cached so the resolution and its log line happen once per model name.
     """
-    if isinstance(messages, dict):
-        messages = [messages]
-
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        logger.warning(f"Model {model} not found. Using cl100k_base encoding.")
-        encoding = tiktoken.get_encoding("cl100k_base")
     if model in {
         "gpt-3.5-turbo-0613",
         "gpt-3.5-turbo-16k-0613",
@@ -114,30 +220,42 @@ def _num_token_from_messages(messages: Union[List, Dict], model="gpt-3.5-turbo-0
         "gpt-4-0613",
         "gpt-4-32k-0613",
     }:
-        tokens_per_message = 3
-        tokens_per_name = 1
+        return model, 3, 1
     elif model == "gpt-3.5-turbo-0301":
-        tokens_per_message = 4  # every message follows <|start|>{role/name}\n{content}<|end|>\n
-        tokens_per_name = -1  # if there's a name, the role is omitted
+        # every message follows <|start|>{role/name}\n{content}<|end|>\n
+        # if there's a name, the role is omitted
+        return model, 4, -1
     elif "gpt-3.5-turbo" in model:
         logger.info("gpt-3.5-turbo may update over time. Returning num tokens assuming gpt-3.5-turbo-0613.")
-        return _num_token_from_messages(messages, model="gpt-3.5-turbo-0613")
+        return _message_token_params("gpt-3.5-turbo-0613")
     elif "gpt-4" in model:
         logger.info("gpt-4 may update over time. Returning num tokens assuming gpt-4-0613.")
-        return _num_token_from_messages(messages, model="gpt-4-0613")
+        return _message_token_params("gpt-4-0613")
     elif "gemini" in model:
         logger.info("Gemini is not supported in tiktoken. Returning num tokens assuming gpt-4-0613.")
-        return _num_token_from_messages(messages, model="gpt-4-0613")
+        return _message_token_params("gpt-4-0613")
     elif "claude" in model:
         logger.info("Claude is not supported in tiktoken. Returning num tokens assuming gpt-4-0613.")
-        return _num_token_from_messages(messages, model="gpt-4-0613")
+        return _message_token_params("gpt-4-0613")
     elif "mistral-" in model or "mixtral-" in model:
         logger.info("Mistral.AI models are not supported in tiktoken. Returning num tokens assuming gpt-4-0613.")
-        return _num_token_from_messages(messages, model="gpt-4-0613")
+        return _message_token_params("gpt-4-0613")
     else:
         raise NotImplementedError(
             f"""_num_token_from_messages() is not implemented for model {model}. See https://github.com/openai/openai-python/blob/main/chatml.md for information on how messages are converted to tokens."""
         )
+
+
+def _num_token_from_messages(messages: Union[List, Dict], model="gpt-3.5-turbo-0613"):
+    """Return the number of tokens used by a list of messages.
+
+    retrieved from https://github.com/openai/openai-cookbook/blob/main/examples/How_to_count_tokens_with_tiktoken.ipynb/
+    """
+    if isinstance(messages, dict):
+        messages = [messages]
+
+    model, tokens_per_message, tokens_per_name = _message_token_params(model)
+    encoding = _get_encoding(model)
     num_tokens = 0
     for message in messages:
         num_tokens += tokens_per_message
@@ -155,7 +273,7 @@ def _num_token_from_messages(messages: Union[List, Dict], model="gpt-3.5-turbo-0
                     )
                     continue
 
-            num_tokens += len(encoding.encode(value))
+            num_tokens += _count_encoded(encoding, value)
             if key == "name":
                 num_tokens += tokens_per_name
     num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
@@ -172,11 +290,7 @@ def num_tokens_from_functions(functions, model="gpt-3.5-turbo-0613") -> int:
     Returns:
         int: Number of tokens from the function descriptions.
     """
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        logger.warning(f"Model {model} not found. Using cl100k_base encoding.")
-        encoding = tiktoken.get_encoding("cl100k_base")
+    encoding = _get_encoding(model)
 
     num_tokens = 0
     for function in functions:
@@ -0,0 +1,518 @@
+# Copyright (c) 2023 - 2024, Owners of https://github.com/autogen-ai
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Portions derived from  https://github.com/microsoft/autogen are under the MIT License.
+# SPDX-License-Identifier: MIT
+"""Spans for tracing where the time, tokens and cost of an agent turn go.
+
+Tracing is off until `configure` is called. While it is off, `span`, `start_span` and functions wrapped with `traced`
+cost one global lookup and return a shared no-op span, so instrumented code can stay instrumented.
+
+Each trace is sampled once at its root span; the spans below it follow that decision. Finished spans are batched
+and handed to an exporter on a background thread: `JsonLinesSpanExporter` appends one JSON object per span to a file
+and `OTLPHttpSpanExporter` posts OTLP/HTTP JSON to a collector.
+
+Example:
+    ```python
+    from autogen import tracing
+
+    tracing.configure(tracing.JsonLinesSpanExporter("traces.jsonl"), sample_rate=0.1)
+    with tracing.baggage(chat_id=chat_id), tracing.span("chat.turn") as span:
+        span.set_attribute("message.length", len(message))
+        ...
+    ```
+"""
+import atexit
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+import time
+import urllib.request
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FLUSH_INTERVAL = 2.0
+DEFAULT_MAX_QUEUE = 10000
+
+_tracer: Optional["Tracer"] = None
+_current_span: contextvars.ContextVar = contextvars.ContextVar("autogen_current_span", default=None)
+_baggage: contextvars.ContextVar = contextvars.ContextVar("autogen_trace_baggage", default=None)
+_add_lock = threading.Lock()
+
+
+class _NoopSpan:
+    """Stands in for a span while tracing is off or its trace was not sampled."""
+
+    __slots__ = ()
+    recording = False
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def add(self, key: str, value: float) -> None:
+        pass
+
+    def record_error(self, error: Any) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """A timed operation with attributes, part of a trace.
+
+    Attributes:
+        name (str): What the span measures, e.g. "llm.create".
+        trace_id (str): 32 hex digits shared by all spans of a trace.
+        span_id (str): 16 hex digits.
+        parent (Optional[Span]): The enclosing span, None for a root span.
+        attributes (Dict[str, Any]): Attributes, starting with the baggage in effect when the span started.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent", "attributes", "error", "_tracer", "_start_ns", "_start",
+                 "_ended")
+    recording = True
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else "%032x" % random.getrandbits(128)
+        self.span_id = "%016x" % random.getrandbits(64)
+        baggage = _baggage.get()
+        self.attributes = {**baggage, **attributes} if baggage else attributes
+        self.error: Optional[str] = None
+        self._tracer = tracer
+        self._ended = False
+        self._start_ns = time.time_ns()
+        self._start = time.perf_counter_ns()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        self.attributes.update(attributes)
+
+    def add(self, key: str, value: float) -> None:
+        """Add `value` to a numeric attribute of this span and of every enclosing span, e.g. tokens or cost."""
+        span = self
+        with _add_lock:
+            while span is not None:
+                span.attributes[key] = span.attributes.get(key, 0) + value
+                span = span.parent
+
+    def record_error(self, error: Any) -> None:
+        """Mark the span as failed, with an exception or message."""
+        if isinstance(error, BaseException):
+            self.error = f"{type(error).__name__}: {error}"
+        else:
+            self.error = str(error)
+
+    def end(self) -> None:
+        """Finish the span and queue it for export. Later calls do nothing."""
+        if self._ended:
+            return
+        self._ended = True
+        duration_ns = time.perf_counter_ns() - self._start
+        self._tracer._on_end(
+            {
+                "name": self.name,
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent.span_id if self.parent is not None else None,
+                "start_ns": self._start_ns,
+                "end_ns": self._start_ns + duration_ns,
+                "duration_ms": duration_ns / 1e6,
+                "status": "error" if self.error is not None else "ok",
+                "error": self.error,
+                "attributes": dict(self.attributes),
+            }
+        )
+
+
+class _SpanScope:
+    """Context manager that starts a span and makes it the current span until the block exits."""
+
+    __slots__ = ("_tracer", "_name", "_attributes", "_span", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]):
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self):
+        self._span = self._tracer.start_span(self._name, self._attributes)
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current_span.reset(self._token)
+        if self._span.recording:
+            if exc is not None:
+                self._span.record_error(exc)
+            self._span.end()
+        return False
+
+
+class Tracer:
+    """Samples traces, and batches finished spans to an exporter on a background thread.
+
+    Attributes:
+        exported (int): Spans handed to the exporter.
+        dropped (int): Spans dropped because the export queue was full.
+    """
+
+    def __init__(
+        self,
+        exporter: Any,
+        sample_rate: float = 1.0,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+    ):
+        """
+        Args:
+            exporter: Object with `export(records: List[Dict])` and optionally `shutdown()`.
+            sample_rate (float): Fraction of traces recorded, between 0 and 1.
+            batch_size (int): Spans exported together.
+            flush_interval (float): Longest time in seconds a finished span waits for export.
+            max_queue (int): Finished spans held before new ones are dropped.
+        """
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.exported = 0
+        self.dropped = 0
+        self._queue: deque = deque()
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+        self._exporting = False
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        """Start a span under the current span without making it current; the caller must `end` it."""
+        parent = _current_span.get()
+        if parent is NOOP_SPAN:
+            # Inside a trace that was not sampled
+            return NOOP_SPAN
+        if parent is None and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return NOOP_SPAN
+        return Span(self, name, parent, attributes if attributes is not None else {})
+
+    def _on_end(self, record: Dict[str, Any]) -> None:
+        with self._condition:
+            if self._closed:
+                return
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                return
+            self._queue.append(record)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="autogen-tracing", daemon=True)
+                self._worker.start()
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._closed and len(self._queue) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                if self._closed and not self._queue:
+                    return
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._exporting = bool(batch)
+            if batch:
+                self._export(batch)
+            with self._condition:
+                self._exporting = False
+                self._condition.notify_all()
+
+    def _export(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            self.exporter.export(batch)
+            self.exported += len(batch)
+        except Exception as e:
+            logger.warning(f"[tracing] Failed to export {len(batch)} spans: {e}")
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until every finished span has been exported, or `timeout` seconds have passed."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while (self._queue or self._exporting) and self._worker is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                self._condition.notify_all()
+                self._condition.wait(min(remaining, 0.05))
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Export the remaining spans, stop the background thread and shut the exporter down."""
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        if hasattr(self.exporter, "shutdown"):
+            self.exporter.shutdown()
+
+
+class JsonLinesSpanExporter:
+    """Appends each span to a file as one JSON object per line."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, records: List[Dict[str, Any]]) -> None:
+        self._file.write("".join(json.dumps(record, default=str) + "\n" for record in records))
+        self._file.flush()
+
+    def shutdown(self) -> None:
+        self._file.close()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": value if isinstance(value, str) else str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+class OTLPHttpSpanExporter:
+    """Posts spans to an OpenTelemetry collector with the OTLP/HTTP JSON protocol."""
+
+    def __init__(
+        self,
+        endpoint: str = "http://localhost:4318/v1/traces",
+        service_name: str = "autogen",
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 10.0,
+    ):
+        """
+        Args:
+            endpoint (str): The collector's traces URL.
+            service_name (str): The `service.name` resource attribute.
+            headers (Optional[Dict[str, str]]): Extra request headers, e.g. for authentication.
+            timeout (float): Request timeout in seconds.
+        """
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.timeout = timeout
+
+    def to_otlp(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Convert span records to an OTLP `ExportTraceServiceRequest` in its JSON form."""
+        spans = []
+        for record in records:
+            span = {
+                "traceId": record["trace_id"],
+                "spanId": record["span_id"],
+                "name": record["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(record["start_ns"]),
+                "endTimeUnixNano": str(record["end_ns"]),
+                "attributes": _otlp_attributes(record["attributes"]),
+                "status": {"code": 2, "message": record["error"]} if record["error"] else {"code": 1},
+            }
+            if record["parent_id"]:
+                span["parentSpanId"] = record["parent_id"]
+            spans.append(span)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                    "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+                }
+            ]
+        }
+
+    def export(self, records: List[Dict[str, Any]]) -> None:
+        body = json.dumps(self.to_otlp(records), default=str).encode("utf-8")
+        request = urllib.request.Request(self.endpoint, data=body, headers=self.headers, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def configure(
+    exporter: Any,
+    sample_rate: float = 1.0,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    max_queue: int = DEFAULT_MAX_QUEUE,
+) -> "Tracer":
+    """Turn tracing on, replacing any tracer configured before. See `Tracer` for the arguments."""
+    global _tracer
+    previous = _tracer
+    _tracer = Tracer(exporter, sample_rate, batch_size, flush_interval, max_queue)
+    if previous is not None:
+        previous.shutdown()
+    return _tracer
+
+
+def shutdown(timeout: float = 5.0) -> None:
+    """Turn tracing off, exporting the spans that have finished."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.shutdown(timeout)
+
+
+atexit.register(shutdown)
+
+
+def get_tracer() -> Optional["Tracer"]:
+    return _tracer
+
+
+def is_tracing() -> bool:
+    return _tracer is not None
+
+
+def current_span():
+    """The span the caller runs in, or the no-op span outside of a recorded trace."""
+    if _tracer is None:
+        return NOOP_SPAN
+    return _current_span.get() or NOOP_SPAN
+
+
+def span(name: str, **attributes: Any):
+    """Context manager that records a span around its block and yields it, nested under the current span."""
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    return _SpanScope(tracer, name, attributes)
+
+
+def start_span(name: str, **attributes: Any):
+    """Start a span under the current span without entering it; the caller must `end` it."""
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    return tracer.start_span(name, attributes)
+
+
+@contextlib.contextmanager
+def baggage(**attributes: Any) -> Iterator[None]:
+    """Add attributes, e.g. session and chat ids, to every span started within the block."""
+    current = _baggage.get()
+    token = _baggage.set({**current, **attributes} if current else attributes)
+    try:
+        yield
+    finally:
+        _baggage.reset(token)
+
+
+def traced(name: str, attributes: Optional[Callable[..., Dict[str, Any]]] = None) -> Callable[[F], F]:
+    """Decorator recording a span around each call of a function or coroutine function.
+
+    Args:
+        name (str): The span name.
+        attributes (Optional[Callable[..., Dict[str, Any]]]): Called with the function's arguments to get the span's
+            attributes, e.g. `lambda self, *args, **kwargs: {"agent": self.name}`.
+    """
+
+    def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def a_wrapper(*args: Any, **kwargs: Any) -> Any:
+                tracer = _tracer
+                if tracer is None:
+                    return await func(*args, **kwargs)
+                with _SpanScope(tracer, name, attributes(*args, **kwargs) if attributes else {}):
+                    return await func(*args, **kwargs)
+
+            return a_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            tracer = _tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            with _SpanScope(tracer, name, attributes(*args, **kwargs) if attributes else {}):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def instrument_httpx(client: Any, name: str, attributes: Optional[Callable[[Any], Dict[str, Any]]] = None) -> Any:
+    """Record a span for each request sent by an `httpx.Client` or `httpx.AsyncClient`, using its event hooks.
+
+    The span covers the request up to the response headers. Requests that fail before a response are not recorded.
+
+    Args:
+        client: The httpx client.
+        name (str): The span name.
+        attributes (Optional[Callable[[Any], Dict[str, Any]]]): Called with the `httpx.Request` for extra attributes.
+    Returns:
+        The client.
+    """
+
+    def on_request(request: Any) -> None:
+        if _tracer is None:
+            return
+        extra = attributes(request) if attributes else {}
+        request.extensions["autogen_span"] = start_span(name, **{"http.method": request.method, **extra})
+
+    def on_response(response: Any) -> None:
+        span = response.request.extensions.pop("autogen_span", None)
+        if span is None or not span.recording:
+            return
+        span.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 400:
+            span.record_error(f"HTTP {response.status_code}")
+        span.end()
+
+    if inspect.iscoroutinefunction(getattr(client, "send", None)):
+        on_request, on_response = _async_hook(on_request), _async_hook(on_response)
+    client.event_hooks["request"].append(on_request)
+    client.event_hooks["response"].append(on_response)
+    return client
+
+
+def _async_hook(hook: Callable[[Any], None]) -> Callable[[Any], Any]:
+    async def a_hook(value: Any) -> None:
+        hook(value)
+
+    return a_hook
@@ -2,6 +2,13 @@
 Services module for business logic components.
 """
 
-from .counselor_session import HIVPrEPCounselor
-
 __all__ = ['HIVPrEPCounselor']
+
+
+def __getattr__(name):
+    # The counselor pulls in autogen, the tools and the knowledge base, so
+    # it is imported on first use rather than with the package
+    if name == 'HIVPrEPCounselor':
+        from .counselor_session import HIVPrEPCounselor
+        return HIVPrEPCounselor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
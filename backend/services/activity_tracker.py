@@ -0,0 +1,212 @@
+"""
+In-process chat activity tracking.
+
+The WebSocket endpoint sees every inbound message and disconnect, so it
+records activity here instead of relying on Supabase ``updated_at`` polling.
+A hashed timer wheel fires an idle callback as soon as a chat has been quiet
+for ``idle_timeout`` seconds. The periodic maintenance pass still polls the
+database as a fallback for chats owned by a worker that crashed.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+try:
+    from backend.config import settings
+except ImportError:
+    from config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class TimerWheel:
+    """Hashed timing wheel with lazy rescheduling.
+
+    Keys are placed in the slot of their deadline tick. Scheduling is O(1)
+    and advancing the wheel only visits the slots that elapsed. Deadlines
+    further away than one revolution are stored with a remaining round
+    count.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 512,
+                 clock: Callable[[], float] = time.monotonic):
+        self.tick = tick
+        self.slots: List[Dict[Hashable, int]] = [{} for _ in range(slots)]
+        self._clock = clock
+        self._current_tick = self._tick_of(clock())
+        self._slot_of: Dict[Hashable, int] = {}
+
+    def _tick_of(self, timestamp: float) -> int:
+        return int(timestamp // self.tick)
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """Schedule (or move) a key to fire at ``deadline``."""
+        self.cancel(key)
+        target_tick = max(self._tick_of(deadline), self._current_tick + 1)
+        ticks_ahead = target_tick - self._current_tick
+        slot = target_tick % len(self.slots)
+        rounds = (ticks_ahead - 1) // len(self.slots)
+        self.slots[slot][key] = rounds
+        self._slot_of[key] = slot
+
+    def cancel(self, key: Hashable) -> None:
+        """Remove a key from the wheel if it is scheduled."""
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            self.slots[slot].pop(key, None)
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        """Move the wheel to ``now`` and return the keys that expired."""
+        now = self._clock() if now is None else now
+        target_tick = self._tick_of(now)
+        elapsed = target_tick - self._current_tick
+        expired = []
+        # Each slot is visited at most once per call. After a stall longer
+        # than one revolution, a slot counts as passed several times.
+        for offset in range(1, min(elapsed, len(self.slots)) + 1):
+            tick = self._current_tick + offset
+            bucket = self.slots[tick % len(self.slots)]
+            visits = (elapsed - offset) // len(self.slots) + 1
+            for key, rounds in list(bucket.items()):
+                if rounds < visits:
+                    del bucket[key]
+                    self._slot_of.pop(key, None)
+                    expired.append(key)
+                else:
+                    bucket[key] = rounds - visits
+        self._current_tick = max(self._current_tick, target_tick)
+        return expired
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slot_of
+
+
+@dataclass
+class ChatActivity:
+    """Last known activity for a chat."""
+
+    chat_id: str
+    user_id: Optional[str] = None
+    last_activity: float = 0.0
+
+
+class ChatActivityTracker:
+    """Tracks per-chat activity and fires a callback when a chat goes idle."""
+
+    def __init__(self, idle_timeout: float = 300.0, tick: float = 1.0,
+                 on_idle: Optional[Callable[[str], Awaitable[None]]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the tracker.
+
+        Args:
+            idle_timeout: Seconds without activity before a chat is idle.
+            tick: Timer wheel resolution in seconds.
+            on_idle: Coroutine function called with the chat id.
+            clock: Monotonic clock, overridable for tests.
+        """
+        self.idle_timeout = idle_timeout
+        self.on_idle = on_idle
+        self._clock = clock
+        self._wheel = TimerWheel(tick=tick, clock=clock)
+        self._chats: Dict[str, ChatActivity] = {}
+        self._running: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, chat_id: str, user_id: str = None) -> None:
+        """Record activity for a chat.
+
+        Only the timestamp is updated; the wheel entry is moved lazily when
+        its old deadline fires, so this is cheap enough to call per frame.
+        """
+        if not chat_id:
+            return
+        now = self._clock()
+        activity = self._chats.get(chat_id)
+        if activity is None:
+            activity = ChatActivity(chat_id=chat_id)
+            self._chats[chat_id] = activity
+            self._wheel.schedule(chat_id, now + self.idle_timeout)
+        activity.last_activity = now
+        if user_id:
+            activity.user_id = user_id
+
+    def disconnect(self, chat_id: str) -> None:
+        """Record a disconnect; the idle countdown starts from now."""
+        self.touch(chat_id)
+
+    def last_activity(self, chat_id: str) -> Optional[float]:
+        """Return the monotonic timestamp of the chat's last activity."""
+        activity = self._chats.get(chat_id)
+        return activity.last_activity if activity else None
+
+    def is_tracked(self, chat_id: str) -> bool:
+        """Check whether this process currently tracks the chat."""
+        return chat_id in self._chats
+
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        """Advance the timer wheel and return chats that just went idle."""
+        now = self._clock() if now is None else now
+        idle = []
+        for chat_id in self._wheel.advance(now):
+            activity = self._chats.get(chat_id)
+            if activity is None:
+                continue
+            deadline = activity.last_activity + self.idle_timeout
+            if deadline > now:
+                # Activity arrived after scheduling; move to the new deadline
+                self._wheel.schedule(chat_id, deadline)
+                continue
+            del self._chats[chat_id]
+            idle.append(chat_id)
+        return idle
+
+    async def _fire(self, chat_id: str) -> None:
+        try:
+            await self.on_idle(chat_id)
+        except Exception as exc:
+            logger.error(f"Error handling idle chat {chat_id}: {exc}")
+
+    async def run(self) -> None:
+        """Advance the wheel every tick and dispatch idle callbacks."""
+        while True:
+            for chat_id in self.expire():
+                logger.info(f"Chat {chat_id} went idle")
+                if self.on_idle is None:
+                    continue
+                task = asyncio.create_task(self._fire(chat_id))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            await asyncio.sleep(self._wheel.tick)
+
+    def start(self) -> asyncio.Task:
+        """Start the background tick task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Cancel the tick task and any idle callbacks still running."""
+        tasks = list(self._running)
+        if self._task is not None:
+            tasks.append(self._task)
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+
+# Process-wide tracker fed by the WebSocket endpoint
+activity_tracker = ChatActivityTracker(
+    idle_timeout=settings.chat_idle_timeout,
+    tick=settings.activity_tick,
+)
@@ -0,0 +1,190 @@
+"""
+Single reader per WebSocket that routes inbound frames to typed queues.
+
+Only the reader task calls ``websocket.receive_text()``. Each frame is
+parsed once and routed by type:
+    - ``user_id``, ``chat_id`` and ``teachability_flag`` frames go to the
+      ``control`` queue read by the endpoint.
+    - ``message`` frames go to the ``messages`` queue, from which chat turns
+      are started, unless a tool is waiting for the user's answer.
+    - While a tool waits for the user's answer, the next ``answer`` or
+      ``message`` frame resolves the oldest open question instead.
+    - ``ping`` frames are answered with ``pong`` straight away, even while a
+      turn is running.
+
+Because nothing else reads the socket, a tool asking the user a question no
+longer races the endpoint loop, and frames sent while a turn is in progress
+are queued instead of waiting for the turn to finish.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+
+logger = logging.getLogger(__name__)
+
+CONTROL_TYPES = ("user_id", "chat_id", "teachability_flag")
+# Frames buffered per queue before the reader stops reading the socket
+MAX_QUEUED_FRAMES = 64
+_CLOSED = object()
+
+
+class ConnectionReader:
+    """Reads one WebSocket and demultiplexes its frames."""
+
+    def __init__(self, websocket: WebSocket,
+                 on_frame: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 max_queued: int = MAX_QUEUED_FRAMES):
+        """Initialize the reader.
+
+        Args:
+            websocket: The accepted WebSocket.
+            on_frame: Called with every valid frame, e.g. to record activity.
+            max_queued: Frames buffered per queue.
+        """
+        self.websocket = websocket
+        self.on_frame = on_frame
+        self.control: asyncio.Queue = asyncio.Queue(max_queued)
+        self.messages: asyncio.Queue = asyncio.Queue(max_queued)
+        # Questions of tools waiting for the user's answer, oldest first
+        self._questions: "OrderedDict[str, asyncio.Future]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.close_code: Optional[int] = None
+
+    def start(self) -> asyncio.Task:
+        """Start the reader task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._read())
+        return self._task
+
+    async def stop(self) -> None:
+        """Stop reading and fail everything still waiting for a frame."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._close(1000)
+
+    async def _read(self) -> None:
+        try:
+            while True:
+                data = await self.websocket.receive_text()
+                try:
+                    frame = json.loads(data)
+                except json.JSONDecodeError:
+                    logger.warning(f"Non-JSON frame received: {data[:200]}")
+                    continue
+                if not isinstance(frame, dict):
+                    logger.warning(f"Invalid frame received: {frame}")
+                    continue
+                await self._route(frame)
+        except WebSocketDisconnect as e:
+            self._close(e.code)
+        except Exception as e:
+            logger.error(f"Connection error: {e}")
+            self._close(1011)
+
+    async def _route(self, frame: Dict[str, Any]) -> None:
+        frame_type = frame.get("type")
+        if frame_type == "ping":
+            await self.websocket.send_text(json.dumps(
+                {"type": "pong", "messageId": frame.get("messageId")}))
+            return
+        if not frame_type or not frame.get("content"):
+            logger.warning(f"Invalid message received: {frame}")
+            return
+        if self.on_frame is not None:
+            self.on_frame(frame)
+        if frame_type in CONTROL_TYPES:
+            await self.control.put(frame)
+        elif frame_type in ("answer", "message") and self._answer(frame):
+            return
+        elif frame_type == "message":
+            await self.messages.put(frame)
+        else:
+            logger.warning(f"Unexpected frame type: {frame_type}")
+
+    def _answer(self, frame: Dict[str, Any]) -> bool:
+        """Resolve the oldest open question; False if none is open."""
+        for future in self._questions.values():
+            if not future.done():
+                future.set_result(frame["content"])
+                return True
+        return False
+
+    def _close(self, code: int) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.close_code = code
+        for future in self._questions.values():
+            if not future.done():
+                future.set_exception(WebSocketDisconnect(code))
+        for queue in (self.control, self.messages):
+            try:
+                # Wakes a consumer blocked on the empty queue
+                queue.put_nowait(_CLOSED)
+            except asyncio.QueueFull:
+                # Nobody is blocked; _get raises once the queue is drained
+                pass
+
+    async def _get(self, queue: asyncio.Queue) -> Dict[str, Any]:
+        if self.closed and queue.empty():
+            raise WebSocketDisconnect(self.close_code)
+        frame = await queue.get()
+        if frame is _CLOSED:
+            raise WebSocketDisconnect(self.close_code)
+        return frame
+
+    async def next_control(self) -> Dict[str, Any]:
+        """Return the next control frame.
+
+        Raises:
+            WebSocketDisconnect: Once the connection is closed.
+        """
+        return await self._get(self.control)
+
+    async def next_message(self) -> Dict[str, Any]:
+        """Return the next chat message frame.
+
+        Raises:
+            WebSocketDisconnect: Once the connection is closed.
+        """
+        return await self._get(self.messages)
+
+    async def ask(self, question: str,
+                  timeout: Optional[float] = None) -> str:
+        """Send a tool's question to the user and wait for the answer.
+
+        Args:
+            question: Text sent to the user.
+            timeout: Seconds to wait for the answer, or None to wait until
+                the connection closes.
+
+        Returns:
+            The content of the answering frame.
+
+        Raises:
+            WebSocketDisconnect: If the connection closes first.
+            asyncio.TimeoutError: If no answer arrives within ``timeout``.
+        """
+        if self.closed:
+            raise WebSocketDisconnect(self.close_code)
+        question_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        # Registered before sending, so a quick answer is not taken for a
+        # new chat message
+        self._questions[question_id] = future
+        try:
+            await self.websocket.send_text(question)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._questions.pop(question_id, None)
@@ -1,7 +1,12 @@
 """
 Main HIV PrEP Counselor class that orchestrates all components.
 """
+import asyncio
+import copy
+import uuid
+
 import autogen
+from autogen import tracing
 from fastapi import WebSocket
 
 try:
@@ -12,6 +17,8 @@ try:
     from backend.agents.agents import AgentFactory
     from backend.tools.tool_registry import FunctionRegistry
     from backend.components.group_chat_manager import TrackableGroupChatManager
+    from backend.services.session_store import (SessionStateConflict,
+                                                session_store)
 except ImportError:
     # Fall back to relative imports (when running from backend directory)
     from config import get_api_key, get_llm_config
@@ -20,6 +27,10 @@ except ImportError:
     from agents.agents import AgentFactory
     from tools.tool_registry import FunctionRegistry
     from components.group_chat_manager import TrackableGroupChatManager
+    from services.session_store import SessionStateConflict, session_store
+
+# Layout of the saved conversation state
+STATE_FORMAT = 1
 
 
 class HIVPrEPCounselor:
@@ -29,6 +40,8 @@ class HIVPrEPCounselor:
                  chat_id: str = None, teachability_flag: bool = None):
         self.user_id = user_id
         self.chat_id = chat_id
+        # Tags the spans of every turn in this WebSocket session
+        self.session_id = uuid.uuid4().hex
         self.teachability_flag = teachability_flag
         if self.teachability_flag is None:
             self.teachability_flag = True
@@ -38,6 +51,8 @@ class HIVPrEPCounselor:
         self.api_key = get_api_key()
         self.websocket = websocket
         self.agent_history = []
+        # Version of the saved conversation state this session holds
+        self.state_version = 0
 
         # Initialize components
         self.llm_config = get_llm_config(self.api_key)
@@ -127,6 +142,88 @@ class HIVPrEPCounselor:
             counselor_agent, assistant_agent
         )
 
+    def snapshot(self) -> dict:
+        """Return the conversation state as a JSON-serializable dict."""
+        return {
+            "format": STATE_FORMAT,
+            "messages": copy.deepcopy(self.group_chat.messages),
+            "last_message": self.manager._last_message,
+        }
+
+    def restore(self, state: dict):
+        """Replace the conversation with a state taken by snapshot()."""
+        if state.get("format") != STATE_FORMAT:
+            raise ValueError(
+                f"Unknown session state format: {state.get('format')}")
+        messages = state["messages"]
+        if messages:
+            # Rebuilds the group chat and every agent's history, except for
+            # the last message, which resume leaves for the next round
+            self.manager.resume(messages, silent=True)
+            self._load_message(copy.deepcopy(messages[-1]))
+        else:
+            for agent in self.agents:
+                agent.clear_history()
+            self.manager.clear_history()
+            self.group_chat.reset()
+        self.manager._last_message = state.get("last_message")
+
+    def _load_message(self, message: dict):
+        """Add a past message to the group chat as its round delivered it."""
+        speaker = self.group_chat.agent_by_name(message.get("name"))
+        for agent in self.agents:
+            if agent is speaker:
+                agent.send(message, self.manager, request_reply=False,
+                           silent=True)
+            else:
+                self.manager.send(message, agent, request_reply=False,
+                                  silent=True)
+        if speaker is not None:
+            self.group_chat.append(message, speaker)
+        else:
+            self.group_chat.messages.append(message)
+
+    async def load_state(self) -> bool:
+        """Catch up with a newer conversation state saved by any worker.
+
+        Returns:
+            True if the conversation was replaced by the saved state.
+        """
+        if session_store is None or not self.chat_id:
+            return False
+        try:
+            version = await asyncio.to_thread(session_store.version,
+                                              self.chat_id)
+            if version <= self.state_version:
+                return False
+            loaded = await asyncio.to_thread(session_store.load, self.chat_id)
+        except Exception as e:
+            # The turn goes on with the conversation this worker holds
+            print(f"Error loading state of chat {self.chat_id}: {e}")
+            return False
+        if loaded is None:
+            return False
+        version, state = loaded
+        self.restore(state)
+        self.state_version = version
+        print(f"Restored chat {self.chat_id} at state version {version}")
+        return True
+
+    async def save_state(self):
+        """Save the conversation state so any worker can continue it."""
+        if session_store is None or not self.chat_id:
+            return
+        try:
+            self.state_version = await asyncio.to_thread(
+                session_store.save, self.chat_id, self.snapshot(),
+                self.state_version)
+        except SessionStateConflict as e:
+            # Another worker continued the chat; the next turn loads its
+            # state instead of overwriting it with this one
+            print(f"Not saving chat {self.chat_id}: {e}")
+        except Exception as e:
+            print(f"Error saving state of chat {self.chat_id}: {e}")
+
     def get_latest_response(self):
         """Get the latest valid response, prioritizing counselor responses."""
         # This method is kept for backward compatibility but the
@@ -185,19 +282,25 @@ class HIVPrEPCounselor:
         try:
             print(f"Initiating chat with content: '{user_input}'")
 
-            # Have the patient agent initiate the chat with the manager.
-            # This triggers orchestration and websocket streaming.
-            await self.patient_agent.a_initiate_chat(
-                self.manager,
-                message=user_input,
-                clear_history=False,
-            )
+            with tracing.baggage(session_id=self.session_id,
+                                 chat_id=self.chat_id, user_id=self.user_id), \
+                    tracing.span("chat.turn",
+                                 message_length=len(user_input)):
+                await self.load_state()
+                # Have the patient agent initiate the chat with the manager.
+                # This triggers orchestration and websocket streaming.
+                await self.patient_agent.a_initiate_chat(
+                    self.manager,
+                    message=user_input,
+                    clear_history=False,
+                )
 
-            print("Chat initiation completed.")
+                print("Chat initiation completed.")
 
-            # Since a_run_chat is not being called, manually send the final
-            # response
-            await self._send_final_response_manually()
+                # Since a_run_chat is not being called, manually send the
+                # final response
+                await self._send_final_response_manually()
+                await self.save_state()
         except Exception as e:
             print(f"Chat initiation error: {e}")
             import traceback
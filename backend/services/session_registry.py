@@ -0,0 +1,182 @@
+"""
+Registry of open WebSocket sessions and their running chat turns.
+
+Each connection registers a session and submits every chat turn as a task
+instead of awaiting it inline, so the endpoint keeps reading the socket and
+sees a disconnect while a turn is running. Closing the session cancels its
+turns; the cancellation reaches the awaited model calls and async tools, and
+the session drops its counselor so the agent graph can be collected.
+
+Capacity is enforced at three levels:
+    - ``max_sessions`` open connections per process; more are refused.
+    - ``max_active_turns`` turns running at once across all sessions; more
+      wait for a slot.
+    - ``session_max_pending`` turns queued or running per session; a session
+      runs its turns one at a time, in the order they were sent.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+try:
+    from backend.config import settings
+except ImportError:
+    from config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class SessionLimitError(Exception):
+    """Raised when the process already holds ``max_sessions`` sessions."""
+
+
+class SessionBusyError(Exception):
+    """Raised when a session already has ``session_max_pending`` turns."""
+
+
+@dataclass
+class Session:
+    """An open connection and the chat turns it submitted."""
+
+    session_id: int
+    websocket: Any
+    user_id: Optional[str] = None
+    chat_id: Optional[str] = None
+    counselor: Optional[Any] = None
+    opened: float = field(default_factory=time.monotonic)
+    turns: Set[asyncio.Task] = field(default_factory=set)
+    # One turn at a time: turns share the group chat of the session
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    closed: bool = False
+
+
+class SessionRegistry:
+    """Tracks open sessions, caps their turns and cancels them on close."""
+
+    def __init__(self, max_sessions: int = 200, max_active_turns: int = 32,
+                 session_max_pending: int = 4):
+        """Initialize the registry.
+
+        Args:
+            max_sessions: Open sessions allowed at once.
+            max_active_turns: Turns running at once across all sessions.
+            session_max_pending: Turns one session may have queued or
+                running.
+        """
+        self.max_sessions = max_sessions
+        self.max_active_turns = max_active_turns
+        self.session_max_pending = session_max_pending
+        self._sessions: Dict[int, Session] = {}
+        self._ids = itertools.count(1)
+        self._active = asyncio.Semaphore(max_active_turns)
+        self.active_turns = 0
+        self.cancelled_turns = 0
+        self.refused_sessions = 0
+
+    def open(self, websocket: Any) -> Session:
+        """Register a new connection.
+
+        Raises:
+            SessionLimitError: If ``max_sessions`` sessions are open.
+        """
+        if len(self._sessions) >= self.max_sessions:
+            self.refused_sessions += 1
+            raise SessionLimitError(
+                f"{len(self._sessions)} sessions open, limit is "
+                f"{self.max_sessions}")
+        session = Session(session_id=next(self._ids), websocket=websocket)
+        self._sessions[session.session_id] = session
+        return session
+
+    def submit(self, session: Session,
+               turn: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Run a chat turn of the session as a cancellable task.
+
+        Args:
+            session: The session the turn belongs to.
+            turn: Coroutine function running the turn.
+
+        Raises:
+            SessionBusyError: If the session already has
+                ``session_max_pending`` turns queued or running.
+        """
+        if session.closed:
+            raise SessionBusyError("Session is closed")
+        if len(session.turns) >= self.session_max_pending:
+            raise SessionBusyError(
+                f"{len(session.turns)} turns pending, limit is "
+                f"{self.session_max_pending}")
+        task = asyncio.create_task(self._run_turn(session, turn))
+        session.turns.add(task)
+        task.add_done_callback(session.turns.discard)
+        return task
+
+    async def _run_turn(self, session: Session,
+                        turn: Callable[[], Awaitable[Any]]) -> Any:
+        async with session.lock:
+            async with self._active:
+                self.active_turns += 1
+                try:
+                    return await turn()
+                finally:
+                    self.active_turns -= 1
+
+    async def close(self, session: Session) -> None:
+        """Cancel the session's turns and forget it.
+
+        Returns once the turns have finished unwinding, so their slots are
+        free when this returns.
+        """
+        if session.closed:
+            return
+        session.closed = True
+        self._sessions.pop(session.session_id, None)
+        turns = list(session.turns)
+        for task in turns:
+            if task.cancel():
+                self.cancelled_turns += 1
+        for task in turns:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            except Exception as exc:
+                logger.error(f"Turn of session {session.session_id} failed "
+                             f"while closing: {exc}")
+        if turns:
+            logger.info(f"Cancelled {len(turns)} turn(s) of session "
+                        f"{session.session_id} (chat {session.chat_id})")
+        # Release the agent graph; the socket is gone
+        session.counselor = None
+        session.websocket = None
+
+    async def shutdown(self) -> None:
+        """Close every open session."""
+        for session in list(self._sessions.values()):
+            await self.close(session)
+
+    def stats(self) -> Dict[str, int]:
+        """Return current load and lifetime counters."""
+        return {
+            "sessions": len(self._sessions),
+            "pending_turns": sum(len(session.turns)
+                                 for session in self._sessions.values()),
+            "active_turns": self.active_turns,
+            "cancelled_turns": self.cancelled_turns,
+            "refused_sessions": self.refused_sessions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+# Process-wide registry used by the WebSocket endpoint
+session_registry = SessionRegistry(
+    max_sessions=settings.max_sessions,
+    max_active_turns=settings.max_active_turns,
+    session_max_pending=settings.session_max_pending_turns,
+)
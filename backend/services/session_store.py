@@ -0,0 +1,272 @@
+"""
+Externalized conversation state of counselor sessions, keyed by chat_id.
+
+A counselor's conversation lives in the group chat messages and in each
+agent's message history. Saving a snapshot after every turn and rehydrating
+it when a chat lands on a worker that does not hold it lets several workers
+serve the same chats behind a non-sticky balancer, and lets a reconnect
+after a deploy pick up where the chat left off.
+
+Two backends are provided:
+    - ``SqliteSessionStore``: a local SQLite file, shared by the workers of
+      one host and used for tests.
+    - ``RedisSessionStore``: a Redis server shared by every host; needs the
+      ``redis`` package.
+
+Every snapshot carries a version. A save names the version it was built on
+and fails with ``SessionStateConflict`` if another worker saved in between,
+so a stale worker never overwrites a newer conversation.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from backend.config import settings
+except ImportError:
+    from config import settings
+
+
+class SessionStateConflict(Exception):
+    """Raised when the stored state changed since the version being saved."""
+
+
+class SessionStateStore(ABC):
+    """Stores one JSON-serializable state per chat_id, with a version."""
+
+    @abstractmethod
+    def load(self, chat_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Return ``(version, state)`` of the chat, or None if not saved."""
+        ...
+
+    @abstractmethod
+    def version(self, chat_id: str) -> int:
+        """Return the saved version of the chat, 0 if none is saved."""
+        ...
+
+    @abstractmethod
+    def save(self, chat_id: str, state: Dict[str, Any], version: int) -> int:
+        """Save the chat's state on top of ``version``.
+
+        Args:
+            chat_id: The chat the state belongs to.
+            state: JSON-serializable state.
+            version: Version the state was built on, 0 for a new chat.
+
+        Returns:
+            The new version.
+
+        Raises:
+            SessionStateConflict: If the saved version is not ``version``.
+        """
+        ...
+
+    @abstractmethod
+    def delete(self, chat_id: str) -> None:
+        """Forget the chat's state."""
+        ...
+
+    def close(self) -> None:
+        """Release the backend's connection."""
+
+
+class SqliteSessionStore(SessionStateStore):
+    """Session state in a local SQLite file."""
+
+    def __init__(self, path: str, ttl: Optional[float] = None):
+        """Initialize the store.
+
+        Args:
+            path: Database file, created if missing.
+            ttl: Seconds after its last save a state is dropped, or None to
+                keep states until deleted.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        # Calls arrive from worker threads; the lock serializes them
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened in each process that uses it: a connection created before
+        # a fork must not be used by the forked workers
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30,
+                                         check_same_thread=False)
+            self._pid = os.getpid()
+            with self._conn:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS session_state ("
+                    "chat_id TEXT PRIMARY KEY, version INTEGER NOT NULL, "
+                    "state TEXT NOT NULL, updated_at REAL NOT NULL)")
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS session_state_updated_at "
+                    "ON session_state (updated_at)")
+        return self._conn
+
+    def _expired_before(self) -> float:
+        return time.time() - self.ttl if self.ttl else 0.0
+
+    def load(self, chat_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT version, state FROM session_state "
+                "WHERE chat_id = ? AND updated_at >= ?",
+                (chat_id, self._expired_before())).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def version(self, chat_id: str) -> int:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT version FROM session_state "
+                "WHERE chat_id = ? AND updated_at >= ?",
+                (chat_id, self._expired_before())).fetchone()
+        return row[0] if row else 0
+
+    def save(self, chat_id: str, state: Dict[str, Any], version: int) -> int:
+        data = json.dumps(state, default=str)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                if self.ttl:
+                    conn.execute(
+                        "DELETE FROM session_state WHERE updated_at < ?",
+                        (self._expired_before(),))
+                if version == 0:
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO session_state "
+                        "(chat_id, version, state, updated_at) "
+                        "VALUES (?, 1, ?, ?)", (chat_id, data, now))
+                else:
+                    cursor = conn.execute(
+                        "UPDATE session_state SET version = version + 1, "
+                        "state = ?, updated_at = ? "
+                        "WHERE chat_id = ? AND version = ?",
+                        (data, now, chat_id, version))
+                if cursor.rowcount != 1:
+                    raise SessionStateConflict(
+                        f"State of chat {chat_id} changed since version "
+                        f"{version}")
+        return version + 1
+
+    def delete(self, chat_id: str) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "DELETE FROM session_state WHERE chat_id = ?", (chat_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+            self._pid = None
+
+
+class RedisSessionStore(SessionStateStore):
+    """Session state in Redis, one hash per chat."""
+
+    def __init__(self, url: str, ttl: Optional[float] = None,
+                 prefix: str = "chia:session:"):
+        """Initialize the store.
+
+        Args:
+            url: Redis URL, e.g. ``redis://localhost:6379/0``.
+            ttl: Seconds after its last save a state expires, or None to
+                keep states until deleted.
+            prefix: Prefix of the keys holding the states.
+        """
+        import redis
+
+        self._redis = redis
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, chat_id: str) -> str:
+        return f"{self.prefix}{chat_id}"
+
+    def load(self, chat_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        version, data = self._client.hmget(self._key(chat_id),
+                                           "version", "state")
+        if version is None or data is None:
+            return None
+        return int(version), json.loads(data)
+
+    def version(self, chat_id: str) -> int:
+        version = self._client.hget(self._key(chat_id), "version")
+        return int(version) if version is not None else 0
+
+    def save(self, chat_id: str, state: Dict[str, Any], version: int) -> int:
+        key = self._key(chat_id)
+        data = json.dumps(state, default=str)
+        with self._client.pipeline() as pipe:
+            try:
+                # The transaction fails if another worker saves in between
+                pipe.watch(key)
+                current = pipe.hget(key, "version")
+                if int(current or 0) != version:
+                    raise SessionStateConflict(
+                        f"State of chat {chat_id} changed since version "
+                        f"{version}")
+                pipe.multi()
+                pipe.hset(key, mapping={"version": version + 1,
+                                        "state": data})
+                if self.ttl:
+                    pipe.expire(key, int(self.ttl))
+                pipe.execute()
+            except self._redis.WatchError:
+                raise SessionStateConflict(
+                    f"State of chat {chat_id} changed while saving version "
+                    f"{version}")
+        return version + 1
+
+    def delete(self, chat_id: str) -> None:
+        self._client.delete(self._key(chat_id))
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def create_session_store(backend: str, url: str,
+                         ttl: Optional[float] = None
+                         ) -> Optional[SessionStateStore]:
+    """Create the configured store.
+
+    Args:
+        backend: "sqlite", "redis", or empty to keep state in memory only.
+        url: SQLite file path or Redis URL.
+        ttl: Seconds after its last save a state is dropped.
+
+    Returns:
+        The store, or None if state is kept in memory only.
+    """
+    if not backend:
+        return None
+    if backend == "sqlite":
+        return SqliteSessionStore(url, ttl)
+    if backend == "redis":
+        return RedisSessionStore(url, ttl)
+    raise ValueError(f"Unknown session store: {backend}. "
+                     f"Available stores: ['sqlite', 'redis']")
+
+
+# Process-wide store used by the counselor sessions; None keeps state in
+# memory only
+session_store = create_session_store(
+    settings.session_store,
+    settings.session_store_url,
+    settings.session_state_ttl,
+)
@@ -1,21 +1,102 @@
 import asyncio
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import asynccontextmanager
 
-from tasks.maintenance import run_periodic_maintenance
+from autogen import tracing
+
+from config import configure_tracing, settings
+from services.activity_tracker import activity_tracker
+from services.session_registry import session_registry
+from services.session_store import session_store
+from tasks.maintenance import (handle_idle_chat, run_notification_outbox,
+                               run_periodic_maintenance)
 
 
 logger = logging.getLogger(__name__)
 
+# Models whose tokenizer tables are loaded before the workers start
+TOKENIZER_MODELS = ("gpt-4o", "gpt-4o-mini", "gpt-4-turbo")
+_assets_warmed = False
+
+
+def load_counselor_class():
+    """
+    Import the counselor session and return its HIVPrEPCounselor class.
+    The import pulls in autogen, the agents, the tools and the knowledge
+    base, which takes seconds, so it is kept out of the import of main and
+    done by warm_shared_assets or, at the latest, by the first session.
+    """
+    from services.counselor_session import HIVPrEPCounselor
+    return HIVPrEPCounselor
+
+
+def warm_shared_assets(before_fork: bool = False) -> None:
+    """
+    Prepare the read-only assets every worker uses.
+    Under gunicorn (see gunicorn.conf.py) this runs once in the master
+    before it forks the workers. The workers then find the knowledge base
+    index built on disk, and share the tokenizer tables and imported modules
+    with the master copy-on-write. Otherwise lifespan runs it in the
+    background once the server is up.
+    """
+    global _assets_warmed
+    if _assets_warmed:
+        return
+    _assets_warmed = True
+    try:
+        from components.rag_system import ensure_knowledge_index
+
+        if before_fork:
+            # Chroma holds SQLite connections and threads that must not be
+            # inherited by the workers, so the master builds in a child
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                executor.submit(ensure_knowledge_index).result()
+        else:
+            ensure_knowledge_index()
+    except Exception as exc:
+        logger.error(f"Could not prepare the knowledge base index: {exc}")
+    try:
+        from autogen.token_count_utils import count_token
+
+        for model in TOKENIZER_MODELS:
+            count_token("", model)
+    except Exception as exc:
+        logger.error(f"Could not load the tokenizer tables: {exc}")
+    try:
+        load_counselor_class()
+    except Exception as exc:
+        logger.error(f"Could not import the counselor session: {exc}")
+
 
 @asynccontextmanager
 async def lifespan(app):
-    task = asyncio.create_task(run_periodic_maintenance())
+    configure_tracing()
+    activity_tracker.on_idle = handle_idle_chat
+    tasks = [
+        # Runs while the server already accepts connections; a no-op in
+        # gunicorn workers, whose master did it before forking
+        asyncio.create_task(asyncio.to_thread(warm_shared_assets)),
+        activity_tracker.start(),
+        asyncio.create_task(
+            run_periodic_maintenance(settings.maintenance_interval,
+                                     settings.maintenance_lock_file)),
+        asyncio.create_task(
+            run_notification_outbox(settings.outbox_poll_interval)),
+    ]
     try:
         yield
     finally:
-        task.cancel()
-        try:
-            await task
-        except asyncio.CancelledError:
-            logger.info("Background task cancelled")
+        await session_registry.shutdown()
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                logger.info("Background task cancelled")
+        if session_store is not None:
+            session_store.close()
+        tracing.shutdown()
@@ -1,22 +1,65 @@
 import asyncio
 import logging
+import os
 from datetime import datetime
 
-from tools.chat_management import get_chat_history, create_transcript
-from tools.support_system import check_inactive_chats
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows; every process runs the maintenance there
+    fcntl = None
+
+from tools.chat_management import (get_chat_history, create_transcript,
+                                   create_chat_transcript)
+from tools.support_system import (check_inactive_chats,
+                                  deliver_support_notification,
+                                  notify_chat_support_requests)
+from tools.notification_outbox import NotificationOutbox
 
 
 logger = logging.getLogger(__name__)
 
+# Open lock file of the worker elected to run the periodic maintenance
+_maintenance_lock = None
+
 
-async def run_periodic_maintenance(interval_seconds: int = 300) -> None:
+def _hold_maintenance_lock(path: str) -> bool:
+    """
+    Return True if this process runs the periodic maintenance.
+    With several workers only the one holding the lock file polls. The
+    lock is released when that worker exits, and another one takes over.
+    """
+    global _maintenance_lock
+    if _maintenance_lock is not None or fcntl is None:
+        return True
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    lock = open(path, "a")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return False
+    _maintenance_lock = lock
+    logger.info(f"Process {os.getpid()} runs the periodic maintenance")
+    return True
+
+
+async def run_periodic_maintenance(interval_seconds: int = 300,
+                                   lock_path: str = None) -> None:
     """
     Run maintenance tasks periodically.
     Includes: fetch chat history, check inactive chats, create transcripts.
+    Idle chats are normally handled by handle_idle_chat as soon as the
+    activity tracker sees them go quiet; this poll catches chats whose
+    worker crashed before that happened.
+    With lock_path set, only the worker holding that lock file polls.
     Retries with a backoff delay on error.
     """
     counter = 0
     while True:
+        if lock_path and not _hold_maintenance_lock(lock_path):
+            await asyncio.sleep(interval_seconds)
+            continue
         try:
             current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             logger.info(f"Running check #{counter} at {current_time}")
@@ -31,3 +74,28 @@ async def run_periodic_maintenance(interval_seconds: int = 300) -> None:
         except Exception as exc:
             logger.error(f"Error in check #{counter}: {exc}")
             await asyncio.sleep(60)
+
+
+async def run_notification_outbox(interval_seconds: float = 15) -> None:
+    """
+    Drain the notification outbox periodically.
+    Runs separately from maintenance so mail server latency never delays
+    the maintenance pass.
+    """
+    outbox = NotificationOutbox(deliver=deliver_support_notification)
+    while True:
+        try:
+            await outbox.drain()
+        except Exception as exc:
+            logger.error(f"Error draining notification outbox: {exc}")
+        await asyncio.sleep(interval_seconds)
+
+
+async def handle_idle_chat(chat_id: str) -> None:
+    """
+    Create the transcript and queue support notifications for a chat the
+    activity tracker just reported as idle.
+    """
+    logger.info(f"Handling idle chat {chat_id}")
+    await create_chat_transcript(chat_id, check_activity=False)
+    await notify_chat_support_requests(chat_id)
@@ -2,11 +2,12 @@ from langchain_openai import ChatOpenAI
 import json
 from datetime import datetime, timezone
 from typing import TypedDict
-from supabase import create_client
-import supabase
-import os
 import uuid
 import requests
+from config import get_supabase_client
+
+CONTEXT_URL = "https://raw.githubusercontent.com/amarisg25/embedding-data-chatbot/main/HIV_PrEP_knowledge_embedding.json"
+
 
 class EvaluationResult(TypedDict):
     accuracy: int
@@ -65,30 +66,9 @@ class HIVCounselingEvaluation:
     def __init__(self, model="ft:gpt-4o-2024-08-06:brown-university::B4YXCCUH"):
         self.evaluator = ChatOpenAI(model=model, temperature=0)
 
-supabase = create_client(
-    os.environ.get("NEXT_PUBLIC_SUPABASE_URL"),
-    os.environ.get("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-)
-
-# accuracy evaluation
-def evaluate_counseling_response(chat_id: str, chat_response: str, context_file_path: str = "https://raw.githubusercontent.com/amarisg25/embedding-data-chatbot/main/HIV_PrEP_knowledge_embedding.json") -> EvaluationResult:
-    """
-    Evaluates if an HIV counseling chat response is properly grounded in the reference context.
-    
-    Args:
-        chat_id: Unique identifier for the chat session
-        chat_response: The counselor's response to evaluate
-        context_file_path: URL to the JSON file containing context data
-        
-    Returns:
-        EvaluationResult: Structured evaluation results
-    """
-    print("Running accuracy evaluation")
-    try:
-        response = requests.get(context_file_path)
-        context_data = response.json()
-        context_string = json.dumps(context_data, indent=2)
-        
+    @staticmethod
+    def build_messages(context_string: str, chat_response: str) -> list:
+        """Build the evaluator chat messages for one counselor response."""
         evaluation_prompt = f"""CONTEXT: {context_string}
         
 COUNSELOR RESPONSE: {chat_response}
@@ -119,43 +99,78 @@ Evaluation Criteria:
 5. Empathy: Does the response show appropriate understanding and emotional support?
 6. Evocation: Does the chatbot encourage the user to express their motivations for change?
 """
-        
-        evaluator = HIVCounselingEvaluation()
-        messages = [
+        return [
             {"role": "system", "content": HIVCounselingEvaluation.evaluation_instructions},
             {"role": "user", "content": evaluation_prompt}
         ]
-        
+
+    @staticmethod
+    def parse_result(content) -> EvaluationResult:
+        """Parse the evaluator output, filling in any missing fields.
+
+        Raises:
+            json.JSONDecodeError: If the output is not valid JSON.
+        """
+        # Handle markdown-formatted JSON response
+        if isinstance(content, str):
+            # Remove markdown code block if present
+            if content.startswith('```json'):
+                content = content[7:]  # Remove ```json
+            if content.startswith('```'):
+                content = content[3:]  # Remove ```
+            if content.endswith('```'):
+                content = content[:-3]  # Remove ```
+            content = content.strip()
+
+            result = json.loads(content)
+        else:
+            result = content
+
+        required_fields = ["accuracy", "conciseness", "up_to_dateness",
+                         "trustworthiness", "empathy", "evocation", "reasoning"]
+
+        for field in required_fields:
+            if field not in result:
+                print(f"Missing required field: {field}")
+                result[field] = 1 if field != "reasoning" else "Evaluation failed to produce complete results"
+        return result
+
+    async def aevaluate(self, context_string: str, chat_response: str) -> EvaluationResult:
+        """Score one counselor response without blocking the event loop."""
+        messages = self.build_messages(context_string, chat_response)
+        response = await self.evaluator.ainvoke(messages)
+        return self.parse_result(response.content)
+
+# accuracy evaluation
+def evaluate_counseling_response(chat_id: str, chat_response: str, context_file_path: str = CONTEXT_URL) -> EvaluationResult:
+    """
+    Evaluates if an HIV counseling chat response is properly grounded in the reference context.
+
+    Args:
+        chat_id: Unique identifier for the chat session
+        chat_response: The counselor's response to evaluate
+        context_file_path: URL to the JSON file containing context data
+
+    Returns:
+        EvaluationResult: Structured evaluation results
+    """
+    print("Running accuracy evaluation")
+    try:
+        response = requests.get(context_file_path)
+        context_data = response.json()
+        context_string = json.dumps(context_data, indent=2)
+
+        evaluator = HIVCounselingEvaluation()
+        messages = evaluator.build_messages(context_string, chat_response)
+
         response = evaluator.evaluator.invoke(messages)
         try:
-            # Handle markdown-formatted JSON response
-            content = response.content
-            if isinstance(content, str):
-                # Remove markdown code block if present
-                if content.startswith('```json'):
-                    content = content[7:]  # Remove ```json
-                if content.startswith('```'):
-                    content = content[3:]  # Remove ```
-                if content.endswith('```'):
-                    content = content[:-3]  # Remove ```
-                content = content.strip()
-                
-                result = json.loads(content)
-            else:
-                result = content
-            
-            required_fields = ["accuracy", "conciseness", "up_to_dateness", 
-                             "trustworthiness", "empathy", "evocation", "reasoning"]
-            
-            for field in required_fields:
-                if field not in result:
-                    print(f"Missing required field: {field}")
-                    result[field] = 1 if field != "reasoning" else "Evaluation failed to produce complete results"
+            result = evaluator.parse_result(response.content)
 
             # Convert datetime to ISO format string
             current_time = datetime.now(timezone.utc).isoformat()
 
-            insert_result = supabase.table("evaluations").insert({
+            insert_result = get_supabase_client().table("evaluations").insert({
                 "chat_id": chat_id,
                 "chat_response": chat_response,
                 "evaluation_result": result, 
@@ -1,95 +1,109 @@
+"""
+Load-test harness for the counseling pipeline.
+
+Runs N simulated patients concurrently, each against its own
+HIVPrEPCounselor through a MockWebSocket. By default every LLM call (agents,
+RAG, tools and the simulated patient) goes to the local stand-in server in
+mock_llm_server.py, which returns deterministic canned completions after a
+configurable latency.
+
+Example:
+    python tests/automate_transcripts.py --sessions 20 --turns 6 \
+        --latency 0.4 --jitter 0.1 --report load_report.json
+
+The JSON report contains per-turn latency percentiles, event-loop lag,
+memory per session and tool-call counts.
+"""
+import argparse
 import asyncio
 import json
 import uuid
 import time
 import os
-from openai import AsyncOpenAI
-from dotenv import load_dotenv
+import resource
 import sys
+from collections import Counter
+from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 
 
-# This assumes automate_transcripts.py is in backend/agents/
-project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
+# This assumes automate_transcripts.py is in backend/tests/
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+project_root = os.path.dirname(backend_dir)
+# Use the modified autogen package, as main.py does
+modified_packages_dir = os.path.join(backend_dir, "modified_packages")
+for path in (project_root, backend_dir, modified_packages_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
-#
-try:
-    from backend.services.counselor_session import HIVPrEPCounselor
-except ImportError:
-    print("Error: Could not import HIVPrEPCounselor. Ensure structure and sys.path are correct.")
-    sys.exit(1)
-
-load_dotenv()
-
-USER_ID = f"direct_llm_user_{uuid.uuid4()}"
-CHAT_ID = str(uuid.uuid4())
 TEACHABILITY_ENABLED = False
-TARGET_MESSAGE_COUNT = 15 
-
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 LLM_MODEL = "gpt-3.5-turbo"
 
 FIRST_USER_MESSAGE_CONTENT = "Hello, I have some questions about HIV and PrEP."
 
+
 # --- Mock WebSocket ---
 class MockWebSocket:
     """Simulates WebSocket for direct interaction with HIVPrEPCounselor."""
-    def __init__(self):
+    def __init__(self, verbose: bool = False):
         self.sent_messages = []
         self.receive_queue = asyncio.Queue()
         self.accepted = False
         self.closed = False
-        # Store the LLM response function to generate replies needed by receive_text
-        self._llm_responder = None
+        self.verbose = verbose
+
+    def _log(self, text: str):
+        if self.verbose:
+            print(f"[MockWebSocket] {text}")
 
     async def accept(self):
-        print("[MockWebSocket] Accepting connection.")
+        self._log("Accepting connection.")
         self.accepted = True
 
     async def send_text(self, text: str):
-        print(f"[MockWebSocket] CHIA trying to send: {text}")
+        self._log(f"CHIA trying to send: {text}")
         self.sent_messages.append({"type": "text", "content": text})
- 
+
     async def send_json(self, data: dict):
-        print(f"[MockWebSocket] CHIA trying to send JSON: {json.dumps(data)}")
+        self._log(f"CHIA trying to send JSON: {json.dumps(data)}")
         self.sent_messages.append({"type": "json", "content": data})
-        if data.get("type") == "teachability_flag":
-             print("[MockWebSocket] Received teachability flag confirmation.")
 
     async def receive_text(self) -> str:
         """Waits for the next simulated user message."""
         if self.closed:
-            raise Exception("WebSocket is closed") # Or appropriate WebSocket exception
-        print("[MockWebSocket] Waiting for user input (receive_text)...")
-        # A function call (like assess_hiv_risk) might call this expecting user input.
-        # The main loop needs to anticipate this and put the LLM's response into the queue.
+            raise Exception("WebSocket is closed")
+        self._log("Waiting for user input (receive_text)...")
+        # A function call (like assess_hiv_risk) might call this expecting
+        # user input; the session loop injects the patient's answer.
         user_response = await self.receive_queue.get()
-        print(f"[MockWebSocket] Received user input: {user_response}")
+        self._log(f"Received user input: {user_response}")
         self.receive_queue.task_done()
         # Wrap in JSON like the frontend might
-        return json.dumps({"type": "message", "content": user_response, "messageId": f"mock_recv_{uuid.uuid4()}"})
-
+        return json.dumps({"type": "message", "content": user_response,
+                           "messageId": f"mock_recv_{uuid.uuid4()}"})
 
     async def close(self, code: int = 1000):
-        print(f"[MockWebSocket] Closing connection with code {code}.")
+        self._log(f"Closing connection with code {code}.")
         self.closed = True
 
-    # Method for the main loop to inject the next user response
+    # Method for the session loop to inject the next user response
     async def inject_user_response(self, text: str):
         await self.receive_queue.put(text)
 
-# --- LLM Generation (similar to previous version) ---
+
+# --- Simulated patient ---
 def sanitize_for_llm(text: str) -> str:
-    # ... (keep sanitize_for_llm function from previous example) ...
-    if not isinstance(text, str): return ""
+    if not isinstance(text, str):
+        return ""
     import re
-    text = re.sub(r"^(assistant|chia|counselor|bot):\s*", "", text, flags=re.IGNORECASE).strip()
-    text = re.sub(r"^(user|patient|me):\s*", "", text, flags=re.IGNORECASE).strip()
+    text = re.sub(r"^(assistant|chia|counselor|bot):\s*", "", text,
+                  flags=re.IGNORECASE).strip()
+    text = re.sub(r"^(user|patient|me):\s*", "", text,
+                  flags=re.IGNORECASE).strip()
     return text
 
-async def generate_llm_response(conversation_history):
+
+async def generate_llm_response(client, conversation_history):
     clean_history_for_llm = []
     last_role = None
     for msg in conversation_history:
@@ -122,158 +136,304 @@ async def generate_llm_response(conversation_history):
         )
         response_content = completion.choices[0].message.content.strip()
         sanitized_response = sanitize_for_llm(response_content)
-        if not sanitized_response: return "Okay, please continue."
+        if not sanitized_response:
+            return "Okay, please continue."
         return sanitized_response
     except Exception as e:
         print(f"!!! Error calling OpenAI API: {e}")
         return "Okay, thank you anyway."
 
-# --- Main Simulation ---
-async def run_direct_simulation():
-    """Instantiates counselor and runs LLM-driven chat directly."""
-    print("--- Starting Direct Simulation ---")
-    print(f"Simulating User ID: {USER_ID}, Chat ID: {CHAT_ID}")
-
-    # 1. Create Mock WebSocket and Counselor Instance
-    mock_ws = MockWebSocket()
-    # Need to call accept manually if counselor's init expects it
-    await mock_ws.accept()
 
+# --- Measurement helpers ---
+def percentiles(values: List[float],
+                points=(50, 90, 95, 99)) -> Dict[str, Optional[float]]:
+    """Summarize values with linear-interpolated percentiles."""
+    if not values:
+        return {f"p{p}": None for p in points} | {"mean": None, "max": None,
+                                                  "count": 0}
+    ordered = sorted(values)
+    summary = {}
+    for p in points:
+        rank = (len(ordered) - 1) * p / 100
+        low = int(rank)
+        high = min(low + 1, len(ordered) - 1)
+        summary[f"p{p}"] = ordered[low] + (ordered[high] - ordered[low]) * (
+            rank - low)
+    summary["mean"] = sum(ordered) / len(ordered)
+    summary["max"] = ordered[-1]
+    summary["count"] = len(ordered)
+    return summary
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process, falling back to the peak RSS."""
     try:
-        # Pass the mock websocket to the counselor
-        workflow_manager = HIVPrEPCounselor(
-            websocket=mock_ws, # Use the mock object
-            user_id=USER_ID,
-            chat_id=CHAT_ID,
-            teachability_flag=TEACHABILITY_ENABLED # Set based on config
-        )
-        # Manually trigger teachability state send if needed by logic
-        # await workflow_manager.send_teachability_state()
-    except Exception as e:
-        print(f"!!! Error initializing HIVPrEPCounselor: {e}")
-        import traceback
-        traceback.print_exc()
-        return
-
-    llm_conversation_history = [] # History for LLM prompt
-    transcript_log = [] # Full log for file
-    chat_message_count = 0
-
-    # 2. Initial User Message
-    current_user_message_content = sanitize_for_llm(FIRST_USER_MESSAGE_CONTENT)
-    print(f"\n>>> Simulating User: {current_user_message_content}")
-    transcript_log.append(f"User: {current_user_message_content}")
-    llm_conversation_history.append({"role": "user", "content": current_user_message_content})
-    chat_message_count += 1
-
-    # 3. Conversation Loop
-    while chat_message_count < TARGET_MESSAGE_COUNT:
-        print(f"\n--- Chat Messages: {chat_message_count}/{TARGET_MESSAGE_COUNT} ---")
-
-        # 3a. Inject the user's message content IF a function might need it via receive_text
-        # This is speculative - depends on whether initiate_chat might trigger
-        # functions that call receive_text immediately. For simple Q&A it might not.
-        # await mock_ws.inject_user_response(current_user_message_content) # <-- This might be needed if functions call receive_text
-
-        # 3b. Call initiate_chat with the user's message content
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # ru_maxrss is reported in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class EventLoopLagMonitor:
+    """Samples how late the event loop wakes up a periodic sleeper."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+@dataclass
+class SessionStats:
+    """Measurements collected for one simulated session."""
+
+    index: int
+    chat_id: str
+    turn_latencies: List[float] = field(default_factory=list)
+    tool_calls: Counter = field(default_factory=Counter)
+    construct_rss_bytes: int = 0
+    timeouts: int = 0
+    errors: List[str] = field(default_factory=list)
+    transcript: List[str] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "chat_id": self.chat_id,
+            "turns": len(self.turn_latencies),
+            "turn_latency_ms": {
+                key: (value * 1000 if isinstance(value, float) else value)
+                for key, value in percentiles(self.turn_latencies).items()
+            },
+            "tool_calls": dict(self.tool_calls),
+            "construct_rss_kb": self.construct_rss_bytes / 1024,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "transcript": self.transcript,
+        }
+
+
+def count_tool_calls(messages: List[Any]) -> Counter:
+    """Count tool calls by function name, once per tool call id."""
+    seen = set()
+    counts = Counter()
+    for message in messages:
+        if not isinstance(message, dict):
+            continue
+        for tool_call in message.get("tool_calls") or []:
+            call_id = tool_call.get("id")
+            if call_id in seen:
+                continue
+            seen.add(call_id)
+            counts[tool_call.get("function", {}).get("name")] += 1
+    return counts
+
+
+# --- Simulation ---
+async def run_session(counselor, mock_ws, client, stats: SessionStats,
+                      turns: int, turn_timeout: float):
+    """Drive one simulated patient through ``turns`` counselor replies."""
+    history = []
+    user_message = sanitize_for_llm(FIRST_USER_MESSAGE_CONTENT)
+
+    for _ in range(turns):
+        stats.transcript.append(f"User: {user_message}")
+        history.append({"role": "user", "content": user_message})
+
+        started = time.perf_counter()
         try:
-            # initiate_chat should trigger the agent workflow
-            print(f"--- Calling initiate_chat with: '{current_user_message_content}' ---")
-            # Run initiate_chat and potentially triggered functions concurrently
-            # If initiate_chat calls functions that await mock_ws.receive_text(),
-            # the inject_user_response above needs to happen *before* or concurrently.
-            # This interaction is the most complex part of the mock.
-            # Let's try running initiate_chat and see if it blocks or runs.
-            initiate_task = asyncio.create_task(
-                 workflow_manager.initiate_chat(current_user_message_content)
-            )
-
-            # Wait for initiate_chat task to complete OR for a function inside it
-            # to potentially call receive_text (which would block if queue is empty).
-            # We might need a timeout here.
-            await asyncio.wait_for(initiate_task, timeout=45.0) # Timeout for agent processing
-
-            print("--- initiate_chat call finished ---")
-
+            await asyncio.wait_for(counselor.initiate_chat(user_message),
+                                   timeout=turn_timeout)
         except asyncio.TimeoutError:
-             print("!!! Timeout waiting for initiate_chat to complete.")
-             transcript_log.append("CHIA: [Processing Timeout]")
-             break
+            stats.timeouts += 1
+            stats.transcript.append("CHIA: [Processing Timeout]")
+            break
         except Exception as e:
-            print(f"!!! Error during initiate_chat: {e}")
-            import traceback
-            traceback.print_exc()
-            transcript_log.append(f"CHIA: [Error: {e}]")
-            break # Stop simulation on error
-
-        # 3c. Get the response from the counselor's state
-        # Give agents a moment to update state if needed
-        await asyncio.sleep(0.5)
-        chia_response_content_raw = workflow_manager.get_latest_response()
-        print(f"--- Got raw response from get_latest_response: '{chia_response_content_raw}' ---")
-
-        if chia_response_content_raw:
-            chat_message_count += 1
-            chia_response_content_clean = sanitize_for_llm(chia_response_content_raw)
-
-            if chia_response_content_clean:
-                print(f"<<< CHIA Response (Clean): {chia_response_content_clean}")
-                transcript_log.append(f"CHIA: {chia_response_content_clean}")
-                llm_conversation_history.append({"role": "assistant", "content": chia_response_content_clean})
-                if "goodbye" in chia_response_content_clean.lower(): break
-            else:
-                print(f"Warning: CHIA raw response invalid after sanitizing: '{chia_response_content_raw}'")
-                transcript_log.append(f"CHIA (Invalid Content): {chia_response_content_raw}")
-                # Decide whether to break or try generating a user response anyway
-                # break
-        else:
-            # No response generated by get_latest_response
-            print("!!! No response retrieved from CHIA.")
-            # Don't increment chat_message_count if no response
-            # Decide how to handle this - maybe try generating user response? Or break?
-            transcript_log.append("CHIA: [No Response Found]")
-            # Let's try to continue by generating a user prompt anyway
-            # break
-
-        # Check count before generating next user message
-        if chat_message_count >= TARGET_MESSAGE_COUNT: break
-
-        # 3d. Generate next user message using LLM
-        next_user_content_raw = await generate_llm_response(llm_conversation_history)
-        current_user_message_content = sanitize_for_llm(next_user_content_raw) # Prepare for next loop
-
-        if not current_user_message_content:
-            print("!!! LLM returned empty/invalid response. Ending.")
-            transcript_log.append("User (LLM - Invalid): [Empty Response]")
+            stats.errors.append(repr(e))
+            stats.transcript.append(f"CHIA: [Error: {e}]")
             break
+        stats.turn_latencies.append(time.perf_counter() - started)
 
-        print(f"\n>>> Simulating User: {current_user_message_content}")
-        transcript_log.append(f"User (LLM): {current_user_message_content}")
-        llm_conversation_history.append({"role": "user", "content": current_user_message_content})
-        chat_message_count += 1
-
-    # 4. End Simulation
-    print(f"\n--- Simulation Complete (Total Chat Messages: {chat_message_count}) ---")
-    await mock_ws.close() # Close the mock websocket
+        reply = sanitize_for_llm(counselor.get_latest_response() or "")
+        if not reply:
+            stats.transcript.append("CHIA: [No Response Found]")
+        else:
+            stats.transcript.append(f"CHIA: {reply}")
+            history.append({"role": "assistant", "content": reply})
+
+        user_message = await generate_llm_response(client, history)
+
+    stats.tool_calls = count_tool_calls(counselor.group_chat.messages)
+    await mock_ws.close()
+
+
+async def run_load_test(sessions: int, turns: int, base_url: str,
+                        turn_timeout: float = 45.0,
+                        lag_interval: float = 0.05,
+                        verbose: bool = False) -> Dict[str, Any]:
+    """Run ``sessions`` concurrent simulated chats and build a report."""
+    from openai import AsyncOpenAI
+    from services.counselor_session import HIVPrEPCounselor
+
+    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"),
+                         base_url=base_url)
+
+    # Sessions are built one at a time so the RSS growth of each
+    # construction can be attributed to it.
+    baseline_rss = current_rss_bytes()
+    prepared = []
+    for index in range(sessions):
+        chat_id = str(uuid.uuid4())
+        stats = SessionStats(index=index, chat_id=chat_id)
+        mock_ws = MockWebSocket(verbose=verbose)
+        await mock_ws.accept()
+        before = current_rss_bytes()
+        counselor = HIVPrEPCounselor(
+            websocket=mock_ws,
+            user_id=f"load_test_user_{index}",
+            chat_id=chat_id,
+            teachability_flag=TEACHABILITY_ENABLED,
+        )
+        stats.construct_rss_bytes = current_rss_bytes() - before
+        prepared.append((counselor, mock_ws, stats))
+    constructed_rss = current_rss_bytes()
+
+    monitor = EventLoopLagMonitor(lag_interval)
+    monitor.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_session(counselor, mock_ws, client, stats, turns, turn_timeout)
+        for counselor, mock_ws, stats in prepared))
+    duration = time.perf_counter() - started
+    await monitor.stop()
+    final_rss = current_rss_bytes()
+
+    all_stats = [stats for _, _, stats in prepared]
+    latencies = [latency for stats in all_stats
+                 for latency in stats.turn_latencies]
+    tool_calls = Counter()
+    for stats in all_stats:
+        tool_calls.update(stats.tool_calls)
+
+    def to_ms(summary):
+        return {key: (value * 1000 if isinstance(value, float) else value)
+                for key, value in summary.items()}
+
+    return {
+        "config": {"sessions": sessions, "turns": turns,
+                   "base_url": base_url, "turn_timeout": turn_timeout},
+        "duration_s": duration,
+        "turns_completed": len(latencies),
+        "turns_per_second": len(latencies) / duration if duration else None,
+        "timeouts": sum(stats.timeouts for stats in all_stats),
+        "errors": sum(len(stats.errors) for stats in all_stats),
+        "turn_latency_ms": to_ms(percentiles(latencies)),
+        "event_loop_lag_ms": to_ms(percentiles(monitor.samples)),
+        "memory": {
+            "baseline_rss_mb": baseline_rss / 2 ** 20,
+            "final_rss_mb": final_rss / 2 ** 20,
+            "peak_rss_mb": resource.getrusage(
+                resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "per_session_construct_kb": (
+                (constructed_rss - baseline_rss) / sessions / 1024),
+            "per_session_after_run_kb": (
+                (final_rss - baseline_rss) / sessions / 1024),
+        },
+        "tool_calls": dict(tool_calls),
+        "sessions": [stats.summary() for stats in all_stats],
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=10,
+                        help="number of concurrent simulated chats")
+    parser.add_argument("--turns", type=int, default=5,
+                        help="counselor replies per session")
+    parser.add_argument("--latency", type=float, default=0.5,
+                        help="stand-in LLM latency per request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="spread of the latency distribution")
+    parser.add_argument("--latency-distribution", default=None,
+                        choices=("fixed", "uniform", "normal", "lognormal",
+                                 "exponential"),
+                        help="stand-in latency distribution")
+    parser.add_argument("--fixtures", default=None,
+                        help="replay responses recorded in this JSONL file")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the stand-in latency jitter")
+    parser.add_argument("--port", type=int, default=8765,
+                        help="port for the stand-in LLM server")
+    parser.add_argument("--base-url", default=None,
+                        help="use an already running OpenAI-compatible "
+                             "server instead of starting the stand-in")
+    parser.add_argument("--turn-timeout", type=float, default=45.0)
+    parser.add_argument("--report", default="load_test_report.json",
+                        help="where to write the JSON report")
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        from tests.mock_llm_server import MockLLMServer
+        server = MockLLMServer(
+            port=args.port, latency=args.latency, jitter=args.jitter,
+            seed=args.seed, distribution=args.latency_distribution,
+            mode="replay" if args.fixtures else "canned",
+            fixtures=args.fixtures).start()
+        base_url = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-load-test")
+
+    # Every OpenAI client in the backend is created on import, so the base
+    # URL has to be in the environment before the counselor is imported.
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_BASE"] = base_url
 
-    # Save transcript
-    transcript_filename = f"transcript_direct_{CHAT_ID}.txt"
-    with open(transcript_filename, "w") as f: f.write("\n".join(transcript_log))
-    print(f"Transcript saved to {transcript_filename}")
+    try:
+        report = asyncio.run(run_load_test(
+            args.sessions, args.turns, base_url,
+            turn_timeout=args.turn_timeout, verbose=args.verbose))
+    finally:
+        if server is not None:
+            server.stop()
+
+    if server is not None:
+        report["llm_server"] = dict(server.state.counters)
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({key: report[key] for key in (
+        "turns_completed", "turns_per_second", "turn_latency_ms",
+        "event_loop_lag_ms", "tool_calls")}, indent=2))
+    print(f"Report saved to {args.report}")
 
 
 # Main execution block
 if __name__ == "__main__":
-    if not os.getenv("OPENAI_API_KEY"):
-        print("Error: OPENAI_API_KEY environment variable not set.")
-    else:
-        try:
-            asyncio.run(run_direct_simulation())
-        except KeyboardInterrupt:
-            print("\nSimulation interrupted.")
-        except Exception as e:
-            print(f"\nAn unexpected error occurred: {e}")
-            import traceback
-            traceback.print_exc()
-
-    
\ No newline at end of file
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nSimulation interrupted.")
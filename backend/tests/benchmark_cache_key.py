@@ -0,0 +1,152 @@
+"""
+Benchmark for OpenAIWrapper cache key computation.
+
+Replays a growing session with a large system prompt and tool schemas and
+times ``get_key`` (full JSON serialization of the params) against
+``get_incremental_key`` (digests of content already seen are reused) for every
+turn and every config in a multi-entry config list. Also checks that both
+schemes agree on which params are equal.
+
+Example:
+    python tests/benchmark_cache_key.py --turns 200 --configs 2
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+# This assumes benchmark_cache_key.py is in backend/tests/
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+modified_packages_dir = os.path.join(backend_dir, "modified_packages")
+if modified_packages_dir not in sys.path:
+    sys.path.insert(0, modified_packages_dir)
+
+from autogen.oai.openai_utils import get_incremental_key, get_key  # noqa: E402
+
+
+WORDS = ("prep hiv clinic provider insurance testing adherence risk support "
+         "pill injection partner counseling dose side effects").split()
+
+
+def sentence(rng, low, high):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def build_tools(count, rng):
+    return [{
+        "type": "function",
+        "function": {
+            "name": f"tool_{index}",
+            "description": sentence(rng, 20, 60),
+            "parameters": {
+                "type": "object",
+                "properties": {f"arg_{arg}": {"type": "string",
+                                              "description": sentence(rng, 5, 15)}
+                               for arg in range(4)},
+                "required": ["arg_0"],
+            },
+        },
+    } for index in range(count)]
+
+
+def build_session(turns, system_words, rng):
+    messages = [{"role": "system",
+                 "content": " ".join(rng.choice(WORDS)
+                                     for _ in range(system_words))}]
+    for turn in range(turns):
+        if turn % 2 == 0:
+            messages.append({"role": "user", "content": sentence(rng, 5, 30)})
+        else:
+            messages.append({"role": "assistant", "name": "counselor",
+                             "content": sentence(rng, 20, 120)})
+    return messages
+
+
+def replay(key_fn, session, tools, configs, deep_copy):
+    """Time key_fn for every turn and config; returns per-turn seconds and keys."""
+    timings, keys = [], []
+    for turn in range(2, len(session) + 1):
+        # Agents rebuild the message list every turn; transforms deep-copy it
+        messages = session[:turn]
+        if deep_copy:
+            messages = copy.deepcopy(messages)
+        start = time.perf_counter()
+        turn_keys = [key_fn({**config, "messages": messages, "tools": tools})
+                     for config in configs]
+        timings.append(time.perf_counter() - start)
+        keys.append(turn_keys)
+    return timings, keys
+
+
+def summarize(timings):
+    return {
+        "total_ms": round(sum(timings) * 1000, 3),
+        "mean_us": round(statistics.mean(timings) * 1e6, 1),
+        "last_turn_us": round(timings[-1] * 1e6, 1),
+    }
+
+
+def same_partition(keys_a, keys_b):
+    """Whether both key lists group the inputs identically."""
+    flat_a = [key for turn in keys_a for key in turn]
+    flat_b = [key for turn in keys_b for key in turn]
+    mapping = {}
+    for a, b in zip(flat_a, flat_b):
+        if mapping.setdefault(a, b) != b:
+            return False
+    return len(set(flat_a)) == len(set(flat_b))
+
+
+def run_benchmark(turns, configs, tools, system_words, deep_copy, seed=0):
+    rng = random.Random(seed)
+    session = build_session(turns, system_words, rng)
+    tool_schemas = build_tools(tools, rng)
+    config_list = [{"model": model, "temperature": 0, "api_key": "sk-bench",
+                    "cache_seed": 41}
+                   for model in ("gpt-4o", "gpt-4o-mini", "gpt-4")[:configs]]
+
+    before, before_keys = replay(get_key, session, tool_schemas, config_list,
+                                 deep_copy)
+    after, after_keys = replay(get_incremental_key, session, tool_schemas,
+                               config_list, deep_copy)
+    report = {
+        "turns": turns,
+        "configs": configs,
+        "tools": tools,
+        "system_prompt_chars": len(session[0]["content"]),
+        "history_chars_at_end": len(json.dumps(session)),
+        "get_key": summarize(before),
+        "get_incremental_key": summarize(after),
+        "same_partition": same_partition(before_keys, after_keys),
+    }
+    report["speedup"] = round(sum(before) / max(sum(after), 1e-9), 1)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--configs", type=int, default=2, choices=(1, 2, 3))
+    parser.add_argument("--tools", type=int, default=8)
+    parser.add_argument("--system-words", type=int, default=3000)
+    parser.add_argument("--no-deep-copy", action="store_true",
+                        help="reuse message objects between turns")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", default=None,
+                        help="optional path for the JSON report")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_benchmark(args.turns, args.configs, args.tools,
+                           args.system_words, not args.no_deep_copy, args.seed)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.report}")
@@ -0,0 +1,173 @@
+"""
+Benchmark for autogen.retrieve_utils text chunking.
+
+Builds a synthetic multi-megabyte knowledge corpus and compares the previous
+quadratic ``split_text_to_chunks`` (kept below for reference) with the
+prefix-sum implementation and the streaming ``iter_text_chunks`` over a file.
+The batch implementations must produce identical chunks.
+
+Example:
+    python tests/benchmark_chunking.py --megabytes 4 --max-tokens 200 400 4000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# This assumes benchmark_chunking.py is in backend/tests/
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+modified_packages_dir = os.path.join(backend_dir, "modified_packages")
+if modified_packages_dir not in sys.path:
+    sys.path.insert(0, modified_packages_dir)
+
+from autogen import retrieve_utils  # noqa: E402
+from autogen.retrieve_utils import iter_text_chunks, split_text_to_chunks  # noqa: E402
+
+
+WORDS = (
+    "PrEP HIV prevention daily pill injection clinic provider insurance "
+    "testing side effects adherence condoms partner risk counseling support "
+    "the a of to and in is for with on that may can your you it"
+).split()
+
+
+def legacy_split_text_to_chunks(text, max_tokens=4000, chunk_mode="multi_lines",
+                                must_break_at_empty_line=True, overlap=0):
+    """The previous implementation, re-summing and re-slicing on every chunk."""
+    count_token = retrieve_utils.count_token
+    minimum_length = retrieve_utils.RAG_MINIMUM_MESSAGE_LENGTH
+    if chunk_mode not in retrieve_utils.VALID_CHUNK_MODES:
+        raise AssertionError
+    if chunk_mode == "one_line":
+        must_break_at_empty_line = False
+        overlap = 0
+    chunks = []
+    lines = text.split("\n")
+    if len(lines) < 3 and must_break_at_empty_line:
+        must_break_at_empty_line = False
+    lines_tokens = [count_token(line) for line in lines]
+    sum_tokens = sum(lines_tokens)
+    while sum_tokens > max_tokens:
+        if chunk_mode == "one_line":
+            estimated_line_cut = 2
+        else:
+            estimated_line_cut = max(int(max_tokens / sum_tokens * len(lines)), 2)
+        cnt = 0
+        prev = ""
+        for cnt in reversed(range(estimated_line_cut)):
+            if must_break_at_empty_line and lines[cnt].strip() != "":
+                continue
+            if sum(lines_tokens[:cnt]) <= max_tokens:
+                prev = "\n".join(lines[:cnt])
+                break
+        if cnt == 0:
+            if not must_break_at_empty_line:
+                split_len = max(
+                    int(max_tokens / (lines_tokens[0] * 0.9 * len(lines[0]) + 0.1)), minimum_length
+                )
+                prev = lines[0][:split_len]
+                lines[0] = lines[0][split_len:]
+                lines_tokens[0] = count_token(lines[0])
+            else:
+                must_break_at_empty_line = False
+        if len(prev) >= minimum_length:
+            chunks.append(prev)
+        lines = lines[cnt - overlap if cnt > overlap else cnt:]
+        lines_tokens = lines_tokens[cnt - overlap if cnt > overlap else cnt:]
+        sum_tokens = sum(lines_tokens)
+    text_to_chunk = "\n".join(lines).strip()
+    if len(text_to_chunk) >= minimum_length:
+        chunks.append(text_to_chunk)
+    return chunks
+
+
+def build_corpus(megabytes: float, seed: int = 0) -> str:
+    """Paragraphs of short and long lines separated by empty lines."""
+    rng = random.Random(seed)
+    lines = []
+    size = 0
+    while size < megabytes * 1024 * 1024:
+        if rng.random() < 0.2:
+            line = ""
+        else:
+            line = " ".join(rng.choice(WORDS)
+                            for _ in range(rng.randint(4, 40)))
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(megabytes, max_tokens_values, overlap=0, skip_legacy=False,
+                  seed=0):
+    corpus = build_corpus(megabytes, seed)
+    report = {"corpus_bytes": len(corpus.encode()),
+              "corpus_lines": corpus.count("\n") + 1,
+              "results": []}
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False,
+                                     encoding="utf-8") as f:
+        f.write(corpus)
+        corpus_path = f.name
+
+    try:
+        # Warm the tokenizer so its load time is not charged to one run
+        retrieve_utils.count_token("warm up")
+        for max_tokens in max_tokens_values:
+            chunks, seconds = timed(split_text_to_chunks, corpus, max_tokens,
+                                    overlap=overlap)
+            result = {"max_tokens": max_tokens, "chunks": len(chunks),
+                      "prefix_sum_seconds": round(seconds, 3)}
+
+            with open(corpus_path, encoding="utf-8") as f:
+                streamed, seconds = timed(
+                    lambda: list(iter_text_chunks(f, max_tokens,
+                                                  overlap=overlap)))
+            result["streaming_seconds"] = round(seconds, 3)
+            result["streaming_chunks"] = len(streamed)
+
+            if not skip_legacy:
+                legacy, seconds = timed(legacy_split_text_to_chunks, corpus,
+                                        max_tokens, overlap=overlap)
+                result["legacy_seconds"] = round(seconds, 3)
+                result["identical"] = legacy == chunks
+                result["speedup"] = round(
+                    result["legacy_seconds"]
+                    / max(result["prefix_sum_seconds"], 1e-9), 1)
+            report["results"].append(result)
+            print(json.dumps(result))
+    finally:
+        os.unlink(corpus_path)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--megabytes", type=float, default=4.0,
+                        help="size of the synthetic corpus")
+    parser.add_argument("--max-tokens", type=int, nargs="+",
+                        default=[200, 400, 4000])
+    parser.add_argument("--overlap", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-legacy", action="store_true",
+                        help="only time the new implementations")
+    parser.add_argument("--report", default=None,
+                        help="optional path for the JSON report")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_benchmark(args.megabytes, args.max_tokens, args.overlap,
+                           args.skip_legacy, args.seed)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.report}")
@@ -0,0 +1,150 @@
+"""
+Benchmark for hedged, latency-aware routing across config_list entries.
+
+Starts two local mock LLM servers standing in for two deployments of the same
+model, both with heavy-tailed lognormal latency, and sends the same batch of
+requests through ``OpenAIWrapper.a_create`` three ways: strictly in
+config_list order, with weighted routing only, and with routing plus hedging
+at a latency percentile. Reports the latency percentiles, how the traffic was
+split, and how many hedges fired and won.
+
+Example:
+    python tests/benchmark_hedging.py --requests 300 --latency 0.1 --jitter 1.0
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+# This assumes benchmark_hedging.py is in backend/tests/
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+modified_packages_dir = os.path.join(backend_dir, "modified_packages")
+if modified_packages_dir not in sys.path:
+    sys.path.insert(0, modified_packages_dir)
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+if tests_dir not in sys.path:
+    sys.path.insert(0, tests_dir)
+
+from autogen import OpenAIWrapper  # noqa: E402
+from autogen.oai.routing import clear_endpoint_stats  # noqa: E402
+from mock_llm_server import MockLLMServer  # noqa: E402
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(latencies):
+    return {
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1),
+    }
+
+
+async def send_all(wrapper, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, models = [], []
+
+    async def one(index):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await wrapper.a_create(
+                messages=[{"role": "user", "content": f"question {index}"}])
+            latencies.append(time.perf_counter() - start)
+            models.append(response.config_id)
+
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    return latencies, models
+
+
+def run_scenario(base_urls, routing, weights, requests, concurrency, warmup):
+    clear_endpoint_stats()
+    config_list = [{"model": "gpt-4o", "api_key": "sk-mock", "base_url": url,
+                    "weight": weight}
+                   for url, weight in zip(base_urls, weights)]
+    kwargs = {"config_list": config_list, "cache_seed": None}
+    if routing is not None:
+        kwargs["routing"] = routing
+    wrapper = OpenAIWrapper(**kwargs)
+
+    async def run():
+        # Warm up so the router has latency samples before timing starts
+        await send_all(wrapper, warmup, concurrency)
+        return await send_all(wrapper, requests, concurrency)
+
+    latencies, config_ids = asyncio.run(run())
+    result = summarize(latencies)
+    result["share"] = [round(config_ids.count(index) / len(config_ids), 3)
+                       for index in range(len(base_urls))]
+    if wrapper._router is not None:
+        result["hedges"] = wrapper._router.hedges
+        result["hedge_wins"] = wrapper._router.hedge_wins
+    return result
+
+
+def run_benchmark(requests, concurrency, latency, jitter, hedge_percentile,
+                  weights, warmup, port, seed=0):
+    servers = [MockLLMServer(port=port + index, latency=latency, jitter=jitter,
+                             seed=seed + index, distribution="lognormal")
+               for index in range(2)]
+    for server in servers:
+        server.start()
+    try:
+        base_urls = [server.base_url for server in servers]
+        report = {
+            "requests": requests,
+            "concurrency": concurrency,
+            "latency": {"distribution": "lognormal", "median_s": latency,
+                        "sigma": jitter},
+            "in_order": run_scenario(base_urls, None, weights, requests,
+                                     concurrency, warmup),
+            "routed": run_scenario(base_urls, {"hedge_percentile": None, "seed": seed},
+                                   weights, requests, concurrency, warmup),
+            "routed_hedged": run_scenario(
+                base_urls, {"hedge_percentile": hedge_percentile, "seed": seed},
+                weights, requests, concurrency, warmup),
+        }
+    finally:
+        for server in servers:
+            server.stop()
+    report["p99_speedup"] = round(report["in_order"]["p99_ms"]
+                                  / max(report["routed_hedged"]["p99_ms"], 1e-9), 1)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.1,
+                        help="median latency of both mock servers in seconds")
+    parser.add_argument("--jitter", type=float, default=1.0,
+                        help="lognormal sigma; higher means a heavier tail")
+    parser.add_argument("--hedge-percentile", type=float, default=0.9)
+    parser.add_argument("--weights", type=float, nargs=2, default=[3.0, 1.0])
+    parser.add_argument("--warmup", type=int, default=60)
+    parser.add_argument("--port", type=int, default=8775,
+                        help="first of two consecutive ports for the mock servers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", default=None,
+                        help="optional path for the JSON report")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_benchmark(args.requests, args.concurrency, args.latency,
+                           args.jitter, args.hedge_percentile, args.weights,
+                           args.warmup, args.port, args.seed)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.report}")
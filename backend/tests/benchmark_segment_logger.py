@@ -0,0 +1,120 @@
+"""
+Benchmark for autogen's SegmentLogger against the FileLogger.
+
+Logs the chat completions of growing conversations, where every request
+carries the whole history, with the FileLogger and with the SegmentLogger,
+and reports the bytes each leaves on disk, the time each logging call blocks
+its caller, and how long the segment query takes to roll the logs up.
+
+Example:
+    python tests/benchmark_segment_logger.py --sessions 20 --turns 40
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import types
+
+# This assumes benchmark_segment_logger.py is in backend/tests/
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+modified_packages_dir = os.path.join(backend_dir, "modified_packages")
+if modified_packages_dir not in sys.path:
+    sys.path.insert(0, modified_packages_dir)
+
+from autogen.logger.file_logger import FileLogger  # noqa: E402
+from autogen.logger.segment_logger import SegmentLogger  # noqa: E402
+from autogen.logger.segment_query import rollup  # noqa: E402
+
+SYSTEM = {"role": "system",
+          "content": "You are a helpful HIV prevention counselor. " * 20}
+
+
+def make_response(turn):
+    # Only the attributes the loggers read; a ChatCompletion works the same
+    return types.SimpleNamespace(
+        model="gpt-4o",
+        usage=types.SimpleNamespace(prompt_tokens=100 * turn, completion_tokens=50),
+        choices=[{"message": {"role": "assistant",
+                              "content": f"Answer {turn} about PrEP. " * 10}}],
+    )
+
+
+def log_sessions(logger, sessions, turns):
+    calls = []
+    for session in range(sessions):
+        messages = [SYSTEM]
+        for turn in range(turns):
+            messages.append({"role": "user",
+                             "content": f"Session {session} question {turn}. " * 5})
+            response = make_response(turn)
+            start = time.perf_counter()
+            logger.log_chat_completion(
+                f"{session}-{turn}", 1, 2, "counselor",
+                {"model": "gpt-4o", "messages": list(messages)}, response,
+                0, 0.001, "2024-01-01 00:00:00.000000")
+            calls.append(time.perf_counter() - start)
+            messages.append(response.choices[0]["message"])
+    return calls
+
+
+def directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def run_benchmark(sessions, turns, segment_bytes):
+    report = {"sessions": sessions, "turns": turns}
+    with tempfile.TemporaryDirectory() as tmp:
+        # FileLogger writes under the working directory
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        file_logger = FileLogger({"filename": "runtime.log"})
+        file_logger.start()
+        calls = log_sessions(file_logger, sessions, turns)
+        file_logger.stop()
+        logging.getLogger("autogen.logger.file_logger").handlers.clear()
+        report["file"] = {
+            "bytes": directory_bytes(os.path.join(tmp, "autogen_logs")),
+            "call_mean_us": round(sum(calls) / len(calls) * 1e6, 1),
+        }
+
+        log_dir = os.path.join(tmp, "segments")
+        segment_logger = SegmentLogger({"log_dir": log_dir, "segment_bytes": segment_bytes})
+        segment_logger.start()
+        calls = log_sessions(segment_logger, sessions, turns)
+        segment_logger.stop()
+        start = time.perf_counter()
+        rows = rollup(log_dir)
+        report["segment"] = {
+            "bytes": directory_bytes(log_dir),
+            "segments": len(os.listdir(log_dir)),
+            "call_mean_us": round(sum(calls) / len(calls) * 1e6, 1),
+            "rollup_s": round(time.perf_counter() - start, 3),
+            "rollup_calls": sum(row["calls"] for row in rows),
+        }
+        os.chdir(cwd)
+    report["size_ratio"] = round(report["file"]["bytes"] / max(report["segment"]["bytes"], 1), 1)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--segment-bytes", type=int, default=1024 * 1024)
+    parser.add_argument("--report", default=None,
+                        help="optional path for the JSON report")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_benchmark(args.sessions, args.turns, args.segment_bytes)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.report}")
@@ -0,0 +1,115 @@
+"""
+Benchmark for autogen's SqliteLogger, inline commits against the batched writer.
+
+Logs the same chat completions from several threads into a fresh database,
+once with a commit per row on the calling thread and once with the batched
+background writer, and reports the time each logging call blocks its caller,
+the throughput, and how many rows reached the database.
+
+Example:
+    python tests/benchmark_sqlite_logger.py --rows 5000 --threads 4
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+# This assumes benchmark_sqlite_logger.py is in backend/tests/
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+modified_packages_dir = os.path.join(backend_dir, "modified_packages")
+if modified_packages_dir not in sys.path:
+    sys.path.insert(0, modified_packages_dir)
+
+from autogen.logger.sqlite_logger import SqliteLogger  # noqa: E402
+
+REQUEST = {"model": "gpt-4o", "messages": [
+    {"role": "system", "content": "You are a helpful HIV prevention counselor."},
+    {"role": "user", "content": "What are the side effects of PrEP?"},
+]}
+RESPONSE = "Most people have no side effects; some notice mild nausea."
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_scenario(config, rows, threads):
+    with tempfile.TemporaryDirectory() as tmp:
+        dbname = os.path.join(tmp, "logs.db")
+        logger = SqliteLogger({"dbname": dbname, **config})
+        logger.start()
+        latencies = [[] for _ in range(threads)]
+
+        def log_rows(worker):
+            for index in range(rows // threads):
+                start = time.perf_counter()
+                logger.log_chat_completion(
+                    f"{worker}-{index}", 1, 2, "counselor", REQUEST, RESPONSE,
+                    0, 0.001, "2024-01-01 00:00:00")
+                latencies[worker].append(time.perf_counter() - start)
+
+        workers = [threading.Thread(target=log_rows, args=(worker,))
+                   for worker in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        logged = time.perf_counter() - start
+        logger.flush()
+        committed = time.perf_counter() - start
+        logger.stop()
+        with sqlite3.connect(dbname) as con:
+            stored = con.execute("SELECT COUNT(*) FROM chat_completions").fetchone()[0]
+
+    calls = [latency for worker in latencies for latency in worker]
+    return {
+        "call_p50_us": round(percentile(calls, 0.50) * 1e6, 1),
+        "call_p99_us": round(percentile(calls, 0.99) * 1e6, 1),
+        "logged_per_s": round(len(calls) / logged),
+        "committed_per_s": round(len(calls) / committed),
+        "rows_stored": stored,
+        "rows_dropped": logger.dropped,
+    }
+
+
+def run_benchmark(rows, threads, batch_size, queue_size, on_full):
+    inline = run_scenario({}, rows, threads)
+    batched = run_scenario({"batched": True, "batch_size": batch_size,
+                            "queue_size": queue_size, "on_full": on_full},
+                           rows, threads)
+    return {
+        "rows": rows,
+        "threads": threads,
+        "inline": inline,
+        "batched": batched,
+        "call_p50_speedup": round(inline["call_p50_us"] / max(batched["call_p50_us"], 1e-9), 1),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--on-full", choices=["block", "drop"], default="block")
+    parser.add_argument("--report", default=None,
+                        help="optional path for the JSON report")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_benchmark(args.rows, args.threads, args.batch_size,
+                           args.queue_size, args.on_full)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.report}")
@@ -0,0 +1,133 @@
+"""
+Benchmark for MessageTokenLimiter on a growing counseling chat.
+
+Replays a conversation turn by turn and runs the full history through
+TransformMessages before every reply, as the agent's hook does. The default
+limiter makes TransformMessages deep-copy the history and re-tokenizes all of
+it on every call. The incremental one is copy-safe, so the history is not
+copied, and only new and truncated messages are tokenized. What is left per
+call is hashing each message once to find the counted prefix, and walking
+back over the messages that fit in max_tokens. Both must return the same
+messages.
+
+Example:
+    python tests/benchmark_token_limiter.py --turns 200 --max-tokens 3000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+# This assumes benchmark_token_limiter.py is in backend/tests/
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+modified_packages_dir = os.path.join(backend_dir, "modified_packages")
+if modified_packages_dir not in sys.path:
+    sys.path.insert(0, modified_packages_dir)
+
+from autogen import token_count_utils  # noqa: E402
+from autogen.agentchat.contrib.capabilities.transform_messages import TransformMessages  # noqa: E402
+from autogen.agentchat.contrib.capabilities.transforms import MessageTokenLimiter  # noqa: E402
+
+
+SENTENCES = [
+    "PrEP is a daily pill that lowers the chance of getting HIV.",
+    "Some people notice mild nausea during the first few weeks.",
+    "Would you like help finding a provider near you?",
+    "Many insurance plans and assistance programs cover the cost.",
+    "It is important to get tested for HIV before starting PrEP.",
+    "I have been worried about my risk for a while now.",
+    "What happens if I miss a dose?",
+    "Thank you, that is really helpful to know.",
+]
+
+
+def build_conversation(turns: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    messages = []
+    for turn in range(turns):
+        role = "user" if turn % 2 == 0 else "assistant"
+        length = rng.randint(1, 4) if role == "user" else rng.randint(3, 20)
+        content = " ".join(rng.choice(SENTENCES) for _ in range(length))
+        messages.append({"role": role, "content": f"[{turn}] {content}"})
+    return messages
+
+
+def replay(limiter: MessageTokenLimiter, conversation: list) -> tuple:
+    """Transform the history before every turn; return per-call seconds and outputs."""
+    transform_messages = TransformMessages(transforms=[limiter], verbose=False)
+    timings, outputs = [], []
+    history = []
+    for message in conversation:
+        # The agent's history grows in place, like ConversableAgent's
+        history.append(dict(message))
+        start = time.perf_counter()
+        result = transform_messages._transform_messages(history)
+        timings.append(time.perf_counter() - start)
+        outputs.append([(msg["role"], msg["content"]) for msg in result])
+    return timings, outputs
+
+
+def summarize(timings: list) -> dict:
+    ordered = sorted(timings)
+    return {
+        "total_seconds": round(sum(timings), 4),
+        "mean_ms": round(statistics.mean(timings) * 1000, 3),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 3),
+        "last_turn_ms": round(timings[-1] * 1000, 3),
+    }
+
+
+def run_benchmark(turns, max_tokens, max_tokens_per_message, min_tokens,
+                  model, seed=0):
+    conversation = build_conversation(turns, seed)
+    kwargs = dict(max_tokens=max_tokens,
+                  max_tokens_per_message=max_tokens_per_message,
+                  min_tokens=min_tokens, model=model)
+    # Warm the tokenizer so its load time is not charged to one run
+    token_count_utils.count_token("warm up")
+
+    token_count_utils.clear_token_count_cache()
+    before, before_outputs = replay(MessageTokenLimiter(**kwargs),
+                                    conversation)
+    token_count_utils.clear_token_count_cache()
+    after, after_outputs = replay(
+        MessageTokenLimiter(incremental=True, **kwargs), conversation)
+
+    report = {
+        "turns": turns,
+        "limiter": kwargs,
+        "before": summarize(before),
+        "after": summarize(after),
+        "identical": before_outputs == after_outputs,
+    }
+    report["speedup"] = round(report["before"]["total_seconds"]
+                              / max(report["after"]["total_seconds"], 1e-9), 1)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--max-tokens", type=int, default=3000)
+    parser.add_argument("--max-tokens-per-message", type=int, default=200)
+    parser.add_argument("--min-tokens", type=int, default=500)
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", default=None,
+                        help="optional path for the JSON report")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_benchmark(args.turns, args.max_tokens,
+                           args.max_tokens_per_message, args.min_tokens,
+                           args.model, args.seed)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.report}")
@@ -0,0 +1,98 @@
+"""
+Benchmark for the memoized tool schemas in autogen's function_utils.
+
+Creates the tool wrappers of a session the way FunctionRegistry does, as
+fresh closures, and times building their JSON schemas and argument loaders
+with the caches cleared before every session (cold) and kept (warm).
+
+Example:
+    python tests/benchmark_tool_schemas.py --sessions 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# This assumes benchmark_tool_schemas.py is in backend/tests/
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+modified_packages_dir = os.path.join(backend_dir, "modified_packages")
+if modified_packages_dir not in sys.path:
+    sys.path.insert(0, modified_packages_dir)
+
+from autogen import function_utils  # noqa: E402
+
+
+def session_tools():
+    def answer_question_wrapper(user_question: str) -> str:
+        return user_question
+
+    async def assess_hiv_risk_wrapper(language: str) -> str:
+        return language
+
+    def search_provider_wrapper(zip_code: str, language: str) -> str:
+        return zip_code
+
+    async def assess_status_of_change_wrapper(language: str) -> str:
+        return language
+
+    async def record_support_request_wrapper(language: str) -> str:
+        return language
+
+    async def notify_research_assistant_wrapper(language: str) -> str:
+        return language
+
+    def summarize_chat_history_wrapper(user_request: str, language: str = "English") -> str:
+        return user_request
+
+    return [answer_question_wrapper, assess_hiv_risk_wrapper,
+            search_provider_wrapper, assess_status_of_change_wrapper,
+            record_support_request_wrapper, notify_research_assistant_wrapper,
+            summarize_chat_history_wrapper]
+
+
+def register_session():
+    for tool in session_tools():
+        # The caller gets the schema, the executor wraps the function
+        function_utils.get_function_schema(tool, description=tool.__name__)
+        function_utils.load_basemodels_if_needed(tool)
+
+
+def time_sessions(sessions, cold):
+    start = time.perf_counter()
+    for _ in range(sessions):
+        if cold:
+            function_utils._schema_cache.clear()
+            function_utils._introspection_cache.clear()
+        register_session()
+    return (time.perf_counter() - start) / sessions
+
+
+def run_benchmark(sessions):
+    cold = time_sessions(sessions, cold=True)
+    warm = time_sessions(sessions, cold=False)
+    return {
+        "sessions": sessions,
+        "tools_per_session": len(session_tools()),
+        "cold_ms_per_session": round(cold * 1000, 3),
+        "warm_ms_per_session": round(warm * 1000, 3),
+        "speedup": round(cold / warm, 1),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--report", default=None,
+                        help="optional path for the JSON report")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_benchmark(args.sessions)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.report}")
@@ -0,0 +1,135 @@
+"""
+Benchmark for the overhead of autogen tracing.
+
+Sends the same batch of requests through ``OpenAIWrapper.a_create`` against
+the local mock LLM server with tracing off, on with every trace sampled, and
+on with a fraction sampled, each writing JSON lines to a temporary file. Also
+times a bare call of a ``traced`` function with tracing off, which is what
+instrumented code pays when nothing is exported.
+
+Example:
+    python tests/benchmark_tracing.py --requests 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# This assumes benchmark_tracing.py is in backend/tests/
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+modified_packages_dir = os.path.join(backend_dir, "modified_packages")
+if modified_packages_dir not in sys.path:
+    sys.path.insert(0, modified_packages_dir)
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+if tests_dir not in sys.path:
+    sys.path.insert(0, tests_dir)
+
+from autogen import OpenAIWrapper, tracing  # noqa: E402
+from mock_llm_server import MockLLMServer  # noqa: E402
+
+
+async def send_all(wrapper, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index):
+        async with semaphore:
+            with tracing.baggage(session_id=f"session-{index % concurrency}"), \
+                    tracing.span("chat.turn"):
+                await wrapper.a_create(
+                    messages=[{"role": "user", "content": f"question {index}"}])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    return time.perf_counter() - start
+
+
+async def run_scenario(base_url, sample_rate, requests, concurrency, repeats):
+    wrapper = OpenAIWrapper(config_list=[{"model": "gpt-4o", "api_key": "sk-mock",
+                                          "base_url": base_url}],
+                            cache_seed=None)
+    durations, spans = [], 0
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "traces.jsonl")
+            if sample_rate is not None:
+                tracing.configure(tracing.JsonLinesSpanExporter(path),
+                                  sample_rate=sample_rate)
+            durations.append(await send_all(wrapper, requests, concurrency))
+            tracing.shutdown()
+            if os.path.exists(path):
+                with open(path) as f:
+                    spans = sum(1 for _ in f)
+    return {
+        "median_s": round(statistics.median(durations), 3),
+        "per_request_ms": round(statistics.median(durations) / requests * 1000, 3),
+        "spans_per_run": spans,
+    }
+
+
+def time_traced_call(calls):
+    @tracing.traced("noop")
+    def instrumented():
+        return None
+
+    def plain():
+        return None
+
+    timings = {}
+    for name, func in (("plain", plain), ("traced_off", instrumented)):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        timings[name] = time.perf_counter() - start
+    return round((timings["traced_off"] - timings["plain"]) / calls * 1e9, 1)
+
+
+def run_benchmark(requests, concurrency, latency, sample_rate, repeats, port):
+    async def run_all(base_url):
+        return {
+            "off": await run_scenario(base_url, None, requests, concurrency, repeats),
+            "on": await run_scenario(base_url, 1.0, requests, concurrency, repeats),
+            "sampled": await run_scenario(base_url, sample_rate, requests,
+                                          concurrency, repeats),
+        }
+
+    with MockLLMServer(port=port, latency=latency, jitter=0.0, seed=0) as server:
+        report = {
+            "requests": requests,
+            "concurrency": concurrency,
+            "latency_s": latency,
+            **asyncio.run(run_all(server.base_url)),
+        }
+    report["sample_rate"] = sample_rate
+    report["traced_call_overhead_off_ns"] = time_traced_call(1_000_000)
+    report["overhead_on_pct"] = round(
+        (report["on"]["median_s"] / report["off"]["median_s"] - 1) * 100, 1)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="mock server latency in seconds; 0 exposes the overhead")
+    parser.add_argument("--sample-rate", type=float, default=0.1)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8776)
+    parser.add_argument("--report", default=None,
+                        help="optional path for the JSON report")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_benchmark(args.requests, args.concurrency, args.latency,
+                           args.sample_rate, args.repeats, args.port)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.report}")
@@ -0,0 +1,498 @@
+"""
+Local OpenAI-compatible mock server for benchmarks and regression tests.
+
+Serves chat completions (including tool calls and streaming) and embeddings
+so the whole backend can run offline with reproducible numbers:
+
+- ``canned`` mode returns deterministic completions derived from the request.
+- ``replay`` mode returns responses recorded in a JSONL fixture file.
+- ``record`` mode forwards requests to a real upstream and appends the
+  responses to the fixture file for later replay.
+
+Response latency is drawn from a seeded distribution (fixed, uniform, normal,
+lognormal or exponential), so runs with the same seed see the same delays.
+
+Point the backend at it with ``OPENAI_BASE_URL=http://127.0.0.1:8765/v1``.
+
+Example:
+    python tests/mock_llm_server.py --port 8765 \
+        --latency-distribution lognormal --latency 0.4 --jitter 0.25
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import struct
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+
+EMBEDDING_DIMENSIONS = 1536
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal",
+                         "exponential")
+
+PATIENT_LINES = [
+    "What is PrEP and how does it work?",
+    "Are there any side effects I should know about?",
+    "How often do I need to take it?",
+    "Can you help me find a provider near me?",
+    "Is PrEP covered by insurance?",
+    "Do I still need to use condoms?",
+    "How long does it take to start working?",
+    "Thanks, that helps a lot.",
+]
+
+COUNSELOR_LINES = [
+    "PrEP is a daily medicine that greatly lowers the chance of getting HIV "
+    "from sex or injection drug use. What made you curious about it?",
+    "Most people have no side effects; some notice mild nausea or headaches "
+    "that go away within a few weeks. How are you feeling about that?",
+    "It's one pill a day, and there is also a long-acting shot given every "
+    "two months. Which option sounds like a better fit for you?",
+    "I can help with that. What's your ZIP code?",
+]
+
+# Request fields that do not change the response and are left out of
+# fixture keys
+UNKEYED_FIELDS = ("stream", "stream_options", "user", "seed")
+
+
+def _digest(value: Any) -> int:
+    return int(hashlib.sha256(repr(value).encode()).hexdigest()[:16], 16)
+
+
+def _estimate_tokens(value: Any) -> int:
+    return max(1, len(repr(value)) // 4)
+
+
+def fixture_key(endpoint: str, body: Dict[str, Any]) -> str:
+    """Stable key for a request, used to match recorded fixtures."""
+    keyed = {key: value for key, value in body.items()
+             if key not in UNKEYED_FIELDS}
+    canonical = json.dumps([endpoint, keyed], sort_keys=True,
+                           separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class LatencyModel:
+    """Seeded latency distribution for simulated responses.
+
+    ``latency`` is the mean (or the median for lognormal) in seconds and
+    ``jitter`` its spread: the half-width for uniform, the standard
+    deviation for normal and the log-space sigma for lognormal.
+    """
+
+    def __init__(self, distribution: str = "fixed", latency: float = 0.0,
+                 jitter: float = 0.0, seed: int = 0):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution: {distribution}. "
+                f"Available distributions: {list(LATENCY_DISTRIBUTIONS)}")
+        self.distribution = distribution
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+    def sample(self) -> float:
+        """Draw the delay for the next response in seconds."""
+        if self.latency <= 0:
+            return 0.0
+        if self.distribution == "uniform":
+            delay = self._random.uniform(self.latency - self.jitter,
+                                         self.latency + self.jitter)
+        elif self.distribution == "normal":
+            delay = self._random.gauss(self.latency, self.jitter)
+        elif self.distribution == "lognormal":
+            delay = self._random.lognormvariate(math.log(self.latency),
+                                                self.jitter)
+        elif self.distribution == "exponential":
+            delay = self._random.expovariate(1 / self.latency)
+        else:
+            delay = self.latency
+        return max(0.0, delay)
+
+
+class FixtureStore:
+    """Recorded responses keyed by ``fixture_key``, stored as JSONL."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._responses: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._responses[record["key"]] = record["response"]
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._responses.get(key)
+
+    def record(self, key: str, endpoint: str, body: Dict[str, Any],
+               response: Any) -> None:
+        with self._lock:
+            self._responses[key] = response
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"key": key, "endpoint": endpoint,
+                                        "request": body,
+                                        "response": response}) + "\n")
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+
+class MockLLMState:
+    """Configuration and request counters for the mock server."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0,
+                 seed: int = 0, distribution: str = None,
+                 mode: str = "canned", fixtures: Optional[str] = None,
+                 upstream: Optional[str] = None, strict: bool = False):
+        """Initialize the server state.
+
+        Args:
+            latency: Mean response latency in seconds.
+            jitter: Spread of the latency distribution.
+            seed: Seed for latency sampling.
+            distribution: Latency distribution name. Defaults to uniform
+                when jitter is set and fixed otherwise.
+            mode: ``canned``, ``replay`` or ``record``.
+            fixtures: JSONL fixture file for replay and record modes.
+            upstream: Real API base URL used in record mode.
+            strict: In replay mode, fail requests without a fixture
+                instead of falling back to canned responses.
+        """
+        if mode not in ("canned", "replay", "record"):
+            raise ValueError(f"Unknown mock server mode: {mode}")
+        if mode == "record" and not upstream:
+            raise ValueError("Record mode requires an upstream base URL")
+        distribution = distribution or ("uniform" if jitter else "fixed")
+        self.latency = LatencyModel(distribution, latency, jitter, seed)
+        self.mode = mode
+        self.fixtures = FixtureStore(fixtures)
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.strict = strict
+        self.counters: Dict[str, int] = {
+            "chat_completions": 0,
+            "streamed_completions": 0,
+            "embeddings": 0,
+            "tool_calls": 0,
+            "fixture_hits": 0,
+            "fixture_misses": 0,
+            "recorded": 0,
+        }
+
+    def delay(self) -> float:
+        """Return the simulated latency for the next response."""
+        return self.latency.sample()
+
+
+def _last_message(messages: List[dict], role: str) -> Optional[dict]:
+    for message in reversed(messages):
+        if message.get("role") == role:
+            return message
+    return None
+
+
+def canned_completion(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a deterministic assistant message for a chat request.
+
+    Requests that offer tools get an ``answer_question`` tool call the first
+    time a user question is seen, and plain text once a tool result follows.
+    Requests that look like the simulated patient get a patient line.
+    """
+    messages = body.get("messages", [])
+    last = messages[-1] if messages else {}
+    tools = body.get("tools") or []
+    tool_names = [tool.get("function", {}).get("name") for tool in tools]
+
+    if "answer_question" in tool_names and last.get("role") == "user":
+        question = last.get("content") or ""
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{
+                "id": f"call_{_digest(question) % 10 ** 12}",
+                "type": "function",
+                "function": {
+                    "name": "answer_question",
+                    "arguments": json.dumps({"user_question": question}),
+                },
+            }],
+        }
+
+    system = (messages[0].get("content") or "") if messages else ""
+    if "simulating a HUMAN user" in system:
+        turn = sum(1 for message in messages if message.get("role") == "user")
+        return {"role": "assistant",
+                "content": PATIENT_LINES[turn % len(PATIENT_LINES)]}
+
+    user = _last_message(messages, "user") or {}
+    line = COUNSELOR_LINES[_digest(user.get("content")) % len(COUNSELOR_LINES)]
+    return {"role": "assistant", "content": line}
+
+
+def canned_chat_response(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Wrap ``canned_completion`` in a chat.completion object."""
+    message = canned_completion(body)
+    finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+    prompt_tokens = _estimate_tokens(body.get("messages"))
+    completion_tokens = _estimate_tokens(message)
+    return {
+        "id": f"chatcmpl-{_digest(body) % 10 ** 16:016d}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "system_fingerprint": "fp_mock",
+        "choices": [{"index": 0, "message": message,
+                     "finish_reason": finish_reason, "logprobs": None}],
+        "usage": {"prompt_tokens": prompt_tokens,
+                  "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+def canned_embeddings(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Deterministic unit vectors derived from each input."""
+    inputs = body.get("input")
+    if not isinstance(inputs, list) or (
+            inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+    dimensions = body.get("dimensions") or EMBEDDING_DIMENSIONS
+    data = []
+    for index, item in enumerate(inputs):
+        rng = random.Random(_digest(item))
+        vector = [rng.uniform(-1.0, 1.0) for _ in range(dimensions)]
+        norm = sum(value * value for value in vector) ** 0.5
+        data.append({"object": "embedding", "index": index,
+                     "embedding": [value / norm for value in vector]})
+    tokens = _estimate_tokens(inputs)
+    return {"object": "list", "data": data,
+            "model": body.get("model", "text-embedding-3-small"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+
+def encode_embeddings(response: Dict[str, Any],
+                      encoding_format: Optional[str]) -> Dict[str, Any]:
+    """Convert float embeddings to base64 when the client asks for it."""
+    if encoding_format != "base64":
+        return response
+    data = []
+    for item in response["data"]:
+        embedding = item["embedding"]
+        if isinstance(embedding, list):
+            embedding = base64.b64encode(struct.pack(
+                f"<{len(embedding)}f", *embedding)).decode()
+        data.append({**item, "embedding": embedding})
+    return {**response, "data": data}
+
+
+def stream_chunks(response: Dict[str, Any], include_usage: bool = False,
+                  chunk_chars: int = 16) -> List[Dict[str, Any]]:
+    """Split a chat.completion into chat.completion.chunk objects."""
+    choice = response["choices"][0]
+    message = choice["message"]
+    base = {"id": response["id"], "object": "chat.completion.chunk",
+            "created": response["created"], "model": response["model"],
+            "system_fingerprint": response.get("system_fingerprint")}
+
+    def chunk(delta, finish_reason=None):
+        return {**base, "choices": [{"index": 0, "delta": delta,
+                                     "finish_reason": finish_reason,
+                                     "logprobs": None}]}
+
+    chunks = [chunk({"role": "assistant", "content": ""})]
+    content = message.get("content") or ""
+    for start in range(0, len(content), chunk_chars):
+        chunks.append(chunk({"content": content[start:start + chunk_chars]}))
+    for index, tool_call in enumerate(message.get("tool_calls") or []):
+        chunks.append(chunk({"tool_calls": [{
+            "index": index, "id": tool_call["id"], "type": "function",
+            "function": {"name": tool_call["function"]["name"],
+                         "arguments": ""}}]}))
+        arguments = tool_call["function"]["arguments"]
+        for start in range(0, len(arguments), chunk_chars):
+            chunks.append(chunk({"tool_calls": [{
+                "index": index,
+                "function": {"arguments":
+                             arguments[start:start + chunk_chars]}}]}))
+    chunks.append(chunk({}, choice.get("finish_reason") or "stop"))
+    if include_usage:
+        chunks.append({**base, "choices": [], "usage": response.get("usage")})
+    return chunks
+
+
+def create_app(state: MockLLMState) -> FastAPI:
+    """Create the mock OpenAI-compatible application."""
+    app = FastAPI()
+
+    async def forward(endpoint: str, body: Dict[str, Any],
+                      request: Request) -> Dict[str, Any]:
+        import httpx
+        upstream_body = {key: value for key, value in body.items()
+                         if key not in ("stream", "stream_options")}
+        if endpoint == "embeddings":
+            # Record floats so replay can serve either encoding
+            upstream_body["encoding_format"] = "float"
+        headers = {"Authorization": request.headers.get("authorization", "")}
+        async with httpx.AsyncClient(timeout=120) as client:
+            response = await client.post(f"{state.upstream}/{endpoint}",
+                                         json=upstream_body, headers=headers)
+        if response.status_code >= 400:
+            raise HTTPException(response.status_code, response.text)
+        return response.json()
+
+    async def respond(endpoint: str, body: Dict[str, Any], request: Request,
+                      canned) -> Dict[str, Any]:
+        if state.mode == "canned":
+            await asyncio.sleep(state.delay())
+            return canned(body)
+
+        key = fixture_key(endpoint, body)
+        recorded = state.fixtures.get(key)
+        if recorded is not None:
+            state.counters["fixture_hits"] += 1
+            await asyncio.sleep(state.delay())
+            return recorded
+        state.counters["fixture_misses"] += 1
+
+        if state.mode == "record":
+            response = await forward(endpoint, body, request)
+            state.fixtures.record(key, endpoint, body, response)
+            state.counters["recorded"] += 1
+            return response
+        if state.strict:
+            raise HTTPException(404, f"No fixture recorded for request {key}")
+        await asyncio.sleep(state.delay())
+        return canned(body)
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [
+            {"id": "gpt-4o", "object": "model", "owned_by": "mock"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        response = await respond("chat/completions", body, request,
+                                 canned_chat_response)
+        state.counters["chat_completions"] += 1
+        message = response["choices"][0]["message"]
+        state.counters["tool_calls"] += len(message.get("tool_calls") or [])
+
+        if not body.get("stream"):
+            return response
+
+        state.counters["streamed_completions"] += 1
+        include_usage = bool((body.get("stream_options") or {}).get(
+            "include_usage"))
+
+        async def events() -> AsyncIterator[str]:
+            for chunk in stream_chunks(response, include_usage):
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        response = await respond("embeddings", body, request,
+                                 canned_embeddings)
+        state.counters["embeddings"] += 1
+        return encode_embeddings(response, body.get("encoding_format"))
+
+    @app.get("/mock/stats")
+    async def stats():
+        return {"mode": state.mode, "fixtures": len(state.fixtures),
+                "latency": {"distribution": state.latency.distribution,
+                            "latency": state.latency.latency,
+                            "jitter": state.latency.jitter},
+                "counters": state.counters}
+
+    return app
+
+
+class MockLLMServer:
+    """Runs the mock server on a background thread."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765,
+                 latency: float = 0.0, jitter: float = 0.0, seed: int = 0,
+                 **state_kwargs):
+        self.host = host
+        self.port = port
+        self.state = MockLLMState(latency=latency, jitter=jitter, seed=seed,
+                                  **state_kwargs)
+        config = uvicorn.Config(create_app(self.state), host=host, port=port,
+                                log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mode", choices=("canned", "replay", "record"),
+                        default="canned")
+    parser.add_argument("--fixtures", default=None,
+                        help="JSONL fixture file for replay/record modes")
+    parser.add_argument("--upstream", default="https://api.openai.com/v1",
+                        help="real API base URL used in record mode")
+    parser.add_argument("--strict", action="store_true",
+                        help="fail replay requests that have no fixture")
+    parser.add_argument("--latency-distribution", default=None,
+                        choices=LATENCY_DISTRIBUTIONS)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="mean response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="spread of the latency distribution")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    state = MockLLMState(latency=args.latency, jitter=args.jitter,
+                         seed=args.seed,
+                         distribution=args.latency_distribution,
+                         mode=args.mode, fixtures=args.fixtures,
+                         upstream=args.upstream, strict=args.strict)
+    print(f"Mock OpenAI server on http://{args.host}:{args.port}/v1 "
+          f"({args.mode} mode)")
+    uvicorn.run(create_app(state), host=args.host, port=args.port,
+                log_level="warning")
@@ -0,0 +1,133 @@
+"""
+Import-time profile of the backend entry path.
+
+Imports a module in a fresh interpreter with ``python -X importtime`` and
+reports the wall time, the slowest modules by self time and the time spent
+per top-level package, so that a heavy dependency creeping back into the
+import of ``main`` shows up before it slows every cold start and worker
+respawn. Each run is repeated and the fastest kept, as the first one also
+pays for reading cold files and compiling bytecode.
+
+Example:
+    python tests/profile_imports.py                  # import main
+    python tests/profile_imports.py --module services.counselor_session
+    python tests/profile_imports.py --top 30 --json import_profile.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+# This assumes profile_imports.py is in backend/tests/
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+modified_packages_dir = os.path.join(backend_dir, "modified_packages")
+
+
+def profile(module):
+    """Import the module in a child interpreter and parse its import times.
+
+    Returns:
+        (wall seconds, list of (module, self us, cumulative us, depth)).
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [modified_packages_dir, backend_dir]
+        + [path for path in env.get("PYTHONPATH", "").split(os.pathsep)
+           if path])
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        sys.exit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return wall, rows
+
+
+def summarize(wall, rows, top):
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+    total_us = sum(self_us for _, self_us, _, _ in rows)
+    return {
+        "wall_seconds": round(wall, 3),
+        "import_seconds": round(total_us / 1e6, 3),
+        "modules": len(rows),
+        "packages": [
+            {"package": package, "self_ms": round(us / 1000, 1)}
+            for package, us in sorted(by_package.items(),
+                                      key=lambda item: -item[1])[:top]],
+        "slowest_modules": [
+            {"module": name, "self_ms": round(self_us / 1000, 1),
+             "cumulative_ms": round(cumulative_us / 1000, 1)}
+            for name, self_us, cumulative_us, _ in sorted(
+                rows, key=lambda row: -row[1])[:top]],
+        "direct_imports": [
+            {"module": name, "cumulative_ms": round(cumulative_us / 1000, 1)}
+            for name, cumulative_us in direct_imports(rows)[:top]],
+    }
+
+
+def direct_imports(rows):
+    """Return what the profiled module imports itself, slowest first.
+
+    -X importtime prints a module after its imports, so these are the rows
+    one level deeper between the module's own row and the previous one at
+    its level.
+    """
+    found = []
+    for name, _, cumulative_us, depth in reversed(rows[:-1]):
+        if depth == 0:
+            break
+        if depth == 1:
+            found.append((name, cumulative_us))
+    return sorted(found, key=lambda row: -row[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--module", default="main",
+                        help="module to import (default: main)")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="imports to run; the fastest is reported")
+    parser.add_argument("--top", type=int, default=15,
+                        help="rows per table")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    wall, rows = min((profile(args.module) for _ in range(args.runs)),
+                     key=lambda run: run[0])
+    report = {"module": args.module, **summarize(wall, rows, args.top)}
+
+    print(f"import {args.module}: {report['wall_seconds']:.3f} s wall "
+          f"(interpreter included), {report['import_seconds']:.3f} s in "
+          f"{report['modules']} module imports")
+    print("\nDirect imports by cumulative time")
+    for row in report["direct_imports"]:
+        print(f"  {row['cumulative_ms']:9.1f} ms  {row['module']}")
+    print("\nTop-level packages by self time")
+    for row in report["packages"]:
+        print(f"  {row['self_ms']:9.1f} ms  {row['package']}")
+    print("\nSlowest modules by self time")
+    for row in report["slowest_modules"]:
+        print(f"  {row['self_ms']:9.1f} ms  {row['module']} "
+              f"({row['cumulative_ms']:.1f} ms cumulative)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Batched evaluation of finished chats.
+
+Transcripts for a whole batch of chats are loaded with a single paged query,
+scored concurrently by ``HIVCounselingEvaluation`` under a bounded semaphore
+and written back with one bulk insert. Each batch is a checkpoint: its
+evaluations are stored and its chats marked before the next batch starts, and
+chats that already have an evaluation row are marked without re-scoring, so a
+crash loses at most the batch in flight.
+
+Pending chats are taken oldest first. Chats without messages are not fetched
+until they have some, and a chat whose scoring keeps failing leaves the queue
+after ``EVALUATION_MAX_ATTEMPTS`` attempts, so neither can crowd out new
+chats.
+"""
+import asyncio
+import json
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import requests
+from dotenv import load_dotenv
+from config import settings, get_supabase_client
+
+load_dotenv("../.env")
+
+# Supabase caps rows per response, so bulk reads are paged
+PAGE_SIZE = 1000
+
+
+class ChatEvaluationPipeline:
+    """Scores unevaluated chats in checkpointed, concurrent batches."""
+
+    def __init__(self, evaluator=None, client=None,
+                 max_chats: int = 50,
+                 batch_size: int = None,
+                 concurrency: int = None,
+                 max_attempts: int = None,
+                 context_url: str = None):
+        """Initialize the pipeline.
+
+        Args:
+            evaluator: Object with an async ``aevaluate(context, transcript)``
+                method. Defaults to ``HIVCounselingEvaluation``.
+            client: Supabase client override, defaults to the module client.
+            max_chats: Maximum chats evaluated per run.
+            batch_size: Chats per checkpoint.
+            concurrency: Maximum evaluator calls in flight.
+            max_attempts: Failed scoring attempts before a chat is given up.
+            context_url: Reference knowledge the responses are graded against.
+        """
+        self._evaluator = evaluator
+        self.client = client or get_supabase_client()
+        self.max_chats = max_chats
+        self.batch_size = batch_size or settings.evaluation_batch_size
+        self.concurrency = concurrency or settings.evaluation_concurrency
+        self.max_attempts = max_attempts or settings.evaluation_max_attempts
+        self.context_url = context_url
+        self._context_string = None
+
+    @property
+    def evaluator(self):
+        """The evaluator, created on first use as it pulls in langchain."""
+        self._load_evaluator()
+        return self._evaluator
+
+    def _load_evaluator(self) -> None:
+        if self._evaluator is None:
+            from tests.accuracy_evaluation import HIVCounselingEvaluation
+            self._evaluator = HIVCounselingEvaluation()
+
+    def _load_context(self) -> str:
+        if self._context_string is None:
+            context_url = self.context_url
+            if context_url is None:
+                from tests.accuracy_evaluation import CONTEXT_URL
+                context_url = CONTEXT_URL
+            response = requests.get(context_url, timeout=30)
+            self._context_string = json.dumps(response.json(), indent=2)
+        return self._context_string
+
+    def _fetch_pending_chats(self) -> Dict[str, int]:
+        """Oldest unevaluated chats that have messages, with their attempts."""
+        # The inner join leaves out chats without messages; one message id
+        # per chat is enough to tell
+        response = self.client.table("chats")\
+            .select("id, evaluation_attempts, messages!inner(id)")\
+            .is_("chat_evaluation_sent", False)\
+            .lt("evaluation_attempts", self.max_attempts)\
+            .order("created_at", desc=False)\
+            .limit(1, foreign_table="messages")\
+            .limit(self.max_chats)\
+            .execute()
+        return {chat["id"]: chat["evaluation_attempts"] or 0
+                for chat in response.data or []}
+
+    def _fetch_evaluated_chat_ids(self, chat_ids: List[str]) -> set:
+        """Chats with a stored evaluation whose flag was never set."""
+        response = self.client.table("evaluations")\
+            .select("chat_id")\
+            .in_("chat_id", chat_ids)\
+            .execute()
+        return {row["chat_id"] for row in response.data or []}
+
+    def _fetch_transcripts(self, chat_ids: List[str]) -> Dict[str, str]:
+        """Load the messages of all chats in one paged query."""
+        lines = defaultdict(list)
+        offset = 0
+        while True:
+            response = self.client.table("messages")\
+                .select("chat_id, role, content")\
+                .in_("chat_id", chat_ids)\
+                .order("chat_id", desc=False)\
+                .order("created_at", desc=False)\
+                .range(offset, offset + PAGE_SIZE - 1)\
+                .execute()
+            rows = response.data or []
+            for msg in rows:
+                lines[msg["chat_id"]].append(
+                    msg["role"] + ": " + msg["content"])
+            if len(rows) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+        return {chat_id: "\n".join(chat_lines)
+                for chat_id, chat_lines in lines.items()}
+
+    def _store_results(self, results: Dict[str, tuple]) -> None:
+        current_time = datetime.now(timezone.utc).isoformat()
+        rows = [{
+            "chat_id": chat_id,
+            "chat_response": transcript,
+            "evaluation_result": result,
+            "created_at": current_time,
+        } for chat_id, (transcript, result) in results.items()]
+        self.client.table("evaluations").insert(rows).execute()
+
+    def _mark_evaluated(self, chat_ids: List[str]) -> None:
+        self.client.table("chats")\
+            .update({"chat_evaluation_sent": True})\
+            .in_("id", chat_ids)\
+            .execute()
+
+    def _record_failures(self, attempts: Dict[str, int]) -> None:
+        """Count a failed attempt for each chat, given its previous count."""
+        by_count = defaultdict(list)
+        for chat_id, count in attempts.items():
+            by_count[count + 1].append(chat_id)
+        for count, chat_ids in by_count.items():
+            self.client.table("chats")\
+                .update({"evaluation_attempts": count})\
+                .in_("id", chat_ids)\
+                .execute()
+
+    async def _score(self, chat_id: str, transcript: str, context: str,
+                     semaphore: asyncio.Semaphore) -> Optional[dict]:
+        async with semaphore:
+            try:
+                return await self.evaluator.aevaluate(context, transcript)
+            except Exception as e:
+                print(f"Error evaluating chat {chat_id}: {e}")
+                return None
+
+    async def _run_batch(self, attempts: Dict[str, int], context: str,
+                         semaphore: asyncio.Semaphore) -> List[str]:
+        chat_ids = list(attempts)
+        already_evaluated = await asyncio.to_thread(
+            self._fetch_evaluated_chat_ids, chat_ids)
+        to_score = [chat_id for chat_id in chat_ids
+                    if chat_id not in already_evaluated]
+
+        transcripts = {}
+        if to_score:
+            transcripts = await asyncio.to_thread(
+                self._fetch_transcripts, to_score)
+        # Fetched with messages, so a missing transcript is a deleted one
+        empty = [chat_id for chat_id in to_score
+                 if chat_id not in transcripts]
+
+        scored = await asyncio.gather(*(
+            self._score(chat_id, transcript, context, semaphore)
+            for chat_id, transcript in transcripts.items()))
+        results = {
+            chat_id: (transcript, result)
+            for (chat_id, transcript), result in zip(transcripts.items(),
+                                                     scored)
+            if result is not None
+        }
+
+        if results:
+            await asyncio.to_thread(self._store_results, results)
+        completed = list(already_evaluated) + list(results)
+        if completed:
+            await asyncio.to_thread(self._mark_evaluated, completed)
+
+        failed = [chat_id for chat_id in to_score if chat_id not in results]
+        if failed:
+            await asyncio.to_thread(self._record_failures, {
+                chat_id: attempts[chat_id] for chat_id in failed})
+        print(f"Evaluated {len(results)} chats, already evaluated "
+              f"{len(already_evaluated)}, empty {len(empty)}, "
+              f"failed {len(failed) - len(empty)}")
+        return list(results)
+
+    async def run(self) -> List[str]:
+        """Evaluate pending chats.
+
+        Returns:
+            Ids of the chats scored in this run.
+        """
+        pending = await asyncio.to_thread(self._fetch_pending_chats)
+        if not pending:
+            print("No non-evaluated chats found.")
+            return []
+
+        context = await asyncio.to_thread(self._load_context)
+        # The import is slow, so it is kept off the event loop
+        await asyncio.to_thread(self._load_evaluator)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        chat_ids = list(pending)
+        evaluated = []
+        for start in range(0, len(chat_ids), self.batch_size):
+            batch = {chat_id: pending[chat_id]
+                     for chat_id in chat_ids[start:start + self.batch_size]}
+            evaluated.extend(await self._run_batch(batch, context, semaphore))
+        return evaluated
@@ -1,19 +1,13 @@
 """
 HIV risk assessment and TTM stage assessment tools.
 """
-from openai import OpenAI
 from dotenv import load_dotenv
-import os
-import json
 from datetime import datetime
-from .utils import classify_response, translate_question
+from .utils import (a_classify_response, a_create_completion,
+                    a_translate_question)
 
 load_dotenv("../.env")
 
-# Initialize OpenAI API
-OpenAI.api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI()
-
 # List of HIV risk assessment questions
 QUESTIONS = [
     ("I'll help assess your HIV risk factors. This will involve a few questions "
@@ -32,7 +26,7 @@ QUESTIONS = [
 async def handle_clarification(patient_agent, question, user_response, language):
     """Recursive function to handle clarification requests."""
     # Generate clarification response
-    clarification_response = client.chat.completions.create(
+    clarification_response = await a_create_completion(
         model="gpt-4o-mini",
         messages=[{"role": "system", "content": "You are here to clarify the question "
                                                 "asked by the user. Please provide a "
@@ -42,13 +36,14 @@ async def handle_clarification(patient_agent, question, user_response, language)
                                               f"{user_response}\n\nPlease provide a "
                                               f"clear answer of the information is "
                                               f"being asked for. Also, re-ask the "
-                                              f"question initially asked at the end."}]
+                                              f"question initially asked at the end."}],
+        priority="high"
     )
     
     # Send the clarification response via patient agent
     clarification_text = clarification_response.choices[0].message.content
     new_response = await patient_agent.get_human_input(clarification_text)
-    classification = classify_response(new_response, language)
+    classification = await a_classify_response(new_response, language)
     
     # If the user is still asking for clarification, recursively handle it
     if classification == "clarification":
@@ -70,11 +65,11 @@ async def assess_hiv_risk(patient_agent, language_param):
         
         for question in QUESTIONS:
             if language != "English":
-                question = translate_question(question, language)
+                question = await a_translate_question(question, language)
 
             # Use patient agent's get_human_input instead of direct websocket
             user_response = await patient_agent.get_human_input(question)
-            classification = classify_response(user_response, language)
+            classification = await a_classify_response(user_response, language)
             
             # Log each Q&A
             assessment_log.append(f"Q: {question}\nA: {user_response}")
@@ -85,9 +80,9 @@ async def assess_hiv_risk(patient_agent, language_param):
             elif classification == "affirmative":
                 affirmative_count += 1
             elif classification == "stop":
-                return translate_question("I understand you want to stop this assessment. "
-                                          "Please let me know if you have any other questions.",
-                                          language)
+                return await a_translate_question("I understand you want to stop this assessment. "
+                                                  "Please let me know if you have any other questions.",
+                                                  language)
             elif classification == "clarification":
                 # Use the recursive function to handle clarification
                 classification, user_response = await handle_clarification(
@@ -127,7 +122,7 @@ async def assess_hiv_risk(patient_agent, language_param):
             )
 
         # Store complete assessment in teachability
-        return translate_question(recommendation, language)
+        return await a_translate_question(recommendation, language)
 
     except Exception as e:
         error_msg = f"Error in assess_hiv_risk: {e}"
@@ -157,18 +152,12 @@ async def assess_ttm_stage_single_question(patient_agent, language: str) -> str:
     5. Yes, I have been for more than 6 months."""
 
     # Use patient agent's get_human_input instead of direct websocket
-    response = await patient_agent.get_human_input(translate_question(question, language))
+    response = await patient_agent.get_human_input(await a_translate_question(question, language))
     
     try:
         print(f"Received response: {response}")
         
-        # Parse JSON response
-        try:
-            response_json = json.loads(response)
-            # Extract content from JSON
-            response_number = response_json.get("content", "")
-        except json.JSONDecodeError:
-            response_number = response
+        response_number = response.strip()
 
         # Map response to stage
         stage_map = {
@@ -182,17 +171,17 @@ async def assess_ttm_stage_single_question(patient_agent, language: str) -> str:
         stage = stage_map.get(response_number, "Unclassified")
         
         if stage != "Unclassified":
-            return translate_question(f"Based on your response, you are in the "
-                                      f"'{stage}' stage of change regarding PrEP "
-                                      f"uptake. Let me explain what this means and "
-                                      f"discuss possible next steps.", language)
+            return await a_translate_question(f"Based on your response, you are in the "
+                                              f"'{stage}' stage of change regarding PrEP "
+                                              f"uptake. Let me explain what this means and "
+                                              f"discuss possible next steps.", language)
         else:
-            return translate_question("I didn't catch your response. Please respond "
-                                      "with a number from 1 to 5 corresponding to "
-                                      "your situation.", language)
+            return await a_translate_question("I didn't catch your response. Please respond "
+                                              "with a number from 1 to 5 corresponding to "
+                                              "your situation.", language)
             
     except Exception as e:
         print(f"Error processing response: {e}")
-        return translate_question("I'm having trouble processing your response. "
-                                  "Please try again with a number from 1 to 5.",
-                                  language)
+        return await a_translate_question("I'm having trouble processing your response. "
+                                          "Please try again with a number from 1 to 5.",
+                                          language)
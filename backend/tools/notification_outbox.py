@@ -0,0 +1,274 @@
+"""
+Durable outbox for research assistant notifications.
+
+Notifications are written to the ``notification_outbox`` table and delivered
+by a background worker, so sending email never blocks the maintenance loop
+and failed deliveries are retried with exponential backoff. Rows that keep
+failing are moved to the ``dead`` state for manual follow-up.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from config import settings, get_supabase_client
+
+load_dotenv("../.env")
+
+OUTBOX_TABLE = "notification_outbox"
+
+STATUS_PENDING = "pending"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"
+
+
+@dataclass
+class OutboxMetrics:
+    """Delivery counters for the notification outbox."""
+
+    enqueued: int = 0
+    claimed: int = 0
+    claim_conflicts: int = 0
+    sent: int = 0
+    retried: int = 0
+    dead_lettered: int = 0
+    delivery_seconds_total: float = 0.0
+    last_drain_seconds: float = 0.0
+
+    @property
+    def average_delivery_seconds(self) -> float:
+        """Average time spent in a single successful delivery."""
+        if not self.sent:
+            return 0.0
+        return self.delivery_seconds_total / self.sent
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return the current counters as a plain dictionary."""
+        data = asdict(self)
+        data["average_delivery_seconds"] = self.average_delivery_seconds
+        return data
+
+
+# Process-wide metrics shared by enqueue_notification and the worker
+outbox_metrics = OutboxMetrics()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue_notification(payload: dict, kind: str = "research_assistant",
+                         support_request_id: str = None,
+                         client=None) -> Optional[dict]:
+    """
+    Queue a notification for background delivery.
+
+    Args:
+        payload: JSON-serializable delivery arguments.
+        kind: Notification type, used to route rows to a delivery function.
+        support_request_id: Optional originating support request. A
+            request is queued at most once, so retrying after a failure to
+            mark it notified does not send the email twice.
+        client: Supabase client override, defaults to the module client.
+
+    Returns:
+        The inserted outbox row, or None if nothing was inserted.
+    """
+    client = client or get_supabase_client()
+    now = _now().isoformat()
+    record = {
+        "kind": kind,
+        "payload": payload,
+        "status": STATUS_PENDING,
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+        "support_request_id": support_request_id,
+    }
+    table = client.table(OUTBOX_TABLE)
+    if support_request_id is None:
+        response = table.insert(record).execute()
+    else:
+        response = table.upsert(record, on_conflict="support_request_id",
+                                ignore_duplicates=True).execute()
+    if not response.data:
+        return None
+    outbox_metrics.enqueued += 1
+    return response.data[0]
+
+
+class NotificationOutbox:
+    """Drains the notification outbox with bounded concurrency."""
+
+    def __init__(self, deliver: Callable[[dict], None],
+                 client=None,
+                 kind: str = "research_assistant",
+                 concurrency: int = None,
+                 batch_size: int = None,
+                 max_attempts: int = None,
+                 backoff_base: float = None,
+                 backoff_max: float = None,
+                 lease_seconds: float = 300.0,
+                 metrics: OutboxMetrics = None):
+        """Initialize the outbox worker.
+
+        Args:
+            deliver: Blocking callable that sends one payload and raises on
+                failure. It runs in a worker thread.
+            client: Supabase client override, defaults to the module client.
+            kind: Notification type handled by this worker.
+            concurrency: Maximum deliveries in flight at once.
+            batch_size: Maximum rows claimed per drain.
+            max_attempts: Attempts before a row is dead-lettered.
+            backoff_base: Delay in seconds after the first failure.
+            backoff_max: Upper bound for the retry delay.
+            lease_seconds: How long a claimed row stays hidden from other
+                workers. Rows claimed by a crashed worker become due again
+                once the lease expires.
+            metrics: Counters to update, defaults to ``outbox_metrics``.
+        """
+        self.deliver = deliver
+        self.client = client or get_supabase_client()
+        self.kind = kind
+        self.concurrency = concurrency or settings.outbox_concurrency
+        self.batch_size = batch_size or settings.outbox_batch_size
+        self.max_attempts = max_attempts or settings.outbox_max_attempts
+        self.backoff_base = backoff_base or settings.outbox_backoff_base
+        self.backoff_max = backoff_max or settings.outbox_backoff_max
+        self.lease_seconds = lease_seconds
+        self.metrics = metrics or outbox_metrics
+
+    def backoff_delay(self, attempts: int) -> float:
+        """Return the retry delay after the given number of attempts."""
+        delay = self.backoff_base * (2 ** max(attempts - 1, 0))
+        return min(delay, self.backoff_max)
+
+    def _fetch_due(self) -> List[dict]:
+        response = self.client.table(OUTBOX_TABLE)\
+            .select("*")\
+            .eq("kind", self.kind)\
+            .eq("status", STATUS_PENDING)\
+            .lte("next_attempt_at", _now().isoformat())\
+            .order("next_attempt_at", desc=False)\
+            .limit(self.batch_size)\
+            .execute()
+        return response.data or []
+
+    def _claim(self, row: dict) -> bool:
+        """Lease a row by bumping its attempt counter (compare-and-set)."""
+        lease_until = _now() + timedelta(seconds=self.lease_seconds)
+        response = self.client.table(OUTBOX_TABLE)\
+            .update({
+                "attempts": row["attempts"] + 1,
+                "next_attempt_at": lease_until.isoformat(),
+                "updated_at": _now().isoformat(),
+            })\
+            .eq("id", row["id"])\
+            .eq("status", STATUS_PENDING)\
+            .eq("attempts", row["attempts"])\
+            .execute()
+        return bool(response.data)
+
+    def _mark_sent(self, row: dict) -> None:
+        now = _now().isoformat()
+        self.client.table(OUTBOX_TABLE)\
+            .update({"status": STATUS_SENT, "sent_at": now,
+                     "updated_at": now, "last_error": None})\
+            .eq("id", row["id"])\
+            .execute()
+
+    def _mark_failed(self, row: dict, attempts: int, error: str) -> None:
+        now = _now()
+        update = {"last_error": error[:1000], "updated_at": now.isoformat()}
+        if attempts >= self.max_attempts:
+            update["status"] = STATUS_DEAD
+        else:
+            retry_at = now + timedelta(seconds=self.backoff_delay(attempts))
+            update["next_attempt_at"] = retry_at.isoformat()
+        self.client.table(OUTBOX_TABLE)\
+            .update(update)\
+            .eq("id", row["id"])\
+            .execute()
+
+    async def _process(self, row: dict, semaphore: asyncio.Semaphore) -> bool:
+        async with semaphore:
+            try:
+                claimed = await asyncio.to_thread(self._claim, row)
+            except Exception as e:
+                print(f"Error claiming notification {row['id']}: {e}")
+                return False
+            if not claimed:
+                # Another worker took the row first
+                self.metrics.claim_conflicts += 1
+                return False
+            self.metrics.claimed += 1
+            attempts = row["attempts"] + 1
+
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self.deliver, row["payload"])
+            except Exception as e:
+                print(f"Notification {row['id']} attempt {attempts} "
+                      f"failed: {e}")
+                try:
+                    await asyncio.to_thread(
+                        self._mark_failed, row, attempts, str(e))
+                except Exception as update_error:
+                    # The lease expires on its own, so the row is retried
+                    print(f"Error recording failure for notification "
+                          f"{row['id']}: {update_error}")
+                if attempts >= self.max_attempts:
+                    self.metrics.dead_lettered += 1
+                else:
+                    self.metrics.retried += 1
+                return False
+
+            self.metrics.sent += 1
+            self.metrics.delivery_seconds_total += (
+                time.perf_counter() - started)
+            try:
+                await asyncio.to_thread(self._mark_sent, row)
+            except Exception as e:
+                print(f"Error marking notification {row['id']} as sent: {e}")
+            return True
+
+    async def drain(self) -> int:
+        """Deliver all due notifications once.
+
+        Returns:
+            Number of notifications delivered in this pass.
+        """
+        started = time.perf_counter()
+        rows = await asyncio.to_thread(self._fetch_due)
+        if not rows:
+            self.metrics.last_drain_seconds = time.perf_counter() - started
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(
+            *(self._process(row, semaphore) for row in rows))
+        self.metrics.last_drain_seconds = time.perf_counter() - started
+        delivered = sum(1 for result in results if result)
+        print(f"Notification outbox delivered {delivered}/{len(rows)}")
+        return delivered
+
+    def dead_letters(self, limit: int = 100) -> List[dict]:
+        """Return notifications that exhausted their delivery attempts."""
+        response = self.client.table(OUTBOX_TABLE)\
+            .select("*")\
+            .eq("kind", self.kind)\
+            .eq("status", STATUS_DEAD)\
+            .order("updated_at", desc=True)\
+            .limit(limit)\
+            .execute()
+        return response.data or []
+
+    def requeue(self, notification_id: str) -> None:
+        """Move a dead-lettered notification back to the pending state."""
+        now = _now().isoformat()
+        self.client.table(OUTBOX_TABLE)\
+            .update({"status": STATUS_PENDING, "attempts": 0,
+                     "next_attempt_at": now, "updated_at": now})\
+            .eq("id", notification_id)\
+            .execute()
@@ -1,13 +1,7 @@
 """
 Provider search functionality for finding PrEP providers.
 """
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-import pandas as pd
 import time
-from bs4 import BeautifulSoup
 from typing import Dict
 from .utils import translate_question
 
@@ -16,6 +10,15 @@ def search_provider(zip_code: str, language: str) -> Dict:
     """
     Searches for PrEP providers within 30 miles of the given ZIP code.
     """
+    # Imported here rather than with the tools, as only this search needs
+    # them and they are slow to import
+    import pandas as pd
+    from bs4 import BeautifulSoup
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
     driver = None
     try:
         print("Initializing Chrome options...")
@@ -1,52 +1,31 @@
 """
 Support system tools for handling support requests and notifications.
 """
+import asyncio
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-import json
-from supabase import create_client
 from datetime import datetime, timezone
 from dotenv import load_dotenv
-import os
-from .utils import translate_question
+from config import settings, get_supabase_client
+from .utils import a_translate_question
+from .notification_outbox import enqueue_notification
 
 load_dotenv("../.env")
 
-# Initialize Supabase client
-supabase = create_client(
-    os.getenv("NEXT_PUBLIC_SUPABASE_URL"),
-    os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-)
 
-
-def notify_research_assistant(support_type, assistant_email, client_id,
-                              smtp_server: str = "smtp.gmail.com",
-                              smtp_port: int = 465,
-                              user_contact_info: str = None):
-    """
-    Function to notify research assistant when a client needs personal support.
-    
-    Parameters:
-    client_name (str): Name of the client
-    client_id (str): ID of the client
-    support_type (str): Type of support needed (e.g., emotional, financial, etc.)
-    assistant_email (str): Email address of the research assistant
-    """
-    print(f"Notifying research assistant {assistant_email} for client "
-          f"(ID: {client_id}) with support type {support_type}.")
-    
-    # Set up email details
-    sender_email = "t28184003@gmail.com"
-    sender_password = "vnqs wulc clye ncjx"
+def build_notification_message(support_type, assistant_email, client_id,
+                               user_contact_info: str = None,
+                               sender_email: str = None) -> MIMEMultipart:
+    """Build the email asking a research assistant to contact a client."""
+    sender_email = sender_email or settings.smtp_sender_email
     subject = f"Client (ID: {client_id}) Needs Personal Support"
-    
+
     # Create the email content
     message = MIMEMultipart()
     message["From"] = sender_email
     message["To"] = assistant_email
     message["Subject"] = subject
-    
 
     body = f"""
     Hello,
@@ -60,36 +39,90 @@ def notify_research_assistant(support_type, assistant_email, client_id,
     Thank you,
     Support Team
     """
-    
+
     message.attach(MIMEText(body, "plain"))
-    
+    return message
+
+
+def send_notification_email(message: MIMEMultipart,
+                            smtp_server: str = None,
+                            smtp_port: int = None,
+                            use_ssl: bool = None,
+                            timeout: float = None) -> None:
+    """
+    Deliver a prepared notification email over SMTP.
+
+    Raises on any connection, authentication or delivery failure so callers
+    can decide whether to retry, and with ValueError if no sender is set.
+    """
+    if not message["From"]:
+        raise ValueError("SMTP_SENDER_EMAIL is not set")
+    smtp_server = smtp_server or settings.smtp_server
+    smtp_port = smtp_port or settings.smtp_port
+    use_ssl = settings.smtp_use_ssl if use_ssl is None else use_ssl
+    timeout = timeout or settings.smtp_timeout
+    sender_password = settings.smtp_sender_password
+
+    smtp_class = smtplib.SMTP_SSL if use_ssl else smtplib.SMTP
+    with smtp_class(smtp_server, smtp_port, timeout=timeout) as server:
+        if sender_password:
+            server.login(message["From"], sender_password)
+        server.sendmail(message["From"], message["To"], message.as_string())
+
+
+def notify_research_assistant(support_type, assistant_email, client_id,
+                              smtp_server: str = None,
+                              smtp_port: int = None,
+                              user_contact_info: str = None):
+    """
+    Function to notify research assistant when a client needs personal support.
+
+    This sends the email synchronously. Background jobs should use
+    ``tools.notification_outbox.enqueue_notification`` instead so that
+    delivery is retried and does not block the caller.
+
+    Parameters:
+    client_id (str): ID of the client
+    support_type (str): Type of support needed (e.g., emotional, financial, etc.)
+    assistant_email (str): Email address of the research assistant
+    """
+    print(f"Notifying research assistant {assistant_email} for client "
+          f"(ID: {client_id}) with support type {support_type}.")
+
+    message = build_notification_message(support_type, assistant_email,
+                                         client_id, user_contact_info)
+
     # Send the email
     try:
-        # Establish a secure connection with the email server
-        server = smtplib.SMTP_SSL(smtp_server, smtp_port)
-        server.login(sender_email, sender_password)
-        
-    
-        server.sendmail(sender_email, assistant_email, message.as_string())
-        # Close the connection
-        server.quit()
+        send_notification_email(message, smtp_server, smtp_port)
         print(f"Notification sent to {assistant_email} regarding client {client_id}.")
-        
+
         return (f"A research assistant has been notified and will reach out to "
                 f"provide {support_type} support.")
-    
+
     except Exception as e:
         print(f"Failed to send notification. Error: {e}")
         return (f"Failed to send notification. Error: {e}")
 
 
+def deliver_support_notification(payload: dict) -> None:
+    """Deliver a queued research assistant notification from the outbox."""
+    message = build_notification_message(
+        payload["support_type"],
+        payload["assistant_email"],
+        payload["client_id"],
+        payload.get("user_contact_info"),
+    )
+    send_notification_email(message)
+
+
 async def record_support_request(patient_agent, chat_id: str, language: str) -> str:
     """
     Record in Supabase when a user requests support.
     """
     try:
         # Step 1: Ask for support type
-        response = await patient_agent.get_human_input(translate_question(
+        response = await patient_agent.get_human_input(await a_translate_question(
             "To help connect you with the right support:\n"
             "What type of support would be most helpful? "
             "(emotional, financial, medical support, etc.)",
@@ -97,12 +130,10 @@ async def record_support_request(patient_agent, chat_id: str, language: str) ->
         ))
         print("Sent support type question.")
 
-        try:
-            print("Support type response:", response)
-            response_json = json.loads(response)
-            support_type = response_json.get("content", "")
-        except json.JSONDecodeError:
-            return translate_question(
+        print("Support type response:", response)
+        support_type = response.strip()
+        if not support_type:
+            return await a_translate_question(
                 "I didn't understand that. Could you please rephrase your response?", 
                 language)
 
@@ -115,25 +146,17 @@ async def record_support_request(patient_agent, chat_id: str, language: str) ->
                 formatted_contact_preference += "2: By email. \n\n"
                 formatted_contact_preference += "0: I do not want to be contacted.\n\n"
                 formatted_contact_preference += "Please reply with 0, 1, or 2."
-                response = await patient_agent.get_human_input(translate_question(
+                response = await patient_agent.get_human_input(await a_translate_question(
                     formatted_contact_preference, language))
             else:
-                response = await patient_agent.get_human_input(translate_question(
+                response = await patient_agent.get_human_input(await a_translate_question(
                     "Please make sure to answer with 0, 1, or 2.", language))
 
-            try:
-                print("Contact preference response:", response)
-                response_json = json.loads(response)
-                contact_preference = response_json.get("content", "").strip()
-                
-                if contact_preference in ["0", "1", "2"]:
-                    break
-                else:
-                    # Continue loop to ask again
-                    pass
-            except json.JSONDecodeError:
-                # Continue loop to ask again
-                pass
+            print("Contact preference response:", response)
+            contact_preference = response.strip()
+            if contact_preference in ["0", "1", "2"]:
+                break
+            # Otherwise ask again
 
         # If they don't want contact
         if contact_preference == "0":
@@ -147,15 +170,13 @@ async def record_support_request(patient_agent, chat_id: str, language: str) ->
         else:  # contact_preference == "2"
             contact_info_prompt = ("Please provide your email address so that a "
                                   "research assistant can reach out to you.")
-        response = await patient_agent.get_human_input(translate_question(contact_info_prompt,
+        response = await patient_agent.get_human_input(await a_translate_question(contact_info_prompt,
                                                      language))
 
-        try:
-            print("Contact info response:", response)
-            response_json = json.loads(response)
-            contact_info = response_json.get("content", "").strip()
-        except json.JSONDecodeError:
-            return translate_question(
+        print("Contact info response:", response)
+        contact_info = response.strip()
+        if not contact_info:
+            return await a_translate_question(
                 "I didn't understand that. Could you please try again?", 
                 language)
 
@@ -170,7 +191,8 @@ async def record_support_request(patient_agent, chat_id: str, language: str) ->
             "phone": contact_info if contact_preference == "1" else None
         }
 
-        supabase.table("support_requests").insert(supabase_record).execute()
+        get_supabase_client().table("support_requests")\
+            .insert(supabase_record).execute()
 
         if contact_preference == "1":
             contact_method = "phone"
@@ -179,24 +201,24 @@ async def record_support_request(patient_agent, chat_id: str, language: str) ->
         else:
             contact_method = "Please answer with 0, 1, or 2."
 
-        return translate_question(f"Thank you for sharing that. When your chat session "
-                                  f"ends, a research assistant will reach out to provide "
-                                  f"{support_type} support via {contact_method}. What else "
-                                  f"can I help you with?", language)
+        return await a_translate_question(f"Thank you for sharing that. When your chat session "
+                                          f"ends, a research assistant will reach out to provide "
+                                          f"{support_type} support via {contact_method}. What else "
+                                          f"can I help you with?", language)
 
 
     except Exception as e:
         print(f"Error recording support request: {e}")
-        return translate_question("I'm having trouble recording your request. "
-                                  "Please let me know if you'd like to try again.",
-                                  language)
+        return await a_translate_question("I'm having trouble recording your request. "
+                                          "Please let me know if you'd like to try again.",
+                                          language)
 
 
 async def check_inactive_chats():
     """Check for inactive chats and notify research assistants."""
     try:
     
-        response = supabase.table("support_requests")\
+        response = get_supabase_client().table("support_requests")\
             .select("*, chats(updated_at)")\
             .eq("notified", False)\
             .execute()
@@ -226,7 +248,7 @@ async def check_inactive_chats():
                     #     .select("*")\
                     #     .eq("id", "e94b2f70-125d-4d6b-aa78-886c806dfa17")\
                     #     .execute()
-                    chat_response = supabase.table("chats")\
+                    chat_response = get_supabase_client().table("chats")\
                         .select("updated_at")\
                         .eq("id", request['chat_id'].strip())\
                         .execute()
@@ -240,8 +262,8 @@ async def check_inactive_chats():
                         
                     print("updated at", updated_at)
                     if (current_time - updated_at).total_seconds() > 300:
-                        updates.append(request["id"])
-                        print("updates", updates)
+                        updates.append(request)
+                        print("updates", [update["id"] for update in updates])
                         # send chat history evaluation to research assistant
                         
                         print(f"Adding request {request['id']} to updates - "
@@ -251,25 +273,75 @@ async def check_inactive_chats():
                 print(f"Error processing request {request['id']}: {e}")
                 continue
 
-        # Update the notified field for the filtered support requests
+        # Queue notifications and mark the support requests as handled. The
+        # outbox worker delivers the emails, so a slow mail server no longer
+        # holds up the maintenance pass.
         if updates:
-            for request_id in updates:
-                client_id = supabase.table("chats")\
-                    .select("user_id")\
-                    .eq("id", request['chat_id'])\
-                    .execute()
-                
-                user_contact_info = request['email'] if request['email'] else request['phone']
-                notify_research_assistant(request['support_type'], 
-                                         "jun_tao@brown.edu", client_id, 
-                                         user_contact_info=user_contact_info)
-                supabase.table("support_requests")\
-                    .update({"notified": True})\
-                    .eq("id", request_id)\
-                    .execute()
-                print(f"Support request {request_id} updated successfully.")
+            for request in updates:
+                try:
+                    _queue_support_notification(request)
+                except Exception as e:
+                    print(f"Error processing request {request['id']}: {e}")
         else:
             print("No support requests need updating.")
 
     except Exception as e:
         print(f"An error occurred: {e}")
+
+
+def _queue_support_notification(request: dict) -> None:
+    """Queue the research assistant email for a support request.
+
+    Raises ValueError while the sender or research assistant address is not
+    configured, leaving the request to be notified once they are.
+    """
+    if not settings.smtp_sender_email or not settings.research_assistant_email:
+        raise ValueError("SMTP_SENDER_EMAIL and RESEARCH_ASSISTANT_EMAIL "
+                         "must be set to notify research assistants")
+    chat_response = get_supabase_client().table("chats")\
+        .select("user_id")\
+        .eq("id", request['chat_id'].strip())\
+        .execute()
+    client_id = (chat_response.data[0]['user_id']
+                 if chat_response.data else request['chat_id'])
+
+    user_contact_info = request['email'] if request['email'] else request['phone']
+    enqueue_notification({
+        "support_type": request['support_type'],
+        "assistant_email": settings.research_assistant_email,
+        "client_id": client_id,
+        "user_contact_info": user_contact_info,
+    }, support_request_id=request['id'])
+    get_supabase_client().table("support_requests")\
+        .update({"notified": True})\
+        .eq("id", request['id'])\
+        .execute()
+    print(f"Support request {request['id']} queued for notification.")
+
+
+async def notify_chat_support_requests(chat_id: str) -> int:
+    """
+    Queue notifications for a chat's pending support requests.
+
+    Called by the activity tracker as soon as the chat goes idle, so the
+    updated_at check in check_inactive_chats is not needed here. The
+    Supabase calls block, so they run in a worker thread.
+    """
+    return await asyncio.to_thread(_queue_chat_support_requests, chat_id)
+
+
+def _queue_chat_support_requests(chat_id: str) -> int:
+    response = get_supabase_client().table("support_requests")\
+        .select("*")\
+        .eq("chat_id", chat_id)\
+        .eq("notified", False)\
+        .execute()
+
+    queued = 0
+    for request in response.data or []:
+        try:
+            _queue_support_notification(request)
+            queued += 1
+        except Exception as e:
+            print(f"Error processing request {request['id']}: {e}")
+    return queued
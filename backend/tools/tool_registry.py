@@ -2,7 +2,7 @@
 Function registry for agent tools and capabilities.
 """
 import autogen
-from config import client
+from config import settings
 from tools.utils import translate_question
 from tools.hiv_assessment import assess_hiv_risk, assess_ttm_stage_single_question
 from tools.provider_search import search_provider
@@ -148,7 +148,7 @@ class FunctionRegistry:
                 ]
                 
                 # Call OpenAI API
-                chat_completion = client.chat.completions.create(
+                chat_completion = settings.openai_client.chat.completions.create(
                     model="gpt-4-turbo",
                     messages=messages,
                     temperature=0.7,
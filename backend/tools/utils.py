@@ -1,38 +1,231 @@
 """
 Utility functions for the counseling chatbot tools.
 """
-from openai import OpenAI
 from dotenv import load_dotenv
-import os
+import asyncio
+import hashlib
+import threading
+
+from autogen import tracing
+from autogen.cache import Cache
+from autogen.oai.rate_limit import get_rate_limiter
+from config import settings
 
 load_dotenv("../.env")
 
-# Initialize OpenAI API
-OpenAI.api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI()
+# Translations of the fixed assessment questions repeat in every chat. They
+# are kept in memory and in a cache shared by all workers and hosts.
+TRANSLATION_CACHE_ITEMS = 1024
+_translation_cache = None
+_translation_cache_lock = threading.Lock()
 
 
-def classify_response(response, language):
-    """Classifies response as affirmative, negative, uncooperative, or unsure."""
+def get_translation_cache() -> Cache:
+    """Return the translation cache, opening it on first use.
+
+    Opened lazily so that each worker connects to the shared cache after it
+    has been forked.
+    """
+    global _translation_cache
+    with _translation_cache_lock:
+        if _translation_cache is None:
+            _translation_cache = Cache.tiered(
+                cache_seed="translations",
+                redis_url=settings.shared_cache_url,
+                cache_path_root=settings.shared_cache_path,
+                max_items=TRANSLATION_CACHE_ITEMS,
+            )
+        return _translation_cache
+
+
+def _rate_limiter(model):
+    """Return the model's shared rate limiter, or None if it has no limits."""
+    limits = settings.llm_rate_limits.get(model)
+    if not limits:
+        return None
+    return get_rate_limiter(model, limits.get("rpm"), limits.get("tpm"))
+
+
+def _estimate_tokens(model, messages):
+    """Tokens to reserve for a call: the prompt plus the longest reply."""
+    from autogen.oai.client import DEFAULT_MAX_TOKENS
+    from autogen.token_count_utils import count_token
+
+    return count_token(messages, model) + DEFAULT_MAX_TOKENS
+
+
+def _settle(limiter, estimated, completion=None, error=None):
+    """Correct a reservation to the actual usage, backing off on a 429."""
+    from autogen.oai.client import RATE_LIMIT_BACKOFF
+    from openai import RateLimitError
+
+    if completion is not None:
+        limiter.settle(estimated, completion.usage.total_tokens
+                       if completion.usage else None)
+        return
+    # A failed request uses no quota
+    limiter.settle(estimated, 0)
+    if isinstance(error, RateLimitError):
+        try:
+            retry_after = float(error.response.headers.get("retry-after"))
+        except (AttributeError, TypeError, ValueError):
+            retry_after = RATE_LIMIT_BACKOFF
+        limiter.backoff(retry_after)
+
+
+def _record_usage(span, completion):
+    from autogen.oai.client import OpenAIClient
+
+    if span.recording and completion.usage:
+        span.add("llm.prompt_tokens", completion.usage.prompt_tokens)
+        span.add("llm.completion_tokens", completion.usage.completion_tokens)
+        span.add("llm.cost", OpenAIClient.cost(completion))
+
+
+def create_completion(model, messages, priority="normal"):
+    """Creates a chat completion under the model's shared rate limit.
+
+    Waits in the same per-model queue as the agents' OpenAIWrapper calls
+    when LLM_RATE_LIMITS sets limits for the model. Blocks while waiting, so
+    coroutines use ``a_create_completion`` instead.
+    """
+    client = settings.openai_client
+    with tracing.span("llm.completion", **{"llm.model": model,
+                                           "llm.priority": priority}) as span:
+        limiter = _rate_limiter(model)
+        if limiter is None:
+            completion = client.chat.completions.create(model=model,
+                                                        messages=messages)
+        else:
+            estimated = _estimate_tokens(model, messages)
+            limiter.acquire(estimated, priority)
+            try:
+                completion = client.chat.completions.create(
+                    model=model, messages=messages)
+            except Exception as e:
+                _settle(limiter, estimated, error=e)
+                raise
+            _settle(limiter, estimated, completion)
+        _record_usage(span, completion)
+        return completion
+
+
+async def a_create_completion(model, messages, priority="normal"):
+    """Creates a chat completion without blocking the event loop.
+
+    Awaits its turn in the model's rate limit queue, then makes the request
+    in a worker thread.
+    """
+    client = settings.openai_client
+    with tracing.span("llm.completion", **{"llm.model": model,
+                                           "llm.priority": priority}) as span:
+        limiter = _rate_limiter(model)
+        estimated = 0
+        if limiter is not None:
+            estimated = _estimate_tokens(model, messages)
+            await limiter.a_acquire(estimated, priority)
+        try:
+            completion = await asyncio.to_thread(
+                client.chat.completions.create, model=model,
+                messages=messages)
+        except Exception as e:
+            # A cancelled call keeps its full reservation, as the request
+            # still completes in its thread
+            if limiter is not None:
+                _settle(limiter, estimated, error=e)
+            raise
+        if limiter is not None:
+            _settle(limiter, estimated, completion)
+        _record_usage(span, completion)
+        return completion
+
+
+def _classification_messages(response, language):
     prompt = (f"In {language}, classify this response as 'affirmative', "
               f"'negative', 'stop' (if the user wants to stop or exit out of "
               f"the assessment), 'clarification', or 'unsure': '{response}'. "
               f"Do not add extra words, just return the classification.")
-    completion = client.chat.completions.create(
+    return [{"role": "system", "content": prompt}]
+
+
+@tracing.traced("tools.classify_response")
+def classify_response(response, language):
+    """Classifies response as affirmative, negative, uncooperative, or unsure."""
+    completion = create_completion(
+        model="gpt-4-turbo",
+        messages=_classification_messages(response, language)
+    )
+    return completion.choices[0].message.content.strip().lower()
+
+
+@tracing.traced("tools.classify_response")
+async def a_classify_response(response, language):
+    """Async version of ``classify_response``."""
+    completion = await a_create_completion(
         model="gpt-4-turbo",
-        messages=[{"role": "system", "content": prompt}]
+        messages=_classification_messages(response, language)
     )
     return completion.choices[0].message.content.strip().lower()
 
 
+def _translation_key(question, language_code):
+    return hashlib.sha256(
+        f"{language_code}\n{question}".encode("utf-8")).hexdigest()
+
+
+def _translation_messages(question, language_code):
+    prompt = f"Translate the following sentence to {language_code}: {question}"
+    return [{"role": "system", "content": "You are a translation assistant. "
+                                          "Only return the translated question, "
+                                          "no other text."},
+            {"role": "user", "content": prompt}]
+
+
+def _cached_translation(key):
+    try:
+        return get_translation_cache().get(key)
+    except Exception as e:
+        print(f"Error reading translation cache: {e}")
+        return None
+
+
+def _cache_translation(key, translation):
+    if not translation:
+        return
+    try:
+        get_translation_cache().set(key, translation)
+    except Exception as e:
+        print(f"Error writing translation cache: {e}")
+
+
+@tracing.traced("tools.translate_question")
 def translate_question(question, language_code):
     """Translates a question into the user's detected language."""
-    prompt = f"Translate the following sentence to {language_code}: {question}"
-    completion = client.chat.completions.create(
+    key = _translation_key(question, language_code)
+    translation = _cached_translation(key)
+    if translation is not None:
+        return translation
+    completion = create_completion(
+        model="gpt-4o-mini",
+        messages=_translation_messages(question, language_code)
+    )
+    translation = completion.choices[0].message.content
+    _cache_translation(key, translation)
+    return translation
+
+
+@tracing.traced("tools.translate_question")
+async def a_translate_question(question, language_code):
+    """Async version of ``translate_question``."""
+    key = _translation_key(question, language_code)
+    # The shared cache may be a network round trip away
+    translation = await asyncio.to_thread(_cached_translation, key)
+    if translation is not None:
+        return translation
+    completion = await a_create_completion(
         model="gpt-4o-mini",
-        messages=[{"role": "system", "content": "You are a translation assistant. "
-                                                "Only return the translated question, "
-                                                "no other text."},
-                  {"role": "user", "content": prompt}]
+        messages=_translation_messages(question, language_code)
     )
-    return completion.choices[0].message.content
\ No newline at end of file
+    translation = completion.choices[0].message.content
+    await asyncio.to_thread(_cache_translation, key, translation)
+    return translation
@@ -0,0 +1,43 @@
+--------------- NOTIFICATION OUTBOX ---------------
+
+-- TABLE --
+
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    -- ID
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+
+    -- OPTIONAL RELATIONSHIPS
+    -- Unique, so a support request is never queued twice
+    support_request_id UUID UNIQUE,
+
+    -- METADATA
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ,
+    sent_at TIMESTAMPTZ,
+
+    -- REQUIRED
+    kind TEXT NOT NULL CHECK (char_length(kind) <= 100),
+    payload JSONB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sent', 'dead')),
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    -- OPTIONAL
+    last_error TEXT
+);
+
+-- INDEXES --
+
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_due ON notification_outbox (kind, status, next_attempt_at);
+
+-- RLS --
+
+-- Payloads hold client contact details; only the backend's service role may
+-- read or write them
+ALTER TABLE notification_outbox ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow full access to notification_outbox for the service role"
+    ON notification_outbox
+    TO service_role
+    USING (true)
+    WITH CHECK (true);
@@ -0,0 +1,10 @@
+--------------- CHAT EVALUATION QUEUE ---------------
+
+-- COLUMNS --
+
+ALTER TABLE chats ADD COLUMN IF NOT EXISTS chat_evaluation_sent BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE chats ADD COLUMN IF NOT EXISTS evaluation_attempts INT NOT NULL DEFAULT 0;
+
+-- INDEXES --
+
+CREATE INDEX IF NOT EXISTS idx_chats_evaluation_pending ON chats (created_at) WHERE chat_evaluation_sent = FALSE;